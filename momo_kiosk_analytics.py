@@ -0,0 +1,215 @@
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # only needed once a snapshot exists
+    pa = pc = None
+
+from momo_kiosk_snapshot import iter_order_lines, iter_orders, snapshot_available
+
+# ======================
+# SALES ANALYTICS
+# ======================
+
+# Every function takes an inclusive start/end range of YYYY-MM-DD strings.
+# The ones reading raw orders use the Arrow snapshot when snapshot_dir is
+# given and has been exported, and SQLite otherwise.
+
+# Raw orders are read and aggregated this many rows at a time, and the
+# partial results folded together, so memory depends on the chunk size and
+# the number of groups (days, items, customers), never on the range.
+REPORT_CHUNK_ROWS = int(os.environ.get("MOMO_REPORT_CHUNK_ROWS", 50_000))
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _next_day(end):
+    return (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+
+
+def _fold(total, part):
+    """Add one chunk's grouped totals into the running ones"""
+    if isinstance(part.index, pd.CategoricalIndex):
+        # Each chunk has its own categories; fold on the plain values
+        part.index = part.index.astype(part.index.categories.dtype)
+    if total is None:
+        return part
+    return total.add(part, fill_value=0)
+
+
+def _fold_table(total, part, keys):
+    """Arrow counterpart of _fold; every non-key column is summed and keeps its name"""
+    if total is not None:
+        values = [name for name in part.column_names if name not in keys]
+        # Batches have their own dictionaries; grouping needs a shared one
+        part = (pa.concat_tables([total, part]).unify_dictionaries()
+                .group_by(keys).aggregate([(name, "sum") for name in values]))
+        part = part.rename_columns([name[:-4] if name[:-4] in values else name for name in part.column_names])
+    return part
+
+
+def get_daily_sales(conn, start, end):
+    return pd.read_sql(
+        "SELECT date, order_count, tax, revenue FROM sales_daily WHERE date BETWEEN ? AND ? ORDER BY date",
+        conn,
+        params=(start, end)
+    )
+
+
+def get_payment_mix(conn, start, end):
+    return pd.read_sql("""
+        SELECT payment_mode, SUM(order_count) AS order_count
+        FROM sales_daily_payment
+        WHERE date BETWEEN ? AND ?
+        GROUP BY payment_mode
+    """, conn, params=(start, end))
+
+
+def get_hourly_sales(conn, start, end):
+    return pd.read_sql("""
+        SELECT hour, SUM(revenue) AS revenue
+        FROM sales_hourly
+        WHERE date BETWEEN ? AND ?
+        GROUP BY hour
+        ORDER BY hour
+    """, conn, params=(start, end))
+
+
+def get_item_sales(conn, start, end, snapshot_dir=None):
+    """Quantity and revenue per item per day"""
+    if snapshot_dir and snapshot_available(snapshot_dir):
+        totals = None
+        for lines in iter_order_lines(conn, start, end, ["timestamp", "item", "quantity", "total"],
+                                      batch_rows=REPORT_CHUNK_ROWS, snapshot_dir=snapshot_dir):
+            lines = lines.append_column("date", pc.floor_temporal(lines["timestamp"], unit="day"))
+            part = lines.group_by(["date", "item"]).aggregate([("quantity", "sum"), ("total", "sum")])
+            totals = _fold_table(totals, part, ["date", "item"])
+        if totals is None:
+            return pd.DataFrame(columns=['date', 'item', 'quantity', 'revenue'])
+        # Only the per-day totals become a DataFrame
+        items = totals.to_pandas().rename(columns={'quantity_sum': 'quantity', 'total_sum': 'revenue'})
+        items['date'] = items['date'].dt.strftime('%Y-%m-%d')
+        items['item'] = items['item'].astype(str)
+        return items[['date', 'item', 'quantity', 'revenue']]
+
+    # Range on the raw timestamp so the orders date index is used
+    return pd.read_sql("""
+        SELECT date(o.timestamp) AS date,
+               oi.item,
+               SUM(oi.quantity) AS quantity,
+               SUM(oi.total) AS revenue
+        FROM orders o
+        JOIN order_items oi ON oi.order_id = o.id
+        WHERE o.timestamp >= ? AND o.timestamp < ?
+        GROUP BY date(o.timestamp), oi.item
+    """, conn, params=(start, _next_day(end)))
+
+
+def get_top_customers(conn, start, end, limit=10, snapshot_dir=None):
+    if snapshot_dir and snapshot_available(snapshot_dir):
+        totals = None
+        for orders in iter_orders(conn, start, end, ["customer_id", "total"],
+                                  batch_rows=REPORT_CHUNK_ROWS, snapshot_dir=snapshot_dir):
+            orders = orders.filter(pc.is_valid(orders["customer_id"]))
+            part = orders.group_by("customer_id").aggregate([("total", "count"), ("total", "sum")])
+            totals = _fold_table(totals, part, ["customer_id"])
+        if totals is None:
+            return pd.DataFrame(columns=['name', 'order_count', 'total_spent'])
+        top = (totals.to_pandas()
+               .rename(columns={'total_count': 'order_count', 'total_sum': 'total_spent'})
+               .set_index('customer_id')
+               .nlargest(limit, 'total_spent'))
+        ids = [int(customer_id) for customer_id in top.index]
+        names = dict(conn.execute(
+            f"SELECT id, name FROM customers WHERE id IN ({', '.join('?' * len(ids))})", ids
+        ).fetchall()) if ids else {}
+        top = top[[customer_id in names for customer_id in ids]]
+        top.insert(0, 'name', [names[int(customer_id)] for customer_id in top.index])
+        return top.reset_index(drop=True)
+
+    return pd.read_sql("""
+        SELECT c.name, t.order_count, t.total_spent
+        FROM (SELECT customer_id, COUNT(*) AS order_count, SUM(total) AS total_spent
+              FROM orders
+              WHERE timestamp >= ? AND timestamp < ? AND customer_id IS NOT NULL
+              GROUP BY customer_id
+              ORDER BY total_spent DESC
+              LIMIT ?) t
+        JOIN customers c ON c.id = t.customer_id
+        ORDER BY t.total_spent DESC
+    """, conn, params=(start, _next_day(end), limit))
+
+
+# ======================
+# STREAMING AGGREGATION
+# ======================
+
+def _compact_chunk(rows, customer_column):
+    chunk = pd.DataFrame.from_records(rows, columns=['date', 'customer', 'total', 'payment_mode'])
+    chunk['date'] = chunk['date'].astype('category')
+    chunk['payment_mode'] = chunk['payment_mode'].astype('category')
+    if customer_column.endswith('_id'):
+        chunk['customer'] = chunk['customer'].astype('Int32')
+    else:
+        chunk['customer'] = chunk['customer'].astype('category')
+    chunk['total'] = chunk['total'].astype('float64')
+    return chunk
+
+
+def iter_order_chunks(conn, start, end, customer_column="customer_id", chunk_rows=REPORT_CHUNK_ROWS):
+    """Yield the orders in range as DataFrames of date, customer, total and payment_mode
+
+    Only those four columns are read, never the items or notes text, and
+    each chunk is at most chunk_rows rows with categorical text columns.
+    """
+    cursor = conn.execute(f"""
+        SELECT substr(timestamp, 1, 10), {customer_column}, total, payment_mode
+        FROM orders
+        WHERE timestamp >= ? AND timestamp < ?
+    """, (start, _next_day(end)))
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield _compact_chunk(rows, customer_column)
+    finally:
+        cursor.close()
+
+
+def stream_sales_summary(conn, start, end, customer_column="customer_id", top=10, chunk_rows=REPORT_CHUNK_ROWS):
+    """Return daily, day_of_week, payment and top_customers DataFrames for a range
+
+    Orders are folded chunk by chunk, for tables without the rollups or
+    ranges too long to hold in memory. customer_column is customer_id on
+    food_hub.db and the customer name on food_orders.db.
+    """
+    daily = payments = customers = None
+    for chunk in iter_order_chunks(conn, start, end, customer_column, chunk_rows):
+        daily = _fold(daily, chunk.groupby('date', observed=True)['total'].agg(['count', 'sum']))
+        payments = _fold(payments, chunk.groupby('payment_mode', observed=True).size())
+        customers = _fold(customers, chunk.dropna(subset=['customer'])
+                          .groupby('customer', observed=True)['total'].agg(['count', 'sum']))
+
+    if daily is None:
+        daily = pd.DataFrame({'count': pd.Series(dtype='int64'), 'sum': pd.Series(dtype='float64')})
+        payments = pd.Series(dtype='int64')
+        customers = daily
+    daily = (daily.rename(columns={'count': 'order_count', 'sum': 'revenue'})
+             .astype({'order_count': 'int64'}).sort_index().rename_axis('date').reset_index())
+
+    weekdays = pd.to_datetime(daily['date']).dt.day_name()
+    day_of_week = (daily.groupby(weekdays)['revenue'].sum().reindex(DAY_NAMES, fill_value=0)
+                   .rename_axis('day_of_week').reset_index())
+
+    return {
+        'daily': daily,
+        'day_of_week': day_of_week,
+        'payment': payments.astype('int64').rename_axis('payment_mode').reset_index(name='order_count'),
+        'top_customers': (customers.rename(columns={'count': 'order_count', 'sum': 'total_spent'})
+                          .astype({'order_count': 'int64'}).nlargest(top, 'total_spent')
+                          .rename_axis('customer').reset_index()),
+    }
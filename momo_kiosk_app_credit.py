@@ -1,66 +1,22 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-from datetime import datetime
-import time
-import hashlib
-import shutil
+from datetime import datetime, timedelta
 import os
-from pathlib import Path
+from momo_kiosk_orders import insert_order_items
+from momo_kiosk_db import connect, session_connection, run_with_retry, hot_restore
+from momo_kiosk_backup import BackupJob
+from momo_kiosk_cart import Cart
+from momo_kiosk_schema import ensure_schema, hash_password, FOOD_ORDERS_MIGRATIONS
 
 # Database Configuration
 DB_FILE = "food_orders.db"
 BACKUP_DIR = "backups/"
 
-# Initialize database
+# Migrations run once per process; new sessions only open a connection
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Create tables
-    c.execute('''CREATE TABLE IF NOT EXISTS orders
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  customer TEXT,
-                  items TEXT,
-                  total REAL,
-                  payment_mode TEXT,
-                  status TEXT,
-                  staff TEXT)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS customers
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT UNIQUE,
-                  phone TEXT,
-                  credit_balance REAL DEFAULT 0,
-                  total_orders INTEGER DEFAULT 0,
-                  total_spent REAL DEFAULT 0)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS menu
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  category TEXT,
-                  item TEXT UNIQUE,
-                  price REAL,
-                  cost REAL,
-                  stock INTEGER)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT UNIQUE,
-                  password TEXT,
-                  role TEXT)''')
-    
-    # Insert default admin if not exists
-    c.execute("SELECT 1 FROM users WHERE username='admin'")
-    if not c.fetchone():
-        c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                 ("admin", hash_password("admin123"), "Admin"))
-    
-    conn.commit()
-    return conn
-
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    ensure_schema(DB_FILE, FOOD_ORDERS_MIGRATIONS)
+    return connect(DB_FILE)
 
 def authenticate(username, password):
     c = conn.cursor()
@@ -71,18 +27,22 @@ def authenticate(username, password):
     return None
 
 # Initialize app
-conn = init_db()
+conn = session_connection(st.session_state, init_db, db_file=DB_FILE)
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
 # Session state
 if 'current_order' not in st.session_state:
-    st.session_state.current_order = []
+    st.session_state.current_order = Cart()
 if 'customer_name' not in st.session_state:
     st.session_state.customer_name = ""
 if 'current_user' not in st.session_state:
     st.session_state.current_user = None
 if 'user_role' not in st.session_state:
     st.session_state.user_role = None
+if 'backup_job' not in st.session_state:
+    st.session_state.backup_job = None
+if 'order_message' not in st.session_state:
+    st.session_state.order_message = None
 
 # Login Screen
 if not st.session_state.current_user:
@@ -109,6 +69,10 @@ if not st.session_state.current_user:
 def order_tab():
     st.header("New Order")
     
+    if st.session_state.order_message:
+        st.toast(st.session_state.order_message)
+        st.session_state.order_message = None
+    
     # Customer Section
     customer_name = st.text_input(
         "Customer Name", 
@@ -117,7 +81,18 @@ def order_tab():
     )
     st.session_state.customer_name = customer_name
     
-    # Menu Selection
+    menu_grid()
+    order_summary()
+
+# Fragments, so adding an item reruns only the menu; the summary polls the
+# cart once a second rather than forcing a full rerun per tap
+@st.fragment
+def menu_grid():
+    # Shown after the rerun below, which refreshes the stock figures
+    message = st.session_state.pop("menu_message", None)
+    if message:
+        st.toast(message)
+    
     menu_df = pd.read_sql("SELECT * FROM menu WHERE stock > 0", conn)
     categories = menu_df['category'].unique()
     
@@ -134,68 +109,72 @@ def order_tab():
             )
             
             if qty > 0 and st.button(f"Add {item['item']}", key=f"add_{item['item']}"):
-                order_item = {
-                    "item": item['item'],
-                    "price": item['price'],
-                    "quantity": qty,
-                    "total": item['price'] * qty
-                }
-                st.session_state.current_order.append(order_item)
+                st.session_state.current_order.add(item['id'], item['item'], item['price'], qty)
                 
                 # Update stock
                 conn.execute("UPDATE menu SET stock = stock - ? WHERE item = ?", 
                            (qty, item['item']))
                 conn.commit()
                 
-                st.success(f"Added {qty} × {item['item']}")
-                time.sleep(0.5)
-                st.rerun()
+                st.session_state.menu_message = f"Added {qty} × {item['item']}"
+                st.rerun(scope="fragment")
+
+@st.fragment(run_every=1)
+def order_summary():
+    cart = st.session_state.current_order
+    if not cart:
+        return
     
-    # Order Summary
-    if st.session_state.current_order:
-        st.subheader("Order Summary")
-        order_df = pd.DataFrame(st.session_state.current_order)
-        st.dataframe(order_df)
-        
-        total = order_df['total'].sum()
-        st.markdown(f"**Total: ₹{total}**")
-        
-        payment_mode = st.radio("Payment Method", ["Cash", "Credit", "Online"])
+    customer_name = st.session_state.customer_name
+    st.subheader("Order Summary")
+    for line in cart:
+        st.write(f"{line['quantity']} × {line['item']} - ₹{line['total']}")
+    
+    # This app does not charge tax
+    total = cart.subtotal
+    st.markdown(f"**Total: ₹{total}**")
+    
+    payment_mode = st.radio("Payment Method", ["Cash", "Credit", "Online"])
+    
+    if st.button("Submit Order"):
+        # Save order
+        order_data = {
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "customer": customer_name,
+            "total": total,
+            "payment_mode": payment_mode,
+            "status": "Completed",
+            "staff": st.session_state.current_user
+        }
         
-        if st.button("Submit Order"):
-            # Save order
-            order_data = {
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "customer": customer_name,
-                "items": str(st.session_state.current_order),
-                "total": total,
-                "payment_mode": payment_mode,
-                "status": "Completed",
-                "staff": st.session_state.current_user
-            }
-            
-            if payment_mode == "Credit" and customer_name:
-                # Update customer credit
-                conn.execute("""
-                    INSERT OR IGNORE INTO customers (name) VALUES (?)
-                """, (customer_name,))
+        def write():
+            with conn:
+                if payment_mode == "Credit" and customer_name:
+                    # Update customer credit
+                    conn.execute("""
+                        INSERT OR IGNORE INTO customers (name) VALUES (?)
+                    """, (customer_name,))
                 
-                conn.execute("""
-                    UPDATE customers 
-                    SET credit_balance = credit_balance + ?,
-                        total_orders = total_orders + 1,
-                        total_spent = total_spent + ?
-                    WHERE name = ?
-                """, (total, total, customer_name))
-            
-            # Save order
-            order_df = pd.DataFrame([order_data])
-            order_df.to_sql('orders', conn, if_exists='append', index=False)
+                    conn.execute("""
+                        UPDATE customers 
+                        SET credit_balance = credit_balance + ?,
+                            total_orders = total_orders + 1,
+                            total_spent = total_spent + ?
+                        WHERE name = ?
+                    """, (total, total, customer_name))
             
-            st.success("Order submitted successfully!")
-            st.session_state.current_order = []
-            time.sleep(1)
-            st.rerun()
+                # Save order and its lines together
+                cursor = conn.execute("""
+                    INSERT INTO orders (timestamp, customer, total, payment_mode, status, staff)
+                    VALUES (:timestamp, :customer, :total, :payment_mode, :status, :staff)
+                """, order_data)
+                insert_order_items(conn, cursor.lastrowid, cart.lines())
+        
+        run_with_retry(write)
+        
+        st.session_state.order_message = "Order submitted successfully!"
+        cart.clear()
+        st.rerun()
 
 def customers_tab():
     st.header("Customer Management")
@@ -267,32 +246,43 @@ def inventory_tab():
                 st.rerun()
 
 def reports_tab():
+    # Imported here so the pyarrow-backed analytics load only for reports
+    from momo_kiosk_analytics import stream_sales_summary
+    
     st.header("Sales Reports")
     
-    orders = pd.read_sql("SELECT * FROM orders", conn)
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", datetime.now() - timedelta(days=30))
+    with col2:
+        end_date = st.date_input("End Date", datetime.now())
+    
+    # Folded in chunks, so a long range costs time rather than memory
+    summary = stream_sales_summary(conn, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"),
+                                   customer_column="customer", top=20)
+    daily_sales = summary['daily']
     
-    if orders.empty:
+    if daily_sales.empty:
         st.info("No orders found")
         return
     
-    orders['timestamp'] = pd.to_datetime(orders['timestamp'])
-    orders['date'] = orders['timestamp'].dt.date
-    
     tab1, tab2, tab3 = st.tabs(["Daily Sales", "Customer Analysis", "Menu Performance"])
     
     with tab1:
         st.subheader("Daily Sales")
-        daily_sales = orders.groupby('date')['total'].sum().reset_index()
-        st.bar_chart(daily_sales, x="date", y="total")
+        st.bar_chart(daily_sales, x="date", y="revenue")
         st.dataframe(daily_sales)
+        
+        st.subheader("Sales by Day of Week")
+        st.bar_chart(summary['day_of_week'], x="day_of_week", y="revenue")
     
     with tab2:
         st.subheader("Customer Analysis")
-        customer_stats = orders.groupby('customer').agg({
-            'total': 'sum',
-            'id': 'count'
-        }).rename(columns={'id': 'order_count'})
-        st.dataframe(customer_stats)
+        st.dataframe(summary['top_customers'].rename(columns={
+            'customer': 'Customer',
+            'order_count': 'Orders',
+            'total_spent': 'Total Spent'
+        }))
     
     with tab3:
         st.subheader("Menu Performance")
@@ -300,14 +290,27 @@ def reports_tab():
         st.warning("Menu performance analysis requires data processing")
         # Implementation would parse the items column
 
+@st.fragment(run_every=1)
+def backup_progress():
+    job = st.session_state.backup_job
+    if job is None:
+        return
+    if not job.done:
+        st.progress(job.progress, text=f"Backing up... {job.progress:.0%} ({job.duration:.1f}s)")
+    elif job.error:
+        st.error(f"Backup failed after {job.duration:.1f}s: {job.error}")
+    else:
+        st.success(f"Backup created: {job.backup_file} in {job.duration:.1f}s")
+
 def backup_tab():
     st.header("System Backup")
     
-    if st.button("Create Backup"):
+    job = st.session_state.backup_job
+    if st.button("Create Backup", disabled=job is not None and not job.done):
+        # Online backup on a background thread; orders keep going meanwhile
         backup_file = f"{BACKUP_DIR}backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        shutil.copy2(DB_FILE, backup_file)
-        st.success(f"Backup created: {backup_file}")
-        st.rerun()
+        st.session_state.backup_job = BackupJob(DB_FILE, backup_file).start()
+    backup_progress()
     
     st.subheader("Available Backups")
     backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.endswith('.db')], reverse=True)
@@ -318,8 +321,11 @@ def backup_tab():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("Restore Backup"):
-                shutil.copy2(f"{BACKUP_DIR}{selected}", DB_FILE)
-                st.success("Database restored! Please refresh the page.")
+                try:
+                    run_with_retry(hot_restore, conn, DB_FILE, f"{BACKUP_DIR}{selected}")
+                    st.success("Database restored! Other terminals switch over on their next action.")
+                except (sqlite3.Error, OSError, ValueError) as e:
+                    st.error(f"Restore failed: {e}")
         with col2:
             if st.button("Delete Backup"):
                 os.remove(f"{BACKUP_DIR}{selected}")
@@ -337,25 +343,23 @@ def backup_tab():
 st.title("Food Order Pro")
 st.markdown(f"Logged in as: **{st.session_state.current_user}** ({st.session_state.user_role})")
 
-# Role-based tabs
+# Role-based sections; only the selected one runs on each rerun
+SECTIONS = {
+    "Orders": order_tab,
+    "Customers": customers_tab,
+    "Inventory": inventory_tab,
+    "Reports": reports_tab,
+    "Backup": backup_tab
+}
 if st.session_state.user_role == "Admin":
-    tabs = st.tabs(["Orders", "Customers", "Inventory", "Reports", "Backup"])
-    with tabs[0]:
-        order_tab()
-    with tabs[1]:
-        customers_tab()
-    with tabs[2]:
-        inventory_tab()
-    with tabs[3]:
-        reports_tab()
-    with tabs[4]:
-        backup_tab()
+    sections = ["Orders", "Customers", "Inventory", "Reports", "Backup"]
 else:  # Staff
-    tabs = st.tabs(["Orders", "Customers"])
-    with tabs[0]:
-        order_tab()
-    with tabs[1]:
-        customers_tab()
+    sections = ["Orders", "Customers"]
+
+if st.session_state.get("active_section") not in sections:
+    st.session_state.active_section = sections[0]
+section = st.radio("Section", sections, key="active_section", horizontal=True, label_visibility="collapsed")
+SECTIONS[section]()
 
 # Logout button
 if st.sidebar.button("Logout"):
@@ -0,0 +1,395 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+from momo_kiosk_db import connect, hot_restore
+
+# ======================
+# ONLINE BACKUPS
+# ======================
+
+BACKUP_STEP_PAGES = 1024
+# A write from another connection makes the backup API start over; after
+# this many restarts the rest is copied in a single step instead.
+MAX_BACKUP_RESTARTS = 3
+
+
+class _Restarted(Exception):
+    pass
+
+
+class BackupJob:
+    """Copy a live database with the SQLite online backup API on a background thread
+
+    Pages are copied in steps of BACKUP_STEP_PAGES so orders keep committing
+    while the backup runs. The copy is written to <backup_file>.part and
+    renamed when complete, so a backup file on disk is never torn.
+    """
+
+    def __init__(self, db_file, backup_file, step_pages=BACKUP_STEP_PAGES):
+        self.db_file = db_file
+        self.backup_file = backup_file
+        self.step_pages = step_pages
+        self.total_pages = 0
+        self.remaining_pages = 0
+        self.restarts = 0
+        self.stage = None
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    @property
+    def progress(self):
+        """Fraction of pages copied, 0.0 to 1.0"""
+        if self.done and self.error is None:
+            return 1.0
+        if not self.total_pages:
+            return 0.0
+        return (self.total_pages - self.remaining_pages) / self.total_pages
+
+    @property
+    def duration(self):
+        """Seconds spent so far, or in total once finished"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def _on_progress(self, status, remaining, total):
+        if remaining > self.remaining_pages and self.total_pages:
+            self.restarts += 1
+            if self.restarts > MAX_BACKUP_RESTARTS:
+                raise _Restarted()
+        self.remaining_pages = remaining
+        self.total_pages = total
+
+    def _run(self):
+        part_file = self.backup_file + ".part"
+        try:
+            self.stage = "copying"
+            self._snapshot(part_file)
+            self._store(part_file)
+        except Exception as e:
+            self.error = e
+        finally:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+            self.finished_at = time.monotonic()
+
+    def _snapshot(self, part_file):
+        source = connect(self.db_file)
+        try:
+            target = sqlite3.connect(part_file)
+            try:
+                try:
+                    source.backup(target, pages=self.step_pages, progress=self._on_progress)
+                except _Restarted:
+                    # A single step holds one read snapshot; under WAL this
+                    # still does not block writers.
+                    source.backup(target, pages=-1, progress=self._on_progress)
+            finally:
+                target.close()
+        finally:
+            source.close()
+
+    def _store(self, part_file):
+        os.replace(part_file, self.backup_file)
+
+
+# ======================
+# INCREMENTAL BACKUP CHAINS
+# ======================
+
+# A chain backup is <name>.zip holding compressed CHUNK_SIZE slices of the
+# database plus a <name>.json manifest with the hash of every chunk. A full
+# backup stores every chunk; an incremental stores only the chunks whose
+# hash differs from its parent, so restoring replays base -> ... -> target.
+CHUNK_SIZE = 64 * 1024
+FULL_EVERY = int(os.environ.get("MOMO_BACKUP_FULL_EVERY", 24))
+# Newest backup kept for each of the last N hours / days / ISO weeks
+RETENTION = {"hourly": 24, "daily": 7, "weekly": 4}
+_PERIOD_FORMATS = {"hourly": "%Y-%m-%d %H", "daily": "%Y-%m-%d", "weekly": "%G-W%V"}
+_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _chunk_hash(chunk):
+    return hashlib.blake2b(chunk, digest_size=16).hexdigest()
+
+
+def _write_json(path, data):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def load_manifest(backup_dir, name):
+    with open(os.path.join(backup_dir, name + ".json")) as f:
+        return json.load(f)
+
+
+def list_backups(backup_dir):
+    """Return every backup, newest first
+
+    Chain backups come back as their manifest (without chunk hashes) plus
+    'size' (bytes on disk);
+    plain .db copies as {'name', 'kind': 'file', 'created', 'size'}.
+    """
+    backups = []
+    for entry in os.scandir(backup_dir):
+        if entry.name.endswith(".json"):
+            manifest = load_manifest(backup_dir, entry.name[:-5])
+            del manifest['hashes']
+            data_file = os.path.join(backup_dir, manifest['name'] + ".zip")
+            manifest['size'] = os.path.getsize(data_file) if os.path.exists(data_file) else 0
+            backups.append(manifest)
+        elif entry.name.endswith(".db"):
+            backups.append({
+                "name": entry.name,
+                "kind": "file",
+                "parent": None,
+                "created": datetime.fromtimestamp(entry.stat().st_mtime).strftime(_TIME_FORMAT),
+                "size": entry.stat().st_size,
+                "verified": None
+            })
+    return sorted(backups, key=lambda b: (b['created'], b['name']), reverse=True)
+
+
+def backup_chain(backup_dir, name):
+    """Return the manifests needed to rebuild name, base full backup first"""
+    chain = []
+    while name:
+        manifest = load_manifest(backup_dir, name)
+        chain.append(manifest)
+        name = manifest['parent']
+    return chain[::-1]
+
+
+def pack_backup(snapshot_file, backup_dir, name, full_every=FULL_EVERY):
+    """Store a consistent database snapshot as the next link of the backup chain"""
+    parent = next((b for b in list_backups(backup_dir)
+                   if b['kind'] != "file" and b['verified'] is not False), None)
+    if parent is None or parent['chunk_size'] != CHUNK_SIZE or parent['depth'] + 1 >= full_every:
+        parent = None
+    parent_hashes = load_manifest(backup_dir, parent['name'])['hashes'] if parent else []
+
+    hashes = []
+    data_file = os.path.join(backup_dir, name + ".zip")
+    with open(snapshot_file, "rb") as f, \
+            zipfile.ZipFile(data_file + ".tmp", "w", zipfile.ZIP_DEFLATED) as z:
+        index = 0
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest = _chunk_hash(chunk)
+            hashes.append(digest)
+            if parent is None or index >= len(parent_hashes) or parent_hashes[index] != digest:
+                z.writestr(f"{index:08d}", chunk)
+            index += 1
+        stored_chunks = len(z.namelist())
+    os.replace(data_file + ".tmp", data_file)
+
+    manifest = {
+        "name": name,
+        "kind": "incremental" if parent else "full",
+        "parent": parent['name'] if parent else None,
+        "depth": parent['depth'] + 1 if parent else 0,
+        "created": datetime.now().strftime(_TIME_FORMAT),
+        "db_size": os.path.getsize(snapshot_file),
+        "chunk_size": CHUNK_SIZE,
+        "stored_chunks": stored_chunks,
+        "hashes": hashes,
+        "verified": None,
+        "verify_error": None
+    }
+    _write_json(os.path.join(backup_dir, name + ".json"), manifest)
+    return manifest
+
+
+def reconstruct_backup(backup_dir, name, target_file):
+    """Rebuild the database as of backup name into target_file"""
+    chain = backup_chain(backup_dir, name)
+    with open(target_file, "wb") as out:
+        for manifest in chain:
+            with zipfile.ZipFile(os.path.join(backup_dir, manifest['name'] + ".zip")) as z:
+                for entry in z.namelist():
+                    out.seek(int(entry) * manifest['chunk_size'])
+                    out.write(z.read(entry))
+        out.truncate(chain[-1]['db_size'])
+
+
+def verify_backup(backup_dir, name):
+    """Rebuild a chain backup, check chunk hashes and PRAGMA integrity_check, record the result"""
+    manifest = load_manifest(backup_dir, name)
+    check_file = os.path.join(backup_dir, name + ".verify")
+    error = None
+    try:
+        reconstruct_backup(backup_dir, name, check_file)
+        with open(check_file, "rb") as f:
+            for index, expected in enumerate(manifest['hashes']):
+                if _chunk_hash(f.read(manifest['chunk_size'])) != expected:
+                    error = f"chunk {index} does not match its hash"
+                    break
+        if error is None:
+            check = sqlite3.connect(check_file)
+            try:
+                result = check.execute("PRAGMA integrity_check").fetchone()[0]
+            finally:
+                check.close()
+            if result != "ok":
+                error = result
+    except Exception as e:
+        error = str(e)
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(check_file + suffix):
+                os.remove(check_file + suffix)
+
+    manifest['verified'] = error is None
+    manifest['verify_error'] = error
+    _write_json(os.path.join(backup_dir, name + ".json"), manifest)
+    return error is None
+
+
+def restore_backup(conn, db_file, backup_dir, name):
+    """Hot-restore any listed backup (plain .db or chain link) into the live database"""
+    if name.endswith(".db"):
+        return hot_restore(conn, db_file, os.path.join(backup_dir, name))
+    restore_file = os.path.join(backup_dir, name + ".restore")
+    try:
+        reconstruct_backup(backup_dir, name, restore_file)
+        return hot_restore(conn, db_file, restore_file)
+    finally:
+        if os.path.exists(restore_file):
+            os.remove(restore_file)
+
+
+def _dependents(backups, name):
+    return [b['name'] for b in backups if b.get('parent') == name]
+
+
+def delete_backup(backup_dir, name):
+    """Delete one backup; raises ValueError if later incrementals depend on it"""
+    dependents = _dependents(list_backups(backup_dir), name)
+    if dependents:
+        raise ValueError(f"{name} is needed by {', '.join(dependents)}")
+    for path in (name, name + ".zip", name + ".json"):
+        path = os.path.join(backup_dir, path)
+        if os.path.exists(path) and not os.path.isdir(path):
+            os.remove(path)
+
+
+def apply_retention(backup_dir, retention=RETENTION):
+    """Delete backups outside the retention policy, keeping every base they depend on
+
+    Returns the names that were deleted.
+    """
+    backups = list_backups(backup_dir)
+    if not backups:
+        return []
+    by_name = {b['name']: b for b in backups}
+
+    keep = {backups[0]['name']}
+    for period, count in retention.items():
+        periods = set()
+        for backup in backups:
+            key = datetime.strptime(backup['created'], _TIME_FORMAT).strftime(_PERIOD_FORMATS[period])
+            if key in periods:
+                continue
+            if len(periods) >= count:
+                break
+            periods.add(key)
+            keep.add(backup['name'])
+
+    for name in list(keep):
+        parent = by_name[name].get('parent')
+        while parent and parent not in keep:
+            keep.add(parent)
+            parent = by_name[parent].get('parent')
+
+    deleted = []
+    # Newest first, so incrementals go before the bases they depend on
+    for backup in backups:
+        if backup['name'] not in keep:
+            delete_backup(backup_dir, backup['name'])
+            deleted.append(backup['name'])
+    return deleted
+
+
+class ChainBackupJob(BackupJob):
+    """BackupJob that stores the snapshot as a compressed chain link, then verifies it"""
+
+    def __init__(self, db_file, backup_dir, name, retention=RETENTION):
+        super().__init__(db_file, os.path.join(backup_dir, name + ".snapshot"))
+        self.backup_dir = backup_dir
+        self.name = name
+        self.retention = retention
+        self.manifest = None
+
+    def _store(self, part_file):
+        self.stage = "compressing"
+        self.manifest = pack_backup(part_file, self.backup_dir, self.name)
+        os.remove(part_file)
+        self.stage = "verifying"
+        if not verify_backup(self.backup_dir, self.name):
+            raise RuntimeError(load_manifest(self.backup_dir, self.name)['verify_error'])
+        self.stage = "pruning"
+        apply_retention(self.backup_dir, self.retention)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental backups of a kiosk database, e.g. hourly from cron")
+    parser.add_argument("--db", default="food_hub.db")
+    parser.add_argument("--dir", default="backups/")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backup", help="take the next backup in the chain, verify it and apply retention")
+    commands.add_parser("list", help="list backups with their sizes")
+    commands.add_parser("verify", help="re-check every chain backup")
+    commands.add_parser("prune", help="apply the retention policy")
+    restore = commands.add_parser("restore", help="restore a backup into --db")
+    restore.add_argument("name")
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    if args.command == "backup":
+        name = "foodhub_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+        job = ChainBackupJob(args.db, args.dir, name).start()
+        job.wait()
+        if job.error:
+            raise SystemExit(f"Backup failed: {job.error}")
+        print(f"{name}: {job.manifest['kind']}, {job.manifest['stored_chunks']} chunks stored in {job.duration:.1f}s")
+    elif args.command == "list":
+        for backup in list_backups(args.dir):
+            print(f"{backup['name']:32} {backup['kind']:12} {backup['created']}  {backup['size'] / 1024:10.1f} KiB"
+                  f"  verified={backup['verified']}")
+    elif args.command == "verify":
+        for backup in list_backups(args.dir):
+            if backup['kind'] != "file":
+                print(backup['name'], "ok" if verify_backup(args.dir, backup['name']) else "FAILED")
+    elif args.command == "prune":
+        for name in apply_retention(args.dir):
+            print("deleted", name)
+    elif args.command == "restore":
+        conn = connect(args.db)
+        restore_backup(conn, args.db, args.dir, args.name)
+        conn.close()
+        print(f"Restored {args.name} into {args.db}")
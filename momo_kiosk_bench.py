@@ -0,0 +1,468 @@
+import argparse
+import bisect
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import sqlite3
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from momo_kiosk_analytics import (get_daily_sales, get_hourly_sales, get_item_sales,
+                                  get_payment_mix, get_top_customers, stream_sales_summary)
+from momo_kiosk_cart import TAX_RATE
+from momo_kiosk_locations import DEFAULT_LOCATION_ID, migrate_menu_stock
+from momo_kiosk_customers import list_customers_page, search_customers
+from momo_kiosk_db import connect, run_with_retry
+from momo_kiosk_menu import get_categories, get_inventory, get_low_stock, get_menu_items
+from momo_kiosk_orders import OutOfStockError, save_order
+from momo_kiosk_rollups import rebuild_rollups
+from momo_kiosk_schema import init_food_hub
+from momo_kiosk_snapshot import ARROW_AVAILABLE, export_snapshot
+
+# ======================
+# SYNTHETIC DATA
+# ======================
+
+CATEGORIES = ["Momos", "Noodles", "Rice", "Soups", "Rolls", "Snacks", "Beverages", "Desserts"]
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rahul", "Meera",
+               "Karan", "Isha", "Tenzin", "Pema", "Sonam", "Dorje", "Neha", "Amit", "Pooja", "Sanjay"]
+LAST_NAMES = ["Sharma", "Verma", "Gurung", "Tamang", "Lama", "Sherpa", "Patel", "Singh", "Rai", "Thapa",
+              "Bhutia", "Das", "Iyer", "Nair", "Reddy", "Joshi", "Mehta", "Kapoor", "Chopra", "Bose"]
+
+# Share of each day's orders placed in each hour: lunch and dinner peaks
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 0, 1, 2, 3, 6, 12, 14, 9, 4, 3, 5, 8, 12, 13, 9, 4, 1]
+WEEKEND_UPLIFT = 1.4
+WALK_IN_SHARE = 0.6
+PAYMENT_WEIGHTS = {"Cash": 45, "Online": 30, "Card": 15, "Credit": 10}
+LINES_PER_ORDER = {1: 35, 2: 30, 3: 20, 4: 10, 5: 5}
+QUANTITY_WEIGHTS = {1: 70, 2: 22, 3: 8}
+
+
+def _zipf_cum_weights(n, s=1.1):
+    """Cumulative weights where rank k is chosen with probability ~ 1/k^s"""
+    return list(itertools.accumulate(1 / (k ** s) for k in range(1, n + 1)))
+
+
+def _pick(rng, cum_weights):
+    return bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+
+
+def _orders_per_day(total, days, end):
+    weights = [WEEKEND_UPLIFT if (end - timedelta(days=days - 1 - i)).weekday() >= 5 else 1.0
+               for i in range(days)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[i % days] += 1
+    return counts
+
+
+def generate_data(db_file, customers=100_000, orders=1_000_000, menu_items=200, days=365,
+                  seed=42, batch_size=20_000):
+    """Fill an empty food_hub database with synthetic menu, customers and orders, returns row counts
+
+    Items and customers follow a Zipf-like popularity curve, orders cluster
+    around lunch and dinner and weekends are busier. Rollups, customer totals
+    and the search index are derived from the generated orders, as the app
+    would have built them.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_file)
+    # Nothing to protect while loading a throwaway database
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    init_food_hub(conn)
+
+    menu_rows = []
+    for n in range(menu_items):
+        price = rng.randrange(40, 400, 10)
+        low = rng.random() < 0.1
+        menu_rows.append((CATEGORIES[n % len(CATEGORIES)], f"{CATEGORIES[n % len(CATEGORIES)]} {n + 1:03d}",
+                          f"House special no. {n + 1}", float(price), round(price * 0.4, 2),
+                          rng.randint(0, 20) if low else rng.randint(500, 5000), 20, 1))
+    conn.executemany("""
+        INSERT INTO menu (category, item, description, price, cost, stock, min_stock, is_available)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, menu_rows)
+    migrate_menu_stock(conn)
+    menu = conn.execute("SELECT id, item, price FROM menu ORDER BY id").fetchall()
+    rng.shuffle(menu)
+
+    end = date.today()
+    conn.executemany("""
+        INSERT INTO customers (name, phone, email, join_date, is_active)
+        VALUES (?, ?, ?, ?, ?)
+    """, ((f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"9{n:09d}",
+           f"customer{n}@example.com" if rng.random() < 0.4 else None,
+           (end - timedelta(days=rng.randrange(days))).isoformat(),
+           0 if rng.random() < 0.03 else 1) for n in range(customers)))
+    customer_ids = [row[0] for row in conn.execute("SELECT id FROM customers")]
+    rng.shuffle(customer_ids)
+
+    item_weights = _zipf_cum_weights(len(menu))
+    customer_weights = _zipf_cum_weights(len(customer_ids), s=0.8) if customer_ids else None
+    hour_weights = list(itertools.accumulate(HOUR_WEIGHTS))
+    payment_modes, payment_weights = zip(*PAYMENT_WEIGHTS.items())
+    line_counts, line_weights = zip(*LINES_PER_ORDER.items())
+    quantities, quantity_weights = zip(*QUANTITY_WEIGHTS.items())
+
+    order_rows = []
+    item_rows = []
+    order_id = 0
+
+    def flush():
+        conn.executemany("""
+            INSERT INTO orders (id, timestamp, customer_id, subtotal, tax, discount, total,
+                                payment_mode, status, staff_id)
+            VALUES (?, ?, ?, ?, ?, 0, ?, ?, 'Completed', 1)
+        """, order_rows)
+        conn.executemany("""
+            INSERT INTO order_items (order_id, menu_item_id, item, quantity, price, total)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, item_rows)
+        order_rows.clear()
+        item_rows.clear()
+
+    for offset, count in enumerate(_orders_per_day(orders, days, end)):
+        day = (end - timedelta(days=days - 1 - offset)).isoformat()
+        times = sorted((_pick(rng, hour_weights), rng.randrange(60), rng.randrange(60)) for _ in range(count))
+        for hour, minute, second in times:
+            order_id += 1
+            lines = {}
+            for _ in range(rng.choices(line_counts, line_weights)[0]):
+                line = menu[_pick(rng, item_weights)]
+                lines[line] = lines.get(line, 0) + rng.choices(quantities, quantity_weights)[0]
+            subtotal = 0.0
+            for (item_id, item, price), quantity in lines.items():
+                item_rows.append((order_id, item_id, item, quantity, price, price * quantity))
+                subtotal += price * quantity
+
+            customer_id = None
+            if customer_ids and rng.random() >= WALK_IN_SHARE:
+                customer_id = customer_ids[_pick(rng, customer_weights)]
+            payment_mode = rng.choices(payment_modes, payment_weights)[0]
+            if payment_mode == "Credit" and customer_id is None:
+                payment_mode = "Cash"
+            tax = subtotal * TAX_RATE
+            order_rows.append((order_id, f"{day} {hour:02d}:{minute:02d}:{second:02d}", customer_id,
+                               subtotal, tax, subtotal + tax, payment_mode))
+            if len(order_rows) >= batch_size:
+                flush()
+    flush()
+
+    rebuild_rollups(conn)
+    conn.execute("""
+        UPDATE customers SET
+            total_orders = t.order_count,
+            total_spent = t.total_spent,
+            credit_balance = t.credit,
+            last_order_date = t.last_order
+        FROM (SELECT customer_id,
+                     COUNT(*) AS order_count,
+                     TOTAL(total) AS total_spent,
+                     TOTAL(CASE WHEN payment_mode = 'Credit' THEN total END) AS credit,
+                     MAX(timestamp) AS last_order
+              FROM orders
+              WHERE customer_id IS NOT NULL
+              GROUP BY customer_id) t
+        WHERE customers.id = t.customer_id
+    """)
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = WAL")
+    counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+              for table in ("menu", "customers", "orders", "order_items")}
+    conn.close()
+    return counts
+
+
+# ======================
+# BENCHMARK SCENARIOS
+# ======================
+
+def _percentile(sorted_values, pct):
+    return sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)]
+
+
+def _random_cart(rng, menu):
+    return [{"item_id": item_id, "item": item, "price": price, "quantity": 1, "total": price}
+            for item_id, item, price in rng.sample(menu, min(len(menu), rng.randint(1, 3)))]
+
+
+def _order(customer_id, items, payment_mode="Cash"):
+    subtotal = sum(item['total'] for item in items)
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "customer_id": customer_id,
+        "subtotal": subtotal,
+        "tax": subtotal * TAX_RATE,
+        "discount": 0,
+        "total": subtotal * (1 + TAX_RATE),
+        "payment_mode": payment_mode,
+        "status": "Completed",
+        "staff_id": 1,
+        "notes": "benchmark"
+    }
+
+
+def build_scenarios(conn, seed=42, snapshot_dir=None):
+    """Return [(name, tab, func(conn))] covering the queries behind every tab
+
+    Streamlit caches are bypassed, so these are the cache-miss costs a
+    session pays after a write or a restore.
+    """
+    rng = random.Random(seed)
+    last_day = conn.execute("SELECT MAX(date) FROM sales_daily").fetchone()[0] or date.today().isoformat()
+    end = date.fromisoformat(last_day)
+    month_start = (end - timedelta(days=29)).isoformat()
+    year_start = (end - timedelta(days=364)).isoformat()
+
+    sample = conn.execute("SELECT name, phone FROM customers ORDER BY random() LIMIT 1").fetchone() or ("Priya", "98")
+    first_name, phone = sample[0].split()[0], sample[1]
+    category = (get_categories(conn) or [None])[0]
+
+    # Cursor for page 200 of the busiest sort, found once outside the timings
+    deep_cursor = None
+    row = conn.execute("""
+        SELECT COALESCE(total_spent, 0), id FROM customers WHERE is_active = 1
+        ORDER BY COALESCE(total_spent, 0) DESC, id DESC LIMIT 1 OFFSET ?
+    """, (199 * 25 - 1,)).fetchone()
+    if row:
+        deep_cursor = tuple(row)
+
+    menu = conn.execute("""
+        SELECT m.id, m.item, m.price FROM menu m
+        JOIN location_stock s ON s.menu_item_id = m.id AND s.location_id = ?
+        WHERE s.stock >= 100 AND m.is_available = 1
+    """, (DEFAULT_LOCATION_ID,)).fetchall()
+    customer_ids = [row[0] for row in conn.execute("SELECT id FROM customers WHERE is_active = 1 LIMIT 1000")]
+
+    def place_order(conn):
+        customer_id = rng.choice(customer_ids) if customer_ids and rng.random() < 0.4 else None
+        items = _random_cart(rng, menu)
+        run_with_retry(save_order, conn, _order(customer_id, items), items)
+
+    scenarios = [
+        ("menu_items", "order_tab", lambda conn: get_menu_items(conn, available_only=True)),
+        ("customer_typeahead_short", "order_tab", lambda conn: search_customers(conn, first_name[:2], limit=10)),
+        ("customer_typeahead", "order_tab", lambda conn: search_customers(conn, first_name, limit=10)),
+        ("customer_search_phone", "customers_tab", lambda conn: search_customers(conn, phone[-6:], limit=50)),
+        ("directory_first_page", "customers_tab", lambda conn: list_customers_page(conn, "name")),
+        ("directory_page_200_by_spent", "customers_tab",
+         lambda conn: list_customers_page(conn, "total_spent", after=deep_cursor)),
+        ("categories", "inventory_tab", get_categories),
+        ("low_stock", "inventory_tab", get_low_stock),
+        ("inventory_all", "inventory_tab", get_inventory),
+        ("inventory_category", "inventory_tab", lambda conn: get_inventory(conn, category=category)),
+    ]
+    for label, start in (("30d", month_start), ("365d", year_start)):
+        scenarios += [
+            (f"daily_sales_{label}", "reports_tab", lambda conn, start=start: get_daily_sales(conn, start, last_day)),
+            (f"payment_mix_{label}", "reports_tab", lambda conn, start=start: get_payment_mix(conn, start, last_day)),
+            (f"hourly_sales_{label}", "reports_tab", lambda conn, start=start: get_hourly_sales(conn, start, last_day)),
+            (f"item_sales_{label}", "reports_tab", lambda conn, start=start: get_item_sales(conn, start, last_day)),
+            (f"top_customers_{label}", "reports_tab",
+             lambda conn, start=start: get_top_customers(conn, start, last_day)),
+            (f"sales_summary_stream_{label}", "reports_tab",
+             lambda conn, start=start: stream_sales_summary(conn, start, last_day)),
+        ]
+        if snapshot_dir:
+            scenarios += [
+                (f"item_sales_{label}_snapshot", "reports_tab",
+                 lambda conn, start=start: get_item_sales(conn, start, last_day, snapshot_dir=snapshot_dir)),
+                (f"top_customers_{label}_snapshot", "reports_tab",
+                 lambda conn, start=start: get_top_customers(conn, start, last_day, snapshot_dir=snapshot_dir)),
+            ]
+    if menu:
+        scenarios.append(("save_order", "process_order", place_order))
+    return scenarios
+
+
+def time_scenario(conn, func, repeat=10):
+    """Time func(conn) repeat times after one warm-up call, then once more under tracemalloc"""
+    func(conn)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(conn)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # Traced separately since tracemalloc itself slows every allocation
+    tracemalloc.start()
+    try:
+        func(conn)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "runs": repeat,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "max_ms": round(timings[-1], 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _contention_worker(db_file, menu, orders, seed, results):
+    rng = random.Random(seed)
+    conn = connect(db_file)
+    timings = []
+    rejected = 0
+    for _ in range(orders):
+        items = _random_cart(rng, menu)
+        started = time.perf_counter()
+        try:
+            run_with_retry(save_order, conn, _order(None, items), items)
+        except OutOfStockError:
+            rejected += 1
+        timings.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    results.put((timings, rejected))
+
+
+def run_contention(db_file, writers=4, orders_per_writer=200, seed=42):
+    """Submit orders from several processes at once, as several kiosks would"""
+    conn = connect(db_file)
+    menu = conn.execute("""
+        SELECT m.id, m.item, m.price FROM menu m
+        JOIN location_stock s ON s.menu_item_id = m.id AND s.location_id = ?
+        WHERE s.stock >= 100 AND m.is_available = 1
+    """, (DEFAULT_LOCATION_ID,)).fetchall()
+    conn.close()
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_contention_worker,
+                                         args=(db_file, menu, orders_per_writer, seed + n, results))
+                 for n in range(writers)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    timings = sorted(t for worker_timings, _ in collected for t in worker_timings)
+    conn = connect(db_file)
+    negative = conn.execute("SELECT COUNT(*) FROM location_stock WHERE stock < 0").fetchone()[0]
+    conn.close()
+    return {
+        "writers": writers,
+        "orders": len(timings),
+        "rejected": sum(rejected for _, rejected in collected),
+        "orders_per_s": round(len(timings) / elapsed, 1),
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "max_ms": round(timings[-1], 3),
+        "negative_stock_items": negative,
+    }
+
+
+def run_benchmarks(db_file, repeat=10, writers=0, orders_per_writer=200, seed=42, only=None,
+                   snapshot_dir=None):
+    """Run every scenario against db_file and return the results as a JSON-ready dict
+
+    Note that save_order and the contention run commit real orders. With
+    snapshot_dir, the Arrow snapshot is brought up to date first and the
+    reports are also timed against it.
+    """
+    conn = connect(db_file)
+    report = {
+        "db": os.path.abspath(db_file),
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "sqlite_version": sqlite3.sqlite_version,
+        "counts": {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ("menu", "customers", "orders", "order_items")},
+        "scenarios": {},
+    }
+    if snapshot_dir:
+        started = time.perf_counter()
+        export_snapshot(conn, db_file, snapshot_dir)
+        report["snapshot_export_s"] = round(time.perf_counter() - started, 2)
+    for name, tab, func in build_scenarios(conn, seed, snapshot_dir):
+        if only and name not in only:
+            continue
+        report["scenarios"][name] = {"tab": tab, **time_scenario(conn, func, repeat)}
+    conn.close()
+
+    if writers:
+        report["contention"] = run_contention(db_file, writers, orders_per_writer, seed)
+    return report
+
+
+def find_regressions(report, baseline, tolerance=1.25, floor_ms=1.0):
+    """Return [(scenario, baseline_p95, p95)] for scenarios whose p95 grew beyond tolerance
+
+    Timings under floor_ms are ignored, since they are mostly noise.
+    """
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before and result["p95_ms"] > max(before["p95_ms"] * tolerance, floor_ms):
+            regressions.append((name, before["p95_ms"], result["p95_ms"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic kiosk data and benchmark the app's queries")
+    parser.add_argument("--db", default="bench_food_hub.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="create a new database filled with synthetic data")
+    generate.add_argument("--customers", type=int, default=100_000)
+    generate.add_argument("--orders", type=int, default=1_000_000)
+    generate.add_argument("--menu-items", type=int, default=200)
+    generate.add_argument("--days", type=int, default=365)
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--force", action="store_true", help="replace --db if it exists")
+
+    run = commands.add_parser("run", help="time every scenario and print JSON results")
+    run.add_argument("--repeat", type=int, default=10)
+    run.add_argument("--writers", type=int, default=0, help="also run a multi-process order contention test")
+    run.add_argument("--orders-per-writer", type=int, default=200)
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--only", nargs="*", help="scenario names to run")
+    run.add_argument("--snapshot-dir", help="also time the reports against an Arrow snapshot kept here")
+    run.add_argument("--output", help="write the JSON results here instead of stdout")
+    run.add_argument("--baseline", help="earlier results to compare against; exits 1 on a p95 regression")
+    run.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        if os.path.exists(args.db):
+            if not args.force:
+                raise SystemExit(f"{args.db} already exists, pass --force to replace it")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(args.db + suffix):
+                    os.remove(args.db + suffix)
+        started = time.perf_counter()
+        counts = generate_data(args.db, args.customers, args.orders, args.menu_items, args.days, args.seed)
+        print(f"Generated {args.db} in {time.perf_counter() - started:.1f}s: "
+              + ", ".join(f"{count} {table}" for table, count in counts.items()))
+    elif args.command == "run":
+        if not os.path.exists(args.db):
+            raise SystemExit(f"{args.db} not found, create it with the generate command first")
+        if args.snapshot_dir and not ARROW_AVAILABLE:
+            raise SystemExit("--snapshot-dir needs pyarrow installed")
+        report = run_benchmarks(args.db, args.repeat, args.writers, args.orders_per_writer, args.seed, args.only,
+                                args.snapshot_dir)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            for name, result in report["scenarios"].items():
+                print(f"{name:32} {result['tab']:14} p50 {result['p50_ms']:9.2f} ms  "
+                      f"p95 {result['p95_ms']:9.2f} ms  peak {result['peak_kib']:10.1f} KiB")
+        else:
+            print(json.dumps(report, indent=2))
+        if args.baseline:
+            with open(args.baseline) as f:
+                regressions = find_regressions(report, json.load(f), args.tolerance)
+            for name, before, after in regressions:
+                print(f"REGRESSION {name}: p95 {before:.2f} ms -> {after:.2f} ms")
+            if regressions:
+                raise SystemExit(1)
@@ -0,0 +1,67 @@
+import json
+
+# ======================
+# CART
+# ======================
+
+TAX_RATE = 0.1
+
+
+class Cart:
+    """The order being built at the till, one line per menu item
+
+    Lines are dicts with item_id, item, price, quantity and total, the shape
+    save_order expects. Price is captured when an item is first added, and
+    the subtotal is kept up to date on every change rather than re-summed.
+    """
+
+    def __init__(self):
+        self._lines = {}
+        self.subtotal = 0.0
+
+    def add(self, item_id, item, price, quantity):
+        """Add quantity of an item, merging with its existing line"""
+        item_id, quantity = int(item_id), int(quantity)
+        line = self._lines.get(item_id)
+        if line is None:
+            line = self._lines[item_id] = {
+                "item_id": item_id, "item": str(item), "price": float(price), "quantity": 0, "total": 0.0
+            }
+        line["quantity"] += quantity
+        self._set_total(line, round(line["price"] * line["quantity"], 2))
+
+    def remove(self, item_id):
+        line = self._lines.pop(int(item_id), None)
+        if line is not None:
+            self.subtotal = round(self.subtotal - line["total"], 2) if self._lines else 0.0
+
+    def clear(self):
+        self._lines.clear()
+        self.subtotal = 0.0
+
+    def _set_total(self, line, total):
+        # Rounded to paise so repeated adds and removes cannot drift
+        self.subtotal = round(self.subtotal - line["total"] + total, 2)
+        line["total"] = total
+
+    @property
+    def tax(self):
+        return round(self.subtotal * TAX_RATE, 2)
+
+    @property
+    def total(self):
+        return round(self.subtotal + self.tax, 2)
+
+    def lines(self):
+        return list(self._lines.values())
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __len__(self):
+        return len(self._lines)
+
+    def to_json(self):
+        """Compact [[item_id, quantity, price], ...] form kept on the order record"""
+        return json.dumps([[line["item_id"], line["quantity"], line["price"]] for line in self._lines.values()],
+                          separators=(",", ":"))
@@ -0,0 +1,157 @@
+import argparse
+import os
+
+from momo_kiosk_db import connect
+
+# ======================
+# CHANGE DATA CAPTURE
+# ======================
+
+# Triggers append one row to cdc_log for every insert, update and delete on
+# the tracked tables, in the same transaction as the change. seq comes from
+# AUTOINCREMENT, so it only ever grows, even after old rows are pruned.
+# Consumers keep a checkpoint (the last seq they handled) and read on from
+# there instead of rescanning the tables. Until the first consumer saves a
+# checkpoint the triggers log nothing, so a kiosk without one (no pyarrow,
+# hence no snapshot exporter) does not grow the log forever; a consumer
+# starts from a full read of the tables anyway. Only tables a consumer
+# reads are tracked: the snapshot exporter follows orders, so customer,
+# menu and stock edits stay out of the log until something needs them.
+CDC_TABLES = {
+    "orders": "id",
+}
+CDC_BATCH = int(os.environ.get("MOMO_CDC_BATCH", 1000))
+
+INSERT, UPDATE, DELETE = "I", "U", "D"
+
+
+def create_cdc_tables(conn):
+    """Create the change log, consumer checkpoints and the triggers that fill the log"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS cdc_log
+                    (seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                     table_name TEXT NOT NULL,
+                     op TEXT NOT NULL CHECK (op IN ('I', 'U', 'D')),
+                     row_id INTEGER NOT NULL,
+                     changed_at TEXT DEFAULT CURRENT_TIMESTAMP)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS cdc_checkpoints
+                    (consumer TEXT PRIMARY KEY,
+                     seq INTEGER NOT NULL DEFAULT 0)''')
+    _create_triggers(conn)
+
+
+_EVENTS = ((INSERT, "INSERT", "NEW"), (UPDATE, "UPDATE", "NEW"), (DELETE, "DELETE", "OLD"))
+
+
+def _create_triggers(conn):
+    for table, key in CDC_TABLES.items():
+        for op, event, row in _EVENTS:
+            conn.execute(f'''CREATE TRIGGER IF NOT EXISTS cdc_{table}_{event.lower()}
+                             AFTER {event} ON {table}
+                             WHEN EXISTS (SELECT 1 FROM cdc_checkpoints)
+                             BEGIN
+                                 INSERT INTO cdc_log (table_name, op, row_id) VALUES ('{table}', '{op}', {row}.{key});
+                             END''')
+
+
+def gate_cdc_triggers(conn):
+    """Replace triggers from before the WHEN clause, and drop what they logged with no one to read it"""
+    for table in CDC_TABLES:
+        for _, event, _ in _EVENTS:
+            conn.execute(f"DROP TRIGGER IF EXISTS cdc_{table}_{event.lower()}")
+    _create_triggers(conn)
+    prune_changes(conn)
+
+
+def drop_untracked_triggers(conn):
+    """Drop change triggers on tables no longer in CDC_TABLES, with what they logged"""
+    names = [name for name, table in conn.execute(
+        "SELECT name, tbl_name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'cdc!_%' ESCAPE '!'")
+        if table not in CDC_TABLES]
+    for name in names:
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute(f"DELETE FROM cdc_log WHERE table_name NOT IN ({', '.join('?' * len(CDC_TABLES))})",
+                 list(CDC_TABLES))
+
+
+def latest_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cdc_log").fetchone()[0]
+
+
+def read_changes(conn, after, tables=None, limit=CDC_BATCH):
+    """Return up to limit changes with seq > after as [(seq, table_name, op, row_id), ...], oldest first"""
+    query = "SELECT seq, table_name, op, row_id FROM cdc_log WHERE seq > ?"
+    params = [after]
+    if tables:
+        query += f" AND table_name IN ({', '.join('?' * len(tables))})"
+        params += list(tables)
+    query += " ORDER BY seq LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def changed_rows(changes):
+    """Collapse a list of changes into {table_name: {row_id: last op}}"""
+    rows = {}
+    for _, table, op, row_id in changes:
+        rows.setdefault(table, {})[row_id] = op
+    return rows
+
+
+def get_checkpoint(conn, consumer):
+    row = conn.execute("SELECT seq FROM cdc_checkpoints WHERE consumer = ?", (consumer,)).fetchone()
+    return row[0] if row else 0
+
+
+def save_checkpoint(conn, consumer, seq):
+    """Record that consumer has handled every change up to seq; the caller commits"""
+    conn.execute("""
+        INSERT INTO cdc_checkpoints (consumer, seq) VALUES (?, ?)
+        ON CONFLICT(consumer) DO UPDATE SET seq = excluded.seq
+    """, (consumer, seq))
+
+
+def consume(conn, consumer, handler, tables=None, limit=CDC_BATCH):
+    """Feed every change past consumer's checkpoint to handler(changes) in batches, returns the number handled
+
+    Each batch is handled and checkpointed in one transaction, so a handler
+    that writes to this database applies every change exactly once. A
+    handler that writes elsewhere should be safe to run twice on a batch.
+    """
+    handled = 0
+    while True:
+        with conn:
+            changes = read_changes(conn, get_checkpoint(conn, consumer), tables, limit)
+            if not changes:
+                break
+            handler(changes)
+            save_checkpoint(conn, consumer, changes[-1][0])
+        handled += len(changes)
+    return handled
+
+
+def prune_changes(conn):
+    """Delete changes every consumer has handled, returns the number deleted; the caller commits
+
+    With no consumer registered, nothing will ever read the log, so all of it goes.
+    """
+    low = conn.execute("SELECT MIN(seq) FROM cdc_checkpoints").fetchone()[0]
+    if low is None:
+        return conn.execute("DELETE FROM cdc_log").rowcount
+    return conn.execute("DELETE FROM cdc_log WHERE seq <= ?", (low,)).rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show or prune the change log")
+    parser.add_argument("--db", default="food_hub.db")
+    parser.add_argument("command", choices=["status", "prune"])
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "prune":
+        with conn:
+            print(f"Pruned {prune_changes(conn)} changes")
+    else:
+        print(f"Latest change: {latest_seq(conn)}")
+        for consumer, seq in conn.execute("SELECT consumer, seq FROM cdc_checkpoints ORDER BY consumer"):
+            print(f"  {consumer}: {seq}")
+    conn.close()
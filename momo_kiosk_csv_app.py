@@ -8,80 +8,19 @@ import shutil
 import os
 import plotly.express as px
 from pathlib import Path
+from momo_kiosk_db import connect, session_connection
+from momo_kiosk_backup import BackupJob
+from momo_kiosk_schema import ensure_schema, FOOD_HUB_MIGRATIONS
 
 # Database Configuration
 DB_FILE = "food_hub.db"
 BACKUP_DIR = "backups/"
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
-# Initialize database with enhanced schema
+# Migrations run once per process; new sessions only open a connection
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Create tables with improved schema
-    c.execute('''CREATE TABLE IF NOT EXISTS orders
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  customer_id INTEGER,
-                  items TEXT,
-                  subtotal REAL,
-                  tax REAL,
-                  discount REAL,
-                  total REAL,
-                  payment_mode TEXT,
-                  status TEXT DEFAULT 'Pending',
-                  staff_id INTEGER,
-                  notes TEXT,
-                  FOREIGN KEY(customer_id) REFERENCES customers(id),
-                  FOREIGN KEY(staff_id) REFERENCES users(id))''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS customers
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT,
-                  phone TEXT UNIQUE,
-                  email TEXT,
-                  address TEXT,
-                  credit_balance REAL DEFAULT 0,
-                  total_orders INTEGER DEFAULT 0,
-                  total_spent REAL DEFAULT 0,
-                  join_date TEXT,
-                  last_order_date TEXT,
-                  is_active INTEGER DEFAULT 1)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS menu
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  category TEXT,
-                  item TEXT UNIQUE,
-                  description TEXT,
-                  price REAL,
-                  cost REAL,
-                  stock INTEGER,
-                  min_stock INTEGER DEFAULT 5,
-                  is_available INTEGER DEFAULT 1)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT UNIQUE,
-                  password TEXT,
-                  full_name TEXT,
-                  role TEXT,
-                  is_active INTEGER DEFAULT 1,
-                  last_login TEXT)''')
-    
-    # Insert default admin if not exists
-    c.execute("SELECT 1 FROM users WHERE username='admin'")
-    if not c.fetchone():
-        c.execute("INSERT INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)", 
-                 ("admin", hash_password("admin123"), "System Administrator", "Admin"))
-    
-    # Create indexes for better performance
-    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(timestamp)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_menu_category ON menu(category)")
-    
-    conn.commit()
-    return conn
+    ensure_schema(DB_FILE, FOOD_HUB_MIGRATIONS)
+    return connect(DB_FILE)
 
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
@@ -98,8 +37,8 @@ def authenticate(username, password):
         return result[0], result[2]  # Return user_id and role
     return None, None
 
-# Initialize database
-conn = init_db()
+# Initialize database (one WAL connection per session)
+conn = session_connection(st.session_state, init_db, db_file=DB_FILE)
 
 # Session state management
 def init_session_state():
@@ -146,10 +85,13 @@ if not st.session_state.current_user_id:
 # ======================
 
 def create_backup():
-    """Create a timestamped backup of the database"""
+    """Create a timestamped backup of the database with the online backup API"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_file = f"{BACKUP_DIR}foodhub_backup_{timestamp}.db"
-    shutil.copy2(DB_FILE, backup_file)
+    job = BackupJob(DB_FILE, backup_file).start()
+    job.wait()
+    if job.error:
+        raise job.error
     return backup_file
 
 def get_menu_items(category_filter=None, available_only=True):
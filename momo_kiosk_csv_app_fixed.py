@@ -1,87 +1,45 @@
 import streamlit as st
 import pandas as pd
 import sqlite3
-from datetime import datetime, timedelta
-import time
-import hashlib
-import shutil
+from datetime import datetime
 import os
-import ast
-import plotly.express as px
-from pathlib import Path
+import io
+import csv
+import zipfile
+from momo_kiosk_orders import save_order, OutOfStockError, OrderWriter
+from momo_kiosk_cart import Cart, TAX_RATE
+from momo_kiosk_backup import ChainBackupJob, list_backups, restore_backup, delete_backup
+from momo_kiosk_customers import search_customers, list_customers_page
+from momo_kiosk_db import (connect, session_connection, run_with_retry, get_generation,
+                           bump_data_version, get_data_versions)
+from momo_kiosk_schema import ensure_schema, hash_password, FOOD_HUB_MIGRATIONS
+from momo_kiosk_menu import (get_menu_items, get_categories, get_low_stock, get_inventory,
+                              get_outlet_stock_summary, STOCK_FILTERS)
+from momo_kiosk_customer_import import CUSTOMER_COLUMNS, import_customers, read_customer_file
+from momo_kiosk_menu_csv import MENU_CSV_COLUMNS, read_menu_csv, diff_menu, import_menu, iter_menu_csv
+from momo_kiosk_locations import (KIOSK_LOCATION, DEFAULT_LOCATION_ID, get_locations, get_location_id,
+                                  add_location, ensure_stock_rows, set_stock)
+from momo_kiosk_profiler import PROFILER, profile_tab, explain_query_plan, full_scans
+from momo_kiosk_sync import SyncWorker, CENTRAL_DIR, record_customer, record_credit
 
 # Database Configuration
 DB_FILE = "food_hub.db"
 BACKUP_DIR = "backups/"
+# Route order submissions through one background writer that group-commits them
+GROUP_COMMIT = os.environ.get("MOMO_GROUP_COMMIT", "0") == "1"
 os.makedirs(BACKUP_DIR, exist_ok=True)
 
-def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS orders
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  customer_id INTEGER,
-                  items TEXT,
-                  subtotal REAL,
-                  tax REAL,
-                  discount REAL,
-                  total REAL,
-                  payment_mode TEXT,
-                  status TEXT DEFAULT 'Pending',
-                  staff_id INTEGER,
-                  notes TEXT,
-                  FOREIGN KEY(customer_id) REFERENCES customers(id),
-                  FOREIGN KEY(staff_id) REFERENCES users(id))''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS customers
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  name TEXT,
-                  phone TEXT UNIQUE,
-                  email TEXT,
-                  address TEXT,
-                  credit_balance REAL DEFAULT 0,
-                  total_orders INTEGER DEFAULT 0,
-                  total_spent REAL DEFAULT 0,
-                  join_date TEXT,
-                  last_order_date TEXT,
-                  is_active INTEGER DEFAULT 1)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS menu
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  category TEXT,
-                  item TEXT UNIQUE,
-                  description TEXT,
-                  price REAL,
-                  cost REAL,
-                  stock INTEGER,
-                  min_stock INTEGER DEFAULT 5,
-                  is_available INTEGER DEFAULT 1)''')
-    
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  username TEXT UNIQUE,
-                  password TEXT,
-                  full_name TEXT,
-                  role TEXT,
-                  is_active INTEGER DEFAULT 1,
-                  last_login TEXT)''')
-    
-    c.execute("SELECT 1 FROM users WHERE username='admin'")
-    if not c.fetchone():
-        c.execute("INSERT INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)", 
-                 ("admin", hash_password("admin123"), "System Administrator", "Admin"))
-    
-    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(timestamp)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_menu_category ON menu(category)")
-    
-    conn.commit()
-    return conn
+DIRECTORY_SORT_LABELS = {
+    "name": "Name",
+    "total_spent": "Total spent",
+    "credit_balance": "Credit balance",
+    "last_order_date": "Last order"
+}
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+# Migrations run once per process; new sessions only open a connection
+def init_db():
+    ensure_schema(DB_FILE, FOOD_HUB_MIGRATIONS)
+    return connect(DB_FILE)
 
 def authenticate(username, password):
     c = conn.cursor()
@@ -94,18 +52,24 @@ def authenticate(username, password):
         return result[0], result[2]
     return None, None
 
-conn = init_db()
+conn = session_connection(st.session_state, init_db, db_file=DB_FILE)
 
 def init_session_state():
     defaults = {
-        'current_order': [],
+        'current_order': Cart(),
         'current_customer': None,
         'current_user_id': None,
         'current_user_role': None,
         'current_user_name': None,
         'edit_item': None,
         'edit_customer': None,
-        'edit_user': None
+        'edit_user': None,
+        'customer_page_view': None,
+        'customer_page_cursors': [None],
+        'backup_job': None,
+        'backup_message': None,
+        'order_message': None,
+        'location_id': None
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -134,73 +98,77 @@ if not st.session_state.current_user_id:
                 st.error("Invalid credentials")
     st.stop()
 
-def create_backup():
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_file = f"{BACKUP_DIR}foodhub_backup_{timestamp}.db"
-    shutil.copy2(DB_FILE, backup_file)
-    return backup_file
+def start_backup():
+    name = f"foodhub_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return ChainBackupJob(DB_FILE, BACKUP_DIR, name).start()
 
-def get_menu_items(category_filter=None, available_only=True):
-    query = "SELECT * FROM menu WHERE item != 'Sample Item'"
-    conditions = []
-    params = []
-    
-    if available_only:
-        conditions.append("is_available = 1")
-    if category_filter:
-        conditions.append("category = ?")
-        params.append(category_filter)
-    
-    if conditions:
-        query += " AND " + " AND ".join(conditions)
-    
-    return pd.read_sql(query, conn, params=params if params else None)
+@st.fragment(run_every=1)
+def backup_progress():
+    job = st.session_state.backup_job
+    if job is None:
+        return
+    if not job.done:
+        st.progress(job.progress, text=f"Backup {job.stage}... {job.progress:.0%} ({job.duration:.1f}s)")
+        return
+    if job.error:
+        st.session_state.backup_message = ("error", f"Backup failed after {job.duration:.1f}s: {job.error}")
+    else:
+        manifest = job.manifest
+        st.session_state.backup_message = ("success", f"{manifest['kind'].title()} backup {manifest['name']} created "
+                                                      f"and verified in {job.duration:.1f}s")
+    st.session_state.backup_job = None
+    st.rerun()
+
+# Cached objects are shared by every session and must be treated as read-only;
+# the version argument changes whenever a write path bumps the data version,
+# the generation whenever a backup is restored.
+@st.cache_resource(max_entries=16)
+def load_menu_items(generation, version, location_id):
+    return get_menu_items(conn, available_only=True, location_id=location_id)
+
+@st.cache_resource(max_entries=256)
+def load_customer_matches(generation, version, query):
+    return [(c['id'], f"{c['name']} ({c['phone']})") for c in search_customers(conn, query, limit=10)]
+
+@st.cache_resource
+def get_order_writer():
+    return OrderWriter(DB_FILE)
+
+# Ships this kiosk's outbox to the central share, when one is configured
+@st.cache_resource
+def get_sync_worker():
+    return SyncWorker(DB_FILE, CENTRAL_DIR).start()
 
-def process_order(customer_id, items, payment_mode, notes=""):
+def process_order(customer_id, cart, payment_mode, notes=""):
     try:
-        subtotal = sum(item['total'] for item in items)
-        tax = subtotal * 0.1
-        total = subtotal + tax
-        
+        items = cart.lines()
         order_data = {
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "customer_id": customer_id,
-            "items": str(items),
-            "subtotal": subtotal,
-            "tax": tax,
+            "items": cart.to_json(),
+            "subtotal": cart.subtotal,
+            "tax": cart.tax,
             "discount": 0,
-            "total": total,
+            "total": cart.total,
             "payment_mode": payment_mode,
             "status": "Completed",
             "staff_id": st.session_state.current_user_id,
-            "notes": notes
+            "notes": notes,
+            "location_id": st.session_state.location_id
         }
         
-        with conn:
-            order_df = pd.DataFrame([order_data])
-            order_df.to_sql('orders', conn, if_exists='append', index=False)
-            
-            for item in items:
-                conn.execute("UPDATE menu SET stock = stock - ? WHERE item = ?", 
-                           (item['quantity'], item['item']))
-            
-            if customer_id and customer_id > 0:
-                conn.execute("""
-                    UPDATE customers 
-                    SET total_orders = total_orders + 1,
-                        total_spent = total_spent + ?,
-                        last_order_date = ?
-                    WHERE id = ?
-                """, (total, order_data['timestamp'], customer_id))
-            
-            if payment_mode == "Credit" and customer_id:
-                conn.execute("""
-                    UPDATE customers 
-                    SET credit_balance = credit_balance + ?
-                    WHERE id = ?
-                """, (total, customer_id))
+        if GROUP_COMMIT:
+            # No timeout: the writer resolves every order, committed or failed,
+            # so giving up early would report an order that may still commit
+            get_order_writer().submit(order_data, items).result()
+        else:
+            run_with_retry(save_order, conn, order_data, items)
         
         return True
+    except OutOfStockError as e:
+        st.error("Order not placed - not enough stock:\n" + "\n".join(
+            f"- {item}: {available} left, {requested} requested" for item, available, requested in e.shortages))
+        return False
     except Exception as e:
         st.error(f"Error processing order: {str(e)}")
         conn.rollback()
@@ -209,15 +177,29 @@ def process_order(customer_id, items, payment_mode, notes=""):
 def order_tab():
     st.header("New Order")
     
-    customers = pd.read_sql("SELECT id, name, phone FROM customers WHERE is_active = 1 ORDER BY name", conn)
+    if st.session_state.order_message:
+        st.toast(st.session_state.order_message)
+        st.session_state.order_message = None
+    
+    generation = get_generation(DB_FILE)
+    versions = get_data_versions(conn)
+    customer_query = st.text_input("Find Customer", placeholder="Type a name, phone or email")
+    
     customer_options = {0: "Walk-in Customer"}
-    customer_options.update({row['id']: f"{row['name']} ({row['phone']})" for _, row in customers.iterrows()})
+    if st.session_state.current_customer:
+        customer_options.update([st.session_state.current_customer])
+    if customer_query:
+        customer_options.update(load_customer_matches(generation, versions.get("customers", 0), customer_query.strip()))
     
     selected_customer = st.selectbox(
         "Select Customer",
         options=list(customer_options.keys()),
+        index=1 if st.session_state.current_customer else 0,
         format_func=lambda x: customer_options[x]
     )
+    st.session_state.current_customer = (
+        (selected_customer, customer_options[selected_customer]) if selected_customer else None
+    )
     
     with st.expander("Add New Customer", expanded=False):
         with st.form("quick_customer_form"):
@@ -227,9 +209,11 @@ def order_tab():
             if st.form_submit_button("Save Customer"):
                 if name and phone:
                     try:
-                        conn.execute(
+                        customer_id = conn.execute(
                             "INSERT INTO customers (name, phone, email, join_date) VALUES (?, ?, ?, ?)",
-                            (name, phone, email, datetime.now().strftime("%Y-%m-%d")))
+                            (name, phone, email, datetime.now().strftime("%Y-%m-%d"))).lastrowid
+                        record_customer(conn, customer_id)
+                        bump_data_version(conn, "customers")
                         conn.commit()
                         st.success("Customer added successfully!")
                         st.rerun()
@@ -238,10 +222,29 @@ def order_tab():
                 else:
                     st.error("Name and phone are required fields")
     
-    menu_df = get_menu_items(available_only=True)
+    order_panel()
+
+def remove_from_cart(item_id):
+    st.session_state.current_order.remove(item_id)
+
+def clear_cart():
+    st.session_state.current_order.clear()
+
+# The menu grid and cart summary share one fragment, so adding an item
+# reruns just the two of them and the summary shows it in the same run.
+# The sidebar cart is its own fragment and only shows outside the Orders
+# section, where nothing but its Clear button can change the cart.
+@st.fragment
+def order_panel():
+    menu_grid()
+    cart_summary()
+
+def menu_grid():
+    menu_df = load_menu_items(get_generation(DB_FILE), get_data_versions(conn).get("menu", 0),
+                              st.session_state.location_id)
     categories = menu_df['category'].unique()
     
-    if not categories:
+    if len(categories) == 0:
         st.warning("No menu categories available. Please add categories in Inventory Management.")
         return
     
@@ -271,60 +274,61 @@ def order_tab():
                 )
                 
                 if qty > 0 and st.button("Add to Order", key=f"add_{item['id']}"):
-                    order_item = {
-                        "item": item['item'],
-                        "price": item['price'],
-                        "quantity": qty,
-                        "total": item['price'] * qty
-                    }
-                    st.session_state.current_order.append(order_item)
-                    st.success(f"Added {qty} × {item['item']}")
-                    time.sleep(0.3)
-                    st.rerun()
+                    st.session_state.current_order.add(item['id'], item['item'], item['price'], qty)
+                    st.toast(f"Added {qty} × {item['item']}")
+
+def cart_summary():
+    cart = st.session_state.current_order
+    if not cart:
+        return
     
-    if st.session_state.current_order:
-        st.subheader("Order Summary")
-        order_df = pd.DataFrame(st.session_state.current_order)
-        
-        for i, item in enumerate(st.session_state.current_order):
-            cols = st.columns([4, 1, 1, 1])
-            cols[0].write(f"{item['quantity']} × {item['item']}")
-            cols[1].write(f"₹{item['price']}")
-            cols[2].write(f"₹{item['total']}")
-            if cols[3].button("Remove", key=f"remove_{i}"):
-                st.session_state.current_order.pop(i)
-                st.rerun()
-        
-        subtotal = order_df['total'].sum()
-        tax = subtotal * 0.1
-        total = subtotal + tax
-        
-        st.markdown(f"""
-        **Subtotal:** ₹{subtotal:.2f}  
-        **Tax (10%):** ₹{tax:.2f}  
-        **Total:** ₹{total:.2f}
-        """)
-        
+    st.subheader("Order Summary")
+    
+    for line in cart:
+        cols = st.columns([4, 1, 1, 1])
+        cols[0].write(f"{line['quantity']} × {line['item']}")
+        cols[1].write(f"₹{line['price']}")
+        cols[2].write(f"₹{line['total']}")
+        cols[3].button("Remove", key=f"remove_{line['item_id']}", on_click=remove_from_cart, args=(line['item_id'],))
+    
+    st.markdown(f"""
+    **Subtotal:** ₹{cart.subtotal:.2f}  
+    **Tax ({TAX_RATE:.0%}):** ₹{cart.tax:.2f}  
+    **Total:** ₹{cart.total:.2f}
+    """)
+    
+    # A form keeps the payment choice and notes from rerunning anything until submit
+    with st.form("checkout_form", border=False):
         payment_mode = st.radio("Payment Method", ["Cash", "Credit", "Online", "Card"])
         notes = st.text_area("Order Notes")
-        
-        if st.button("Submit Order", type="primary"):
-            if payment_mode == "Credit" and selected_customer == 0:
-                st.error("Credit payment requires selecting a customer")
-            else:
-                if process_order(selected_customer if selected_customer != 0 else None, 
-                               st.session_state.current_order, 
-                               payment_mode,
-                               notes):
-                    st.success("Order submitted successfully!")
-                    st.session_state.current_order = []
-                    time.sleep(1)
-                    st.rerun()
+        submitted = st.form_submit_button("Submit Order", type="primary")
+    
+    if submitted:
+        customer_id = st.session_state.current_customer[0] if st.session_state.current_customer else None
+        if payment_mode == "Credit" and not customer_id:
+            st.error("Credit payment requires selecting a customer")
+        elif process_order(customer_id, cart, payment_mode, notes):
+            cart.clear()
+            st.session_state.current_customer = None
+            st.session_state.order_message = "Order submitted successfully!"
+            st.rerun()
+
+@st.fragment
+def sidebar_cart():
+    cart = st.session_state.current_order
+    if not cart:
+        return
+    
+    st.subheader("Current Order")
+    for line in cart:
+        st.write(f"{line['quantity']} × {line['item']} - ₹{line['total']}")
+    st.markdown(f"**Total:** ₹{cart.total:.2f}")
+    st.button("Clear Order", on_click=clear_cart)
 
 def customers_tab():
     st.header("Customer Management")
     
-    tab1, tab2 = st.tabs(["Customer Directory", "Customer Details"])
+    tab1, tab2, tab3 = st.tabs(["Customer Directory", "Customer Details", "Import"])
     
     with tab1:
         st.subheader("All Customers")
@@ -335,24 +339,38 @@ def customers_tab():
         with col2:
             show_inactive = st.checkbox("Show inactive customers")
         
-        query = "SELECT * FROM customers"
-        conditions = []
-        params = []
-        
+        next_cursor = None
         if search_query:
-            conditions.append("(name LIKE ? OR phone LIKE ?)")
-            params.extend([f"%{search_query}%", f"%{search_query}%"])
-        if not show_inactive:
-            conditions.append("is_active = 1")
-        
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        query += " ORDER BY name"
-        
-        customers = pd.read_sql(query, conn, params=params)
+            customers = search_customers(conn, search_query, limit=50, include_inactive=show_inactive)
+            if len(customers) == 50:
+                st.caption("Showing the 50 best matches - refine the search to narrow it down")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                sort_by = st.selectbox(
+                    "Sort by",
+                    list(DIRECTORY_SORT_LABELS.keys()),
+                    format_func=lambda x: DIRECTORY_SORT_LABELS[x]
+                )
+            with col2:
+                page_size = st.selectbox("Customers per page", [25, 50, 100])
+            
+            # Cursors of the pages before the current one; reset when the view changes
+            view = (sort_by, page_size, show_inactive)
+            if st.session_state.customer_page_view != view:
+                st.session_state.customer_page_view = view
+                st.session_state.customer_page_cursors = [None]
+            
+            customers, next_cursor = list_customers_page(
+                conn,
+                sort=sort_by,
+                after=st.session_state.customer_page_cursors[-1],
+                page_size=page_size,
+                include_inactive=show_inactive
+            )
         
-        if not customers.empty:
-            for _, customer in customers.iterrows():
+        if customers:
+            for customer in customers:
                 with st.expander(f"{customer['name']} - {customer['phone']}"):
                     cols = st.columns([3, 1, 1, 1])
                     cols[0].write(f"**Orders:** {customer['total_orders']}")
@@ -363,6 +381,17 @@ def customers_tab():
                         st.rerun()
         else:
             st.info("No customers found")
+        
+        if not search_query:
+            page = len(st.session_state.customer_page_cursors)
+            cols = st.columns([1, 2, 1])
+            if cols[0].button("Previous", disabled=page == 1):
+                st.session_state.customer_page_cursors.pop()
+                st.rerun()
+            cols[1].write(f"Page {page}")
+            if cols[2].button("Next", disabled=next_cursor is None):
+                st.session_state.customer_page_cursors.append(next_cursor)
+                st.rerun()
     
     with tab2:
         if st.session_state.edit_customer:
@@ -403,34 +432,70 @@ def customers_tab():
                                     is_active = ?
                                 WHERE id = ?
                             """, (name, phone, email, address, credit, int(is_active), customer['id']))
+                            record_customer(conn, int(customer['id']), previous_phone=customer['phone'])
+                            record_credit(conn, phone, credit - float(customer['credit_balance']))
                         else:
-                            conn.execute("""
+                            customer_id = conn.execute("""
                                 INSERT INTO customers 
                                 (name, phone, email, address, credit_balance, join_date, is_active)
                                 VALUES (?, ?, ?, ?, ?, ?, ?)
-                            """, (name, phone, email, address, credit, datetime.now().strftime("%Y-%m-%d"), int(is_active)))
+                            """, (name, phone, email, address, credit, datetime.now().strftime("%Y-%m-%d"), int(is_active))).lastrowid
+                            record_customer(conn, customer_id)
+                            record_credit(conn, phone, credit)
                         
+                        bump_data_version(conn, "customers")
                         conn.commit()
                         st.session_state.edit_customer = None
                         st.success("Customer saved successfully!")
                         st.rerun()
                     except sqlite3.IntegrityError:
                         st.error("A customer with this phone number already exists")
+    
+    with tab3:
+        st.subheader("Import Customers")
+        
+        if st.session_state.current_user_role not in ("Admin", "Manager"):
+            st.info("Only admins and managers can import customers")
+        else:
+            st.caption("A CSV or Excel file with columns " + ", ".join(CUSTOMER_COLUMNS) + ". Customers are "
+                       "matched on phone number; blank cells keep the current value.")
+            upload = st.file_uploader("Customer File", type=["csv", "xlsx"], key="customer_file")
+            if upload is not None and st.button("Import Customers", type="primary"):
+                with st.spinner("Importing customers..."):
+                    try:
+                        report = import_customers(conn, read_customer_file(upload, upload.name))
+                    except (RuntimeError, UnicodeDecodeError, ValueError, KeyError, csv.Error,
+                            zipfile.BadZipFile) as e:
+                        st.error(f"Could not read {upload.name}: {e}")
+                        report = None
+                
+                if report:
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Inserted", report["inserted"])
+                    col2.metric("Updated", report["updated"])
+                    col3.metric("Unchanged", report["unchanged"])
+                    col4.metric("Rejected", report["rejected"])
+                    if report["duplicates"]:
+                        st.caption(f"{report['duplicates']} lines repeated a phone number; the last one was used")
+                    if report["errors"]:
+                        st.dataframe(pd.DataFrame(report["errors"], columns=["line", "problem"]), hide_index=True,
+                                     use_container_width=True)
+                        if report["rejected"] > len(report["errors"]):
+                            st.caption(f"Showing the first {len(report['errors'])} rejected lines")
 
 def inventory_tab():
     st.header("Inventory Management")
     
-    categories = pd.read_sql("SELECT DISTINCT category FROM menu WHERE item != 'Sample Item'", conn)['category'].tolist()
+    categories = get_categories(conn)
+    location_id = st.session_state.location_id
+    outlet = dict(get_locations(conn)).get(location_id, "")
     
-    tab1, tab2 = st.tabs(["Inventory Dashboard", "Category & Item Management"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Inventory Dashboard", "Category & Item Management", "Outlets", "Import/Export"])
     
     with tab1:
-        st.subheader("Current Inventory Status")
+        st.subheader(f"Current Inventory Status - {outlet}")
         
-        low_stock = pd.read_sql(
-            "SELECT * FROM menu WHERE stock <= min_stock AND item != 'Sample Item' ORDER BY stock ASC", 
-            conn
-        )
+        low_stock = get_low_stock(conn, location_id)
         if not low_stock.empty:
             with st.container(border=True):
                 st.warning(f"{len(low_stock)} items below minimum stock level")
@@ -448,27 +513,16 @@ def inventory_tab():
             with col2:
                 filter_stock = st.selectbox(
                     "Filter by Stock Level",
-                    ["All", "Low Stock (< min)", "Out of Stock", "In Stock"],
+                    list(STOCK_FILTERS.keys()),
                     key="stock_filter"
                 )
             
-            query = "SELECT * FROM menu WHERE item != 'Sample Item'"
-            params = []
-            
-            if filter_category != "All Categories":
-                query += " AND category = ?"
-                params.append(filter_category)
-            
-            if filter_stock == "Low Stock (< min)":
-                query += " AND stock <= min_stock AND stock > 0"
-            elif filter_stock == "Out of Stock":
-                query += " AND stock = 0"
-            elif filter_stock == "In Stock":
-                query += " AND stock > 0"
-            
-            query += " ORDER BY category, item"
-            
-            inventory = pd.read_sql(query, conn, params=params if params else None)
+            inventory = get_inventory(
+                conn,
+                category=filter_category if filter_category != "All Categories" else None,
+                stock_filter=filter_stock,
+                location_id=location_id
+            )
             
             st.dataframe(
                 inventory,
@@ -507,6 +561,7 @@ def inventory_tab():
                                 "INSERT INTO menu (category, item, price, stock, is_available) VALUES (?, ?, ?, ?, ?)",
                                 (new_category, "Sample Item", 0, 0, 0)
                             )
+                            bump_data_version(conn, "menu")
                             conn.commit()
                             st.success(f"Category '{new_category}' added successfully!")
                             st.rerun()
@@ -532,7 +587,12 @@ def inventory_tab():
                         
                         if cols[1].button("Delete", key=f"del_{category}", disabled=has_items,
                                          help="Cannot delete categories with items"):
+                            conn.execute(
+                                "DELETE FROM location_stock WHERE menu_item_id IN (SELECT id FROM menu WHERE category = ?)",
+                                (category,)
+                            )
                             conn.execute("DELETE FROM menu WHERE category = ?", (category,))
+                            bump_data_version(conn, "menu")
                             conn.commit()
                             st.success(f"Category '{category}' deleted")
                             st.rerun()
@@ -541,11 +601,12 @@ def inventory_tab():
             st.subheader("Manage Items")
             
             if st.session_state.edit_item:
-                item = pd.read_sql(
-                    "SELECT * FROM menu WHERE id = ?", 
-                    conn, 
-                    params=(st.session_state.edit_item,)
-                ).iloc[0]
+                item = pd.read_sql("""
+                    SELECT m.id, m.category, m.item, m.description, m.price, m.cost, s.stock, s.min_stock, m.is_available
+                    FROM menu m
+                    JOIN location_stock s ON s.menu_item_id = m.id AND s.location_id = ?
+                    WHERE m.id = ?
+                """, conn, params=(location_id, st.session_state.edit_item)).iloc[0]
                 
                 st.write(f"Editing: {item['item']}")
             else:
@@ -563,8 +624,9 @@ def inventory_tab():
                 description = st.text_area("Description", value=item['description'] if item else "")
                 price = st.number_input("Price (₹)", min_value=0.0, step=0.5, value=item['price'] if item else 0.0)
                 cost = st.number_input("Cost (₹)", min_value=0.0, step=0.5, value=item['cost'] if item else 0.0)
-                stock = st.number_input("Stock", min_value=0, value=item['stock'] if item else 0)
-                min_stock = st.number_input("Minimum Stock", min_value=0, value=item['min_stock'] if item else 5)
+                stock = st.number_input(f"Stock at {outlet}", min_value=0, value=item['stock'] if item else 0)
+                min_stock = st.number_input(f"Minimum Stock at {outlet}", min_value=0,
+                                            value=item['min_stock'] if item else 5)
                 
                 is_available = st.checkbox("Available", value=bool(item['is_available']) if item else True)
                 
@@ -574,6 +636,7 @@ def inventory_tab():
                     else:
                         try:
                             if item is not None:
+                                item_id = int(item['id'])
                                 conn.execute("""
                                     UPDATE menu SET
                                         category = ?,
@@ -581,18 +644,20 @@ def inventory_tab():
                                         description = ?,
                                         price = ?,
                                         cost = ?,
-                                        stock = ?,
-                                        min_stock = ?,
                                         is_available = ?
                                     WHERE id = ?
-                                """, (category, item_name, description, price, cost, stock, min_stock, int(is_available), item['id']))
+                                """, (category, item_name, description, price, cost, int(is_available), item_id))
                             else:
-                                conn.execute("""
+                                item_id = conn.execute("""
                                     INSERT INTO menu 
-                                    (category, item, description, price, cost, stock, min_stock, is_available)
-                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                                """, (category, item_name, description, price, cost, stock, min_stock, int(is_available)))
+                                    (category, item, description, price, cost, min_stock, is_available)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                                """, (category, item_name, description, price, cost, min_stock, int(is_available))).lastrowid
+                                # Other outlets start without any
+                                ensure_stock_rows(conn, item_id)
+                            set_stock(conn, location_id, item_id, stock, min_stock)
                             
+                            bump_data_version(conn, "menu")
                             conn.commit()
                             st.session_state.edit_item = None
                             st.success("Item saved successfully!")
@@ -605,141 +670,101 @@ def inventory_tab():
                     st.session_state.edit_item = None
                     st.rerun()
                 if st.button("Delete Item", type="secondary"):
+                    conn.execute("DELETE FROM location_stock WHERE menu_item_id = ?", (st.session_state.edit_item,))
                     conn.execute("DELETE FROM menu WHERE id = ?", (st.session_state.edit_item,))
+                    bump_data_version(conn, "menu")
                     conn.commit()
                     st.session_state.edit_item = None
                     st.success("Item deleted")
                     st.rerun()
-
-def reports_tab():
-    st.header("Sales Analytics")
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        start_date = st.date_input("Start Date", datetime.now() - timedelta(days=30))
-    with col2:
-        end_date = st.date_input("End Date", datetime.now())
-    
-    start_str = start_date.strftime("%Y-%m-%d")
-    end_str = end_date.strftime("%Y-%m-%d")
-    
-    orders = pd.read_sql(
-        "SELECT * FROM orders WHERE date(timestamp) BETWEEN ? AND ?",
-        conn,
-        params=(start_str, end_str)
-    )
     
-    if orders.empty:
-        st.info("No orders found in selected date range")
-        return
-    
-    orders['timestamp'] = pd.to_datetime(orders['timestamp'])
-    orders['date'] = orders['timestamp'].dt.date
-    orders['day_of_week'] = orders['timestamp'].dt.day_name()
-    orders['hour'] = orders['timestamp'].dt.hour
-    
-    tab1, tab2, tab3, tab4 = st.tabs(["Summary", "Trends", "Products", "Customers"])
-    
-    with tab1:
-        st.subheader("Sales Summary")
+    with tab3:
+        st.subheader("Stock by Outlet")
         
-        total_sales = orders['total'].sum()
-        avg_order = orders['total'].mean()
-        order_count = len(orders)
+        summary = get_outlet_stock_summary(conn)
+        st.dataframe(
+            summary,
+            column_config={
+                "outlet": "Outlet",
+                "low_stock": st.column_config.NumberColumn("Low Stock Items"),
+                "out_of_stock": st.column_config.NumberColumn("Out of Stock Items")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
         
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Sales", f"₹{total_sales:,.2f}")
-        col2.metric("Average Order", f"₹{avg_order:,.2f}")
-        col3.metric("Number of Orders", order_count)
-        
-        st.subheader("Payment Methods")
-        payment_counts = orders['payment_mode'].value_counts()
-        fig = px.pie(payment_counts, 
-                     values=payment_counts.values, 
-                     names=payment_counts.index,
-                     title="Payment Method Distribution")
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with tab2:
-        st.subheader("Sales Trends")
-        
-        daily_sales = orders.groupby('date')['total'].sum().reset_index()
-        fig = px.line(daily_sales, x='date', y='total', 
-                     title="Daily Sales Trend", 
-                     labels={'date': 'Date', 'total': 'Total Sales (₹)'})
-        st.plotly_chart(fig, use_container_width=True)
-        
-        dow_sales = orders.groupby('day_of_week')['total'].sum().reindex(
-            ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        ).reset_index()
-        fig = px.bar(dow_sales, x='day_of_week', y='total',
-                    title="Sales by Day of Week",
-                    labels={'day_of_week': 'Day', 'total': 'Total Sales (₹)'})
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with tab3:
-        st.subheader("Product Performance")
-        
-        try:
-            items_list = []
-            for _, order in orders.iterrows():
-                items = ast.literal_eval(order['items'])
-                for item in items:
-                    items_list.append({
-                        'date': order['date'],
-                        'item': item['item'],
-                        'quantity': item['quantity'],
-                        'revenue': item['total']
-                    })
-            
-            if items_list:
-                items_df = pd.DataFrame(items_list)
-                
-                top_items = items_df.groupby('item').agg({
-                    'quantity': 'sum',
-                    'revenue': 'sum'
-                }).sort_values('revenue', ascending=False).head(10)
-                
-                st.write("Top Selling Items")
-                st.dataframe(top_items)
-                
-                item_trends = items_df.groupby(['date', 'item'])['quantity'].sum().unstack()
-                selected_items = st.multiselect(
-                    "Select items to compare",
-                    options=item_trends.columns,
-                    default=list(top_items.index[:3])
-                )
-                
-                if selected_items:
-                    fig = px.line(item_trends[selected_items],
-                                 title="Item Sales Trends",
-                                 labels={'value': 'Quantity Sold', 'date': 'Date'})
-                    st.plotly_chart(fig, use_container_width=True)
-        except:
-            st.warning("Could not parse order items for detailed analysis")
+        if st.session_state.current_user_role == "Admin":
+            with st.form("new_outlet_form"):
+                name = st.text_input("New Outlet Name")
+                if st.form_submit_button("Add Outlet"):
+                    if not name:
+                        st.error("Please enter an outlet name")
+                    else:
+                        try:
+                            add_location(conn, name)
+                            conn.commit()
+                            st.success(f"Outlet '{name}' added; set its stock under Category & Item Management")
+                            st.rerun()
+                        except sqlite3.IntegrityError:
+                            st.error("An outlet with this name already exists")
     
     with tab4:
-        st.subheader("Customer Insights")
+        st.subheader(f"Menu CSV - {outlet}")
+        st.caption("Items are matched on name. Stock and minimum stock are this outlet's; "
+                   "blank cells keep the current value.")
         
-        customer_orders = orders[orders['customer_id'].notnull()]
-        if not customer_orders.empty:
-            top_customers = customer_orders.groupby('customer_id')['total'].agg(['count', 'sum'])\
-                                         .sort_values('sum', ascending=False).head(10)
-            
-            top_customers = top_customers.merge(
-                pd.read_sql("SELECT id, name FROM customers", conn),
-                left_index=True,
-                right_on='id'
+        # download_button needs the whole file up front, so the export is
+        # joined in memory here (the CLI streams it); it is built only when
+        # asked for, not on every rerun of this section
+        if st.button("Prepare Menu CSV"):
+            st.download_button(
+                "Download Menu CSV",
+                "".join(iter_menu_csv(conn, location_id)),
+                file_name=f"menu_{outlet}_{datetime.now().strftime('%Y%m%d')}.csv",
+                mime="text/csv"
             )
+        
+        upload = st.file_uploader("Import Menu CSV", type="csv", key="menu_csv")
+        if upload is not None:
+            try:
+                rows, errors = read_menu_csv(io.TextIOWrapper(upload, encoding="utf-8-sig", newline=""))
+            except UnicodeDecodeError:
+                rows, errors = {}, [(0, "the file is not UTF-8 text")]
             
-            st.write("Top Customers by Spending")
-            st.dataframe(top_customers.rename(columns={
-                'count': 'Orders',
-                'sum': 'Total Spent',
-                'name': 'Customer'
-            }))
-        else:
-            st.info("No customer orders in selected period")
+            if errors:
+                st.error(f"{len(errors)} invalid line(s), fix them and upload again")
+                st.dataframe(pd.DataFrame(errors, columns=["line", "problem"]), hide_index=True,
+                             use_container_width=True)
+            else:
+                # Dry run: show what the import would change before writing anything
+                diff = diff_menu(conn, rows, location_id)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("New Items", len(diff["added"]))
+                col2.metric("Changed Items", len(diff["changed"]))
+                col3.metric("Unchanged", diff["unchanged"])
+                
+                if diff["added"]:
+                    with st.expander("New items"):
+                        st.dataframe(pd.DataFrame(diff["added"], columns=MENU_CSV_COLUMNS), hide_index=True,
+                                     use_container_width=True)
+                if diff["changed"]:
+                    with st.expander("Changes", expanded=True):
+                        st.dataframe(pd.DataFrame(
+                            [(row["item"], column, old, new)
+                             for row, changes in diff["changed"] for column, (old, new) in changes.items()],
+                            columns=["item", "field", "current", "new"]
+                        ), hide_index=True, use_container_width=True)
+                
+                if st.button("Apply Import", type="primary", disabled=not (diff["added"] or diff["changed"])):
+                    run_with_retry(import_menu, conn, rows, location_id)
+                    st.success(f"Imported {len(diff['added'])} new and {len(diff['changed'])} changed items")
+                    st.rerun()
+
+# Plotly, the analytics queries and pyarrow are only imported the first
+# time someone opens Reports, so staff logins never pay for them
+def reports_tab():
+    from momo_kiosk_reports import render_reports
+    render_reports(conn, DB_FILE)
 
 def admin_tab():
     st.header("Administration")
@@ -765,32 +790,38 @@ def admin_tab():
                     conn.commit()
                     st.rerun()
         
-        if 'edit_user' in st.session_state:
-            user = pd.read_sql(
+        user = None
+        if st.session_state.edit_user:
+            edited = pd.read_sql(
                 "SELECT * FROM users WHERE id = ?",
                 conn,
                 params=(st.session_state.edit_user,)
-            ).iloc[0]
-            
+            )
+            # The user may have been deleted since Edit was pressed
+            if edited.empty:
+                st.session_state.edit_user = None
+            else:
+                user = edited.iloc[0]
+        
+        if user is not None:
             st.subheader(f"Editing User: {user['username']}")
         else:
             st.subheader("Add New User")
-            user = None
         
         with st.form("user_form"):
-            username = st.text_input("Username", value=user['username'] if user else "")
-            full_name = st.text_input("Full Name", value=user['full_name'] if user else "")
+            username = st.text_input("Username", value=user['username'] if user is not None else "")
+            full_name = st.text_input("Full Name", value=user['full_name'] if user is not None else "")
             password = st.text_input("Password", type="password", value="")
             role = st.selectbox(
                 "Role",
                 ["Admin", "Manager", "Staff"],
-                index=0 if not user else ["Admin", "Manager", "Staff"].index(user['role'])
+                index=0 if user is None else ["Admin", "Manager", "Staff"].index(user['role'])
             )
             
             if st.form_submit_button("Save User"):
                 if not username or not full_name:
                     st.error("Username and full name are required")
-                elif not user and not password:
+                elif user is None and not password:
                     st.error("Password is required for new users")
                 else:
                     try:
@@ -820,8 +851,7 @@ def admin_tab():
                             """, (username, full_name, hash_password(password), role))
                         
                         conn.commit()
-                        if 'edit_user' in st.session_state:
-                            del st.session_state.edit_user
+                        st.session_state.edit_user = None
                         st.success("User saved successfully!")
                         st.rerun()
                     except sqlite3.IntegrityError:
@@ -830,79 +860,174 @@ def admin_tab():
     with tab2:
         st.subheader("Backup & Restore")
         
-        if st.button("Create Backup Now"):
-            backup_file = create_backup()
-            st.success(f"Backup created: {backup_file}")
-            st.rerun()
+        if st.button("Create Backup Now", disabled=st.session_state.backup_job is not None):
+            st.session_state.backup_message = None
+            st.session_state.backup_job = start_backup()
+        
+        backup_progress()
+        if st.session_state.backup_message:
+            kind, message = st.session_state.backup_message
+            getattr(st, kind)(message)
         
         st.subheader("Available Backups")
-        backups = sorted([f for f in os.listdir(BACKUP_DIR) if f.endswith('.db')], reverse=True)
+        backups = list_backups(BACKUP_DIR)
         
         if backups:
-            selected = st.selectbox("Select backup to restore", backups)
+            backup_df = pd.DataFrame(backups, columns=["name", "kind", "created", "size", "verified", "parent"])
+            backup_df['size'] = backup_df['size'] / 1024
+            st.dataframe(
+                backup_df,
+                column_config={
+                    "name": "Backup",
+                    "kind": "Type",
+                    "created": "Taken at",
+                    "size": st.column_config.NumberColumn("Size (KiB)", format="%.0f"),
+                    "verified": st.column_config.CheckboxColumn("Verified"),
+                    "parent": "Based on"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+            st.caption(f"Total on disk: {sum(b['size'] for b in backups) / 1024 / 1024:.1f} MiB")
+            
+            selected = st.selectbox("Select restore point", [b['name'] for b in backups])
             
             if st.button(f"Restore {selected}", type="primary"):
-                conn.close()
-                shutil.copy2(f"{BACKUP_DIR}{selected}", DB_FILE)
-                st.success("Database restored! Please refresh the page.")
-                time.sleep(2)
+                try:
+                    run_with_retry(restore_backup, conn, DB_FILE, BACKUP_DIR, selected)
+                    st.session_state.backup_message = (
+                        "success", f"Database restored from {selected}. Other terminals switch over on their next action.")
+                except (sqlite3.Error, OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                    # A locked database or a missing or corrupt chain link leaves the live database as it was
+                    st.session_state.backup_message = ("error", f"Restore from {selected} failed: {e}")
                 st.rerun()
             
             if st.button(f"Delete {selected}"):
-                os.remove(f"{BACKUP_DIR}{selected}")
-                st.success("Backup deleted!")
-                st.rerun()
+                try:
+                    delete_backup(BACKUP_DIR, selected)
+                    st.success("Backup deleted!")
+                    st.rerun()
+                except ValueError as e:
+                    st.error(f"Cannot delete: {e}")
         else:
             st.info("No backups available")
     
     with tab3:
-        st.subheader("System Configuration")
-        st.warning("System settings not implemented in this demo")
+        st.subheader("Query Performance")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            PROFILER.enabled = st.toggle("Record queries", value=PROFILER.enabled)
+        with col2:
+            PROFILER.slow_ms = st.number_input("Slow query threshold (ms)", min_value=0.0,
+                                               value=float(PROFILER.slow_ms), step=10.0)
+        with col3:
+            if st.button("Clear profile"):
+                PROFILER.clear()
+                st.rerun()
+        
+        entries = PROFILER.entries()
+        col1, col2 = st.columns(2)
+        col1.metric("Statements recorded", len(entries))
+        col2.metric("Time in SQL", f"{sum(e['duration_ms'] for e in entries) / 1000:.2f}s")
+        
+        top = PROFILER.top_queries(limit=20)
+        if not top:
+            st.info("No queries recorded yet - use the other tabs, then come back here")
+            return
+        
+        st.write("Top Queries by Total Time")
+        st.dataframe(
+            pd.DataFrame(top, columns=["sql", "tabs", "calls", "total_ms", "avg_ms", "max_ms", "rows"]),
+            column_config={
+                "sql": st.column_config.TextColumn("Statement", width="large"),
+                "tabs": "Tabs",
+                "calls": "Calls",
+                "total_ms": st.column_config.NumberColumn("Total (ms)", format="%.1f"),
+                "avg_ms": st.column_config.NumberColumn("Average (ms)", format="%.2f"),
+                "max_ms": st.column_config.NumberColumn("Slowest (ms)", format="%.2f"),
+                "rows": "Rows"
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+        
+        st.write(f"Slow Queries (over {PROFILER.slow_ms:.0f} ms)")
+        slow = PROFILER.slow_queries()
+        if slow:
+            st.dataframe(
+                pd.DataFrame(slow, columns=["time", "tab", "duration_ms", "rows", "shape", "sql"]),
+                column_config={
+                    "time": "At",
+                    "tab": "Tab",
+                    "duration_ms": st.column_config.NumberColumn("Duration (ms)", format="%.1f"),
+                    "rows": "Rows",
+                    "shape": "Parameters",
+                    "sql": st.column_config.TextColumn("Statement", width="large")
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.success("No slow queries recorded")
+        
+        st.write("Query Plans")
+        plans = {stat["sql"]: stat for stat in top}
+        plans.update((entry["sql"], entry) for entry in slow if entry["sql"] not in plans)
+        for sql, stat in plans.items():
+            plan = explain_query_plan(conn, sql, stat["params"])
+            if not plan:
+                continue
+            scans = full_scans(plan)
+            with st.expander(("[full scan] " if scans else "") + sql[:100]):
+                st.code(sql, language="sql")
+                st.code("\n".join(plan))
+                if scans:
+                    st.warning("Reads every row of: " + ", ".join(scan[5:] for scan in scans))
 
 st.title("Food Hub Restaurant Management")
 st.markdown(f"Welcome, **{st.session_state.current_user_name}** ({st.session_state.current_user_role})")
 
-if st.session_state.current_user_role == "Admin":
-    tabs = st.tabs(["Orders", "Customers", "Inventory", "Reports", "Administration"])
-    with tabs[0]:
-        order_tab()
-    with tabs[1]:
-        customers_tab()
-    with tabs[2]:
-        inventory_tab()
-    with tabs[3]:
-        reports_tab()
-    with tabs[4]:
-        admin_tab()
-elif st.session_state.current_user_role == "Manager":
-    tabs = st.tabs(["Orders", "Customers", "Inventory", "Reports"])
-    with tabs[0]:
-        order_tab()
-    with tabs[1]:
-        customers_tab()
-    with tabs[2]:
-        inventory_tab()
-    with tabs[3]:
-        reports_tab()
-else:
-    tabs = st.tabs(["Orders", "Customers"])
-    with tabs[0]:
-        order_tab()
-    with tabs[1]:
-        customers_tab()
+SECTIONS = {
+    "Orders": order_tab,
+    "Customers": customers_tab,
+    "Inventory": inventory_tab,
+    "Reports": reports_tab,
+    "Administration": admin_tab
+}
+ROLE_SECTIONS = {
+    "Admin": ["Orders", "Customers", "Inventory", "Reports", "Administration"],
+    "Manager": ["Orders", "Customers", "Inventory", "Reports"]
+}
+
+# Staff sell from this kiosk's outlet; admins and managers can switch
+# outlets to manage their stock
+locations = dict(get_locations(conn))
+if st.session_state.location_id not in locations:
+    st.session_state.location_id = get_location_id(conn, KIOSK_LOCATION) or DEFAULT_LOCATION_ID
+st.sidebar.selectbox("Outlet", list(locations), format_func=locations.get, key="location_id",
+                     disabled=st.session_state.current_user_role not in ("Admin", "Manager"))
+
+# Unlike st.tabs, only the selected section runs on a rerun, so adding to
+# the cart does not also run the reports queries and charts
+sections = ROLE_SECTIONS.get(st.session_state.current_user_role, ["Orders", "Customers"])
+if st.session_state.get("active_section") not in sections:
+    st.session_state.active_section = sections[0]
+section = st.radio("Section", sections, key="active_section", horizontal=True, label_visibility="collapsed")
+with profile_tab(section):
+    SECTIONS[section]()
 
 if st.sidebar.button("Logout"):
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     st.rerun()
 
-if st.session_state.current_order:
-    st.sidebar.subheader("Current Order")
-    for item in st.session_state.current_order:
-        st.sidebar.write(f"{item['quantity']} × {item['item']} - ₹{item['total']}")
-    total = sum(item['total'] for item in st.session_state.current_order)
-    st.sidebar.markdown(f"**Total:** ₹{total:.2f}")
-    if st.sidebar.button("Clear Order"):
-        st.session_state.current_order = []
-        st.rerun()
-                           
+with st.sidebar:
+    if section != "Orders":
+        sidebar_cart()
+    if CENTRAL_DIR:
+        sync = get_sync_worker()
+        if sync.error:
+            st.caption(f"Offline - changes are kept until the next sync ({sync.error})")
+        elif sync.last_sync:
+            st.caption(f"Last synced {sync.last_sync.strftime('%H:%M:%S')}")
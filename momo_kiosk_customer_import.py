@@ -0,0 +1,319 @@
+import argparse
+import csv
+import io
+import math
+import os
+import re
+import time
+from datetime import datetime
+from itertools import islice
+
+from momo_kiosk_db import bump_data_version, connect, run_with_retry
+from momo_kiosk_sync import record_credits, record_customers
+
+# ======================
+# CUSTOMER IMPORT
+# ======================
+
+# A file is read a chunk of rows at a time into a TEMP staging table keyed
+# on the normalized phone, so a phone repeated in the file keeps its last
+# line. The merge into customers is then a handful of set-based statements
+# in one write transaction: update the customers whose phone is already
+# known, insert the rest. Memory depends on the chunk size, not the file.
+IMPORT_CHUNK_ROWS = int(os.environ.get("MOMO_IMPORT_CHUNK_ROWS", 500))
+PHONE_COUNTRY_CODE = os.environ.get("MOMO_PHONE_COUNTRY_CODE", "91")
+PHONE_DIGITS = int(os.environ.get("MOMO_PHONE_DIGITS", 10))
+# Only the first rejected lines are kept for the report
+MAX_REPORTED_ERRORS = 100
+
+CUSTOMER_COLUMNS = ["name", "phone", "email", "address", "credit_balance", "is_active"]
+# Header names other systems use for the same columns
+COLUMN_ALIASES = {
+    "customer": "name",
+    "customer name": "name",
+    "full name": "name",
+    "mobile": "phone",
+    "mobile number": "phone",
+    "phone number": "phone",
+    "contact": "phone",
+    "e-mail": "email",
+    "credit": "credit_balance",
+    "balance": "credit_balance",
+    "active": "is_active",
+}
+
+_BOOLEANS = {"1": 1, "true": 1, "yes": 1, "y": 1, "0": 0, "false": 0, "no": 0, "n": 0}
+_PHONE_CHARACTERS = re.compile(r"[0-9+()\-.\s/]+")
+
+
+def normalize_phone(raw):
+    """Return the PHONE_DIGITS-digit local number in raw, or None if it is not one
+
+    Spaces, dashes, brackets, a leading + or 0 and the PHONE_COUNTRY_CODE
+    prefix are dropped, so "+91 98765-43210" and "098765 43210" both give
+    "9876543210".
+    """
+    raw = raw.strip()
+    if not _PHONE_CHARACTERS.fullmatch(raw):
+        return None
+    digits = re.sub(r"\D", "", raw)
+    if len(digits) == PHONE_DIGITS + len(PHONE_COUNTRY_CODE) and digits.startswith(PHONE_COUNTRY_CODE):
+        digits = digits[len(PHONE_COUNTRY_CODE):]
+    elif len(digits) == PHONE_DIGITS + 1 and digits.startswith("0"):
+        digits = digits[1:]
+    return digits if len(digits) == PHONE_DIGITS else None
+
+
+def _header(names):
+    columns = []
+    for name in names:
+        name = str(name or "").strip().lower().replace("_", " ")
+        columns.append(COLUMN_ALIASES.get(name, name.replace(" ", "_")))
+    return columns
+
+
+def _cell(value):
+    # Excel keeps phone numbers typed as numbers as floats
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return "" if value is None else str(value).strip()
+
+
+def iter_csv_rows(f):
+    """Yield (line, {column: text}) for each row of a CSV text file object"""
+    reader = csv.reader(f)
+    columns = _header(next(reader, []))
+    for values in reader:
+        if any(value.strip() for value in values):
+            yield reader.line_num, dict(zip(columns, (value.strip() for value in values)))
+
+
+def iter_excel_rows(f):
+    """Yield (line, {column: text}) for each row of the first sheet of an .xlsx file"""
+    # Imported here so only an Excel import pays for loading openpyxl
+    try:
+        import openpyxl
+    except ImportError:  # CSV works without it
+        raise RuntimeError("Importing Excel files needs openpyxl installed")
+    # Read-only mode streams rows from the file instead of loading the sheet
+    workbook = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = _header(next(rows, []))
+        for line, values in enumerate(rows, start=2):
+            values = [_cell(value) for value in values]
+            if any(values):
+                yield line, dict(zip(columns, values))
+    finally:
+        workbook.close()
+
+
+def _parse(record):
+    """Return (staging row, None) or (None, reason) for one file row"""
+    name = record.get("name", "")
+    if not name:
+        return None, "name is required"
+    phone = normalize_phone(record.get("phone", ""))
+    if phone is None:
+        return None, f"'{record.get('phone', '')}' is not a {PHONE_DIGITS}-digit phone number"
+
+    credit = record.get("credit_balance", "")
+    if credit:
+        try:
+            credit = round(float(credit), 2)
+        except ValueError:
+            return None, f"credit '{credit}' is not a number"
+        if not math.isfinite(credit) or credit < 0:
+            return None, f"credit '{credit}' must be zero or more"
+    active = record.get("is_active", "").lower()
+    if active and active not in _BOOLEANS:
+        return None, f"active '{active}' is not one of 1/0, true/false, yes/no"
+
+    return (name, phone, record.get("email") or None, record.get("address") or None,
+            credit if credit != "" else None, _BOOLEANS.get(active)), None
+
+
+def _create_staging(conn):
+    conn.execute("DROP TABLE IF EXISTS temp.customer_import")
+    conn.execute('''CREATE TEMP TABLE customer_import
+                    (phone TEXT PRIMARY KEY,
+                     line INTEGER,
+                     name TEXT,
+                     email TEXT,
+                     address TEXT,
+                     credit_balance REAL,
+                     is_active INTEGER)''')
+
+
+def stage_customers(conn, rows, report, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Validate (line, record) pairs and load them into the staging table a chunk at a time"""
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            break
+        staged = []
+        for line, record in chunk:
+            row, reason = _parse(record)
+            if row is None:
+                report["rejected"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append((line, reason))
+            else:
+                staged.append((line,) + row)
+        report["read"] += len(chunk)
+        with conn:
+            # A phone seen again replaces the earlier line
+            conn.executemany("""
+                INSERT INTO temp.customer_import (line, name, phone, email, address, credit_balance, is_active)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(phone) DO UPDATE SET
+                    line = excluded.line,
+                    name = excluded.name,
+                    email = excluded.email,
+                    address = excluded.address,
+                    credit_balance = excluded.credit_balance,
+                    is_active = excluded.is_active
+            """, staged)
+
+
+def _phone_keys(conn, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Map every existing customer's normalized phone to its id, in a TEMP table
+
+    Phones typed into the customer form were never normalized, so they are
+    matched on the same normal form as the file. Numbers that do not
+    normalize can only match themselves.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.customer_phone_keys")
+    conn.execute("CREATE TEMP TABLE customer_phone_keys (phone TEXT PRIMARY KEY, customer_id INTEGER)")
+    cursor = conn.execute("SELECT id, phone FROM customers WHERE phone IS NOT NULL ORDER BY id")
+    while True:
+        chunk = cursor.fetchmany(chunk_rows)
+        if not chunk:
+            break
+        conn.executemany("INSERT OR IGNORE INTO temp.customer_phone_keys (phone, customer_id) VALUES (?, ?)",
+                         [(normalize_phone(phone) or phone, customer_id) for customer_id, phone in chunk])
+
+
+def merge_customers(conn, report):
+    """Merge the staging table into customers; runs inside the caller's write transaction"""
+    _phone_keys(conn)
+
+    # Blank optional cells keep what the customer already has
+    conn.execute("DROP TABLE IF EXISTS temp.customer_import_updates")
+    conn.execute("""
+        CREATE TEMP TABLE customer_import_updates AS
+        SELECT c.id AS customer_id, c.phone AS phone, c.credit_balance AS old_credit
+        FROM temp.customer_import i
+        JOIN temp.customer_phone_keys k ON k.phone = i.phone
+        JOIN customers c ON c.id = k.customer_id
+        WHERE c.name IS NOT i.name
+           OR c.email IS NOT COALESCE(i.email, c.email)
+           OR c.address IS NOT COALESCE(i.address, c.address)
+           OR c.credit_balance IS NOT COALESCE(i.credit_balance, c.credit_balance)
+           OR c.is_active IS NOT COALESCE(i.is_active, c.is_active)
+    """)
+    matched = conn.execute("""
+        SELECT COUNT(*) FROM temp.customer_import i JOIN temp.customer_phone_keys k ON k.phone = i.phone
+    """).fetchone()[0]
+
+    report["updated"] = conn.execute("""
+        UPDATE customers SET (name, email, address, credit_balance, is_active) = (
+            SELECT i.name,
+                   COALESCE(i.email, customers.email),
+                   COALESCE(i.address, customers.address),
+                   COALESCE(i.credit_balance, customers.credit_balance),
+                   COALESCE(i.is_active, customers.is_active)
+            FROM temp.customer_phone_keys k
+            JOIN temp.customer_import i ON i.phone = k.phone
+            WHERE k.customer_id = customers.id
+        )
+        WHERE id IN (SELECT customer_id FROM temp.customer_import_updates)
+    """).rowcount
+    report["unchanged"] = matched - report["updated"]
+
+    report["inserted"] = conn.execute("""
+        INSERT INTO customers (name, phone, email, address, credit_balance, join_date, is_active)
+        SELECT name, phone, email, address, COALESCE(credit_balance, 0), ?, COALESCE(is_active, 1)
+        FROM temp.customer_import i
+        WHERE NOT EXISTS (SELECT 1 FROM temp.customer_phone_keys k WHERE k.phone = i.phone)
+        ORDER BY line
+    """, (datetime.now().strftime("%Y-%m-%d"),)).rowcount
+
+    # The outbox gets the same set-based treatment as the merge itself
+    updated = "id IN (SELECT customer_id FROM temp.customer_import_updates)"
+    record_customers(conn, updated)
+    record_credits(conn, """
+        SELECT c.phone AS phone, c.credit_balance - COALESCE(u.old_credit, 0) AS delta
+        FROM temp.customer_import_updates u
+        JOIN customers c ON c.id = u.customer_id
+    """)
+    inserted = """phone IN (SELECT phone FROM temp.customer_import i
+                            WHERE NOT EXISTS (SELECT 1 FROM temp.customer_phone_keys k WHERE k.phone = i.phone))"""
+    record_customers(conn, inserted)
+    record_credits(conn, f"SELECT phone, credit_balance AS delta FROM customers WHERE {inserted}")
+
+    bump_data_version(conn, "customers")
+
+
+def _drop_staging(conn):
+    for table in ("customer_import", "customer_phone_keys", "customer_import_updates"):
+        conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+
+
+def _merge(conn, report):
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        merge_customers(conn, report)
+
+
+def import_customers(conn, rows, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Import (line, record) pairs from iter_csv_rows or iter_excel_rows, returns a report
+
+    {"read", "inserted", "updated", "unchanged", "rejected", "duplicates",
+    "errors": [(line, reason), ...]}. duplicates counts lines whose phone
+    a later line of the file replaced. The customers table is only written
+    in the final merge, so a file that fails to read changes nothing.
+    """
+    report = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0, "duplicates": 0,
+              "errors": []}
+    _create_staging(conn)
+    try:
+        stage_customers(conn, rows, report, chunk_rows)
+        staged = conn.execute("SELECT COUNT(*) FROM temp.customer_import").fetchone()[0]
+        report["duplicates"] = report["read"] - report["rejected"] - staged
+        run_with_retry(_merge, conn, report)
+    finally:
+        with conn:
+            _drop_staging(conn)
+    return report
+
+
+def read_customer_file(f, filename):
+    """Pick the row reader for an uploaded file by its extension"""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return iter_excel_rows(f)
+    if isinstance(f, io.TextIOBase):
+        return iter_csv_rows(f)
+    return iter_csv_rows(io.TextIOWrapper(f, encoding="utf-8-sig", newline=""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import customers from a CSV or Excel file, matched on phone")
+    parser.add_argument("--db", default="food_hub.db")
+    parser.add_argument("file")
+    parser.add_argument("--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    started = time.perf_counter()
+    with open(args.file, "rb") as f:
+        report = import_customers(conn, read_customer_file(f, args.file), args.chunk_rows)
+    conn.close()
+    for line, reason in report["errors"]:
+        print(f"line {line}: {reason}")
+    if report["rejected"] > len(report["errors"]):
+        print(f"... and {report['rejected'] - len(report['errors'])} more rejected lines")
+    print(f"Read {report['read']} rows in {time.perf_counter() - started:.1f}s: "
+          f"{report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged, "
+          f"{report['rejected']} rejected, {report['duplicates']} duplicate phones")
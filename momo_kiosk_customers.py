@@ -0,0 +1,142 @@
+import sqlite3
+
+# ======================
+# CUSTOMER SEARCH
+# ======================
+
+# Trigram tokens need at least three characters; shorter queries fall
+# back to an indexed name prefix match.
+MIN_TRIGRAM_QUERY = 3
+
+
+def create_customer_search(conn):
+    """Create the trigram FTS index over customers, returns False if SQLite lacks FTS5 trigram"""
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'"
+    ).fetchone()
+
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_name_nocase ON customers(name COLLATE NOCASE)")
+
+    if not existed:
+        try:
+            conn.execute('''CREATE VIRTUAL TABLE customers_fts USING fts5
+                            (name, phone, email,
+                             content='customers', content_rowid='id', tokenize='trigram')''')
+        except sqlite3.OperationalError:
+            return False
+
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+                        INSERT INTO customers_fts (rowid, name, phone, email)
+                        VALUES (new.id, new.name, new.phone, new.email);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+                        INSERT INTO customers_fts (customers_fts, rowid, name, phone, email)
+                        VALUES ('delete', old.id, old.name, old.phone, old.email);
+                    END''')
+    # Only searchable columns; order totals are updated far more often
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS customers_fts_update
+                    AFTER UPDATE OF name, phone, email ON customers BEGIN
+                        INSERT INTO customers_fts (customers_fts, rowid, name, phone, email)
+                        VALUES ('delete', old.id, old.name, old.phone, old.email);
+                        INSERT INTO customers_fts (rowid, name, phone, email)
+                        VALUES (new.id, new.name, new.phone, new.email);
+                    END''')
+
+    if not existed:
+        conn.execute("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+    return True
+
+
+def _has_search_index(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'"
+    ).fetchone() is not None
+
+
+def _rows(cursor):
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def search_customers(conn, query, limit=10, include_inactive=False):
+    """Return up to limit customers matching name, phone or email, best matches first"""
+    query = query.strip()
+    if not query:
+        return []
+    active = "" if include_inactive else "AND c.is_active = 1"
+
+    if len(query) < MIN_TRIGRAM_QUERY:
+        return _rows(conn.execute(f"""
+            SELECT c.* FROM customers c
+            WHERE c.name LIKE ? {active}
+            ORDER BY c.name COLLATE NOCASE
+            LIMIT ?
+        """, (query.replace('%', '').replace('_', '') + '%', limit)))
+
+    if not _has_search_index(conn):
+        return _rows(conn.execute(f"""
+            SELECT c.* FROM customers c
+            WHERE (c.name LIKE ? OR c.phone LIKE ? OR c.email LIKE ?) {active}
+            ORDER BY c.name
+            LIMIT ?
+        """, (f"%{query}%", f"%{query}%", f"%{query}%", limit)))
+
+    phrase = '"' + query.replace('"', '""') + '"'
+    return _rows(conn.execute(f"""
+        SELECT c.* FROM customers_fts f
+        JOIN customers c ON c.id = f.rowid
+        WHERE customers_fts MATCH ? {active}
+        ORDER BY f.rank
+        LIMIT ?
+    """, (phrase, limit)))
+
+
+# ======================
+# CUSTOMER DIRECTORY
+# ======================
+
+# Sort key -> (expression, direction). Each expression has a matching
+# (expression, id) index so every page is a single index range scan.
+DIRECTORY_SORTS = {
+    "name": ("COALESCE(name, '')", "ASC"),
+    "total_spent": ("COALESCE(total_spent, 0)", "DESC"),
+    "credit_balance": ("COALESCE(credit_balance, 0)", "DESC"),
+    "last_order_date": ("COALESCE(last_order_date, '')", "DESC"),
+}
+
+
+def create_directory_indexes(conn):
+    for sort, (expression, _) in DIRECTORY_SORTS.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_customers_by_{sort} ON customers({expression}, id)")
+
+
+def list_customers_page(conn, sort="name", after=None, page_size=25, include_inactive=False):
+    """Return (customers, next_cursor) for one directory page using keyset pagination
+
+    after is the cursor returned for the previous page, None for the first page.
+    next_cursor is None on the last page.
+    """
+    expression, direction = DIRECTORY_SORTS[sort]
+    conditions = []
+    params = []
+
+    if after is not None:
+        # Spelled out rather than as a row value so SQLite seeks the expression index
+        op = '>' if direction == 'ASC' else '<'
+        conditions.append(f"{expression} {op}= ? AND ({expression} {op} ? OR id {op} ?)")
+        params.extend([after[0], after[0], after[1]])
+    if not include_inactive:
+        conditions.append("is_active = 1")
+
+    query = f"SELECT *, {expression} AS sort_key FROM customers"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {expression} {direction}, id {direction} LIMIT ?"
+    params.append(page_size + 1)
+
+    customers = _rows(conn.execute(query, params))
+    next_cursor = None
+    if len(customers) > page_size:
+        customers = customers[:page_size]
+        next_cursor = (customers[-1]['sort_key'], customers[-1]['id'])
+    return customers, next_cursor
@@ -0,0 +1,179 @@
+import json
+import os
+import random
+import sqlite3
+import time
+
+from momo_kiosk_profiler import ProfilingConnection
+
+# ======================
+# CONNECTION MANAGEMENT
+# ======================
+
+# How long a connection waits on a locked database before raising, and
+# how many times a locked write is retried with exponential backoff.
+BUSY_TIMEOUT_MS = int(os.environ.get("MOMO_DB_BUSY_TIMEOUT_MS", 5000))
+LOCK_RETRIES = int(os.environ.get("MOMO_DB_LOCK_RETRIES", 5))
+RETRY_BACKOFF = float(os.environ.get("MOMO_DB_RETRY_BACKOFF", 0.05))
+
+
+def connect(db_file, busy_timeout_ms=None):
+    """Open a WAL-mode connection that may be handed between threads
+
+    Statements are recorded by the query profiler (see momo_kiosk_profiler).
+    """
+    busy_timeout_ms = BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+    conn = sqlite3.connect(db_file, timeout=busy_timeout_ms / 1000, check_same_thread=False,
+                           factory=ProfilingConnection)
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    # WAL lets report readers run while a kiosk is committing an order
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+
+def session_connection(state, opener, key="db_conn", db_file=None):
+    """Return the connection kept in a Streamlit session_state, opening it with opener() on first use
+
+    With db_file given, the connection is reopened when the database's
+    generation has moved on (see hot_restore), so sessions pick up a
+    restored database on their next rerun.
+    """
+    generation = get_generation(db_file) if db_file else None
+    conn = state.get(key)
+    if conn is not None and state.get(key + "_generation") != generation:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = opener()
+        state[key] = conn
+        state[key + "_generation"] = generation
+    return conn
+
+
+def is_lock_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+def run_with_retry(func, *args, retries=None, backoff=None, **kwargs):
+    """Call func, retrying with exponential backoff while the database is locked"""
+    retries = LOCK_RETRIES if retries is None else retries
+    backoff = RETRY_BACKOFF if backoff is None else backoff
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not is_lock_error(e) or attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+
+def restore_into(conn, backup_file):
+    """Copy a backup database into the live one through an open connection"""
+    source = sqlite3.connect(backup_file)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+
+
+# ======================
+# RESTORE GENERATIONS
+# ======================
+
+# The generation lives next to the database rather than inside it, since a
+# restore replaces every page of the database itself.
+def _generation_file(db_file):
+    return db_file + ".generation"
+
+
+def get_generation(db_file):
+    try:
+        with open(_generation_file(db_file)) as f:
+            return int(f.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def bump_generation(db_file):
+    generation = get_generation(db_file) + 1
+    path = _generation_file(db_file)
+    with open(path + ".tmp", "w") as f:
+        f.write(str(generation))
+    os.replace(path + ".tmp", path)
+    return generation
+
+
+# A restore also brings back the backup's sqlite_sequence, so AUTOINCREMENT
+# ids would be handed out again. Tables whose ids are seen outside this
+# database (the outbox's, by the central server) record a floor here, and
+# hot_restore moves the counter back up to it.
+def _sequence_floors_file(db_file):
+    return db_file + ".sequences"
+
+
+def get_sequence_floors(db_file):
+    """Return {table: lowest id the next AUTOINCREMENT must be above}"""
+    try:
+        with open(_sequence_floors_file(db_file)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def raise_sequence_floor(db_file, table, seq):
+    floors = get_sequence_floors(db_file)
+    if floors.get(table, 0) >= seq:
+        return
+    floors[table] = seq
+    path = _sequence_floors_file(db_file)
+    with open(path + ".tmp", "w") as f:
+        json.dump(floors, f)
+    os.replace(path + ".tmp", path)
+
+
+def apply_sequence_floors(conn, db_file):
+    """Move each recorded table's AUTOINCREMENT counter up to its floor"""
+    with conn:
+        for table, seq in get_sequence_floors(db_file).items():
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ? AND seq < ?", (seq, table, seq))
+            conn.execute("""
+                INSERT INTO sqlite_sequence (name, seq)
+                SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+            """, (table, seq, table))
+
+
+def hot_restore(conn, db_file, backup_file):
+    """Restore backup_file into the live database without taking it offline
+
+    Pages are written with the backup API under SQLite's own locking, so
+    other connections simply wait; bumping the generation then makes every
+    session reconnect (and re-run schema setup) on its next rerun.
+    """
+    restore_into(conn, backup_file)
+    apply_sequence_floors(conn, db_file)
+    return bump_generation(db_file)
+
+
+# ======================
+# DATA VERSIONS
+# ======================
+
+def create_data_version_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS data_version
+                    (name TEXT PRIMARY KEY,
+                     version INTEGER DEFAULT 0)''')
+
+
+def bump_data_version(conn, *names):
+    """Mark cached data as stale; call inside the transaction that changed it"""
+    conn.executemany("""
+        INSERT INTO data_version (name, version) VALUES (?, 1)
+        ON CONFLICT(name) DO UPDATE SET version = version + 1
+    """, [(name,) for name in names])
+
+
+def get_data_versions(conn):
+    """Return {name: version} for every counter, e.g. {'menu': 12, 'customers': 3}"""
+    return dict(conn.execute("SELECT name, version FROM data_version").fetchall())
@@ -0,0 +1,98 @@
+import os
+
+from momo_kiosk_db import bump_data_version
+from momo_kiosk_sync import record_stock
+
+# ======================
+# OUTLETS
+# ======================
+
+# Stock is kept per outlet in location_stock, one row per (outlet, menu item),
+# so counters selling the same item never update the same row. menu.stock
+# and menu.min_stock are only read once, to seed the first outlet.
+DEFAULT_LOCATION = "Main"
+DEFAULT_LOCATION_ID = 1
+# The outlet this kiosk sells from, by name
+KIOSK_LOCATION = os.environ.get("MOMO_LOCATION", DEFAULT_LOCATION)
+
+
+def create_location_tables(conn):
+    """Create the locations and location_stock tables, moving menu stock to the first outlet the first time"""
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'location_stock'"
+    ).fetchone()
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS locations
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     name TEXT UNIQUE NOT NULL,
+                     is_active INTEGER DEFAULT 1)''')
+    # Keyed on (location, item): an outlet's stock lookups and low-stock
+    # scans read one contiguous range of the table
+    conn.execute('''CREATE TABLE IF NOT EXISTS location_stock
+                    (location_id INTEGER NOT NULL,
+                     menu_item_id INTEGER NOT NULL,
+                     stock INTEGER NOT NULL DEFAULT 0,
+                     min_stock INTEGER NOT NULL DEFAULT 5,
+                     PRIMARY KEY (location_id, menu_item_id),
+                     FOREIGN KEY(location_id) REFERENCES locations(id),
+                     FOREIGN KEY(menu_item_id) REFERENCES menu(id)) WITHOUT ROWID''')
+    conn.execute("INSERT OR IGNORE INTO locations (id, name) VALUES (?, ?)", (DEFAULT_LOCATION_ID, DEFAULT_LOCATION))
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(orders)")]
+    if "location_id" not in columns:
+        conn.execute("ALTER TABLE orders ADD COLUMN location_id INTEGER REFERENCES locations(id)")
+
+    if not existed:
+        migrate_menu_stock(conn)
+
+
+def migrate_menu_stock(conn):
+    """Copy menu.stock and menu.min_stock into the first outlet's rows, returns the number copied"""
+    cursor = conn.execute("""
+        INSERT OR IGNORE INTO location_stock (location_id, menu_item_id, stock, min_stock)
+        SELECT ?, id, COALESCE(stock, 0), COALESCE(min_stock, 5) FROM menu
+    """, (DEFAULT_LOCATION_ID,))
+    return cursor.rowcount
+
+
+def get_locations(conn):
+    """Return [(id, name), ...] of the active outlets"""
+    return conn.execute("SELECT id, name FROM locations WHERE is_active = 1 ORDER BY id").fetchall()
+
+
+def get_location_id(conn, name):
+    row = conn.execute("SELECT id FROM locations WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def ensure_stock_rows(conn, menu_item_id=None):
+    """Give every outlet a stock row for one menu item, or for all of them, starting empty"""
+    query = """
+        INSERT OR IGNORE INTO location_stock (location_id, menu_item_id, stock, min_stock)
+        SELECT l.id, m.id, 0, COALESCE(m.min_stock, 5)
+        FROM locations l CROSS JOIN menu m
+    """
+    params = ()
+    if menu_item_id is not None:
+        query += " WHERE m.id = ?"
+        params = (menu_item_id,)
+    conn.execute(query, params)
+
+
+def add_location(conn, name):
+    """Add an outlet with every menu item out of stock, returns its id; the caller commits"""
+    location_id = conn.execute("INSERT INTO locations (name) VALUES (?)", (name,)).lastrowid
+    ensure_stock_rows(conn)
+    bump_data_version(conn, "menu")
+    return location_id
+
+
+def set_stock(conn, location_id, menu_item_id, stock, min_stock):
+    conn.execute("""
+        INSERT INTO location_stock (location_id, menu_item_id, stock, min_stock)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (location_id, menu_item_id) DO UPDATE SET
+            stock = excluded.stock,
+            min_stock = excluded.min_stock
+    """, (location_id, menu_item_id, stock, min_stock))
+    record_stock(conn, location_id, [menu_item_id])
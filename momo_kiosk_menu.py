@@ -0,0 +1,79 @@
+import pandas as pd
+
+from momo_kiosk_locations import DEFAULT_LOCATION_ID
+
+# ======================
+# MENU QUERIES
+# ======================
+
+# Placeholder rows that keep an empty category alive in the menu table
+SAMPLE_ITEM = "Sample Item"
+
+# Stock and min_stock come from the outlet's location_stock row
+_MENU_STOCK = """
+    SELECT m.id, m.category, m.item, m.description, m.price, m.cost, s.stock, s.min_stock, m.is_available
+    FROM menu m
+    JOIN location_stock s ON s.menu_item_id = m.id AND s.location_id = ?
+    WHERE m.item != ?
+"""
+
+STOCK_FILTERS = {
+    "All": "",
+    "Low Stock (< min)": " AND s.stock <= s.min_stock AND s.stock > 0",
+    "Out of Stock": " AND s.stock = 0",
+    "In Stock": " AND s.stock > 0",
+}
+
+
+def get_menu_items(conn, category_filter=None, available_only=True, location_id=DEFAULT_LOCATION_ID):
+    query = _MENU_STOCK
+    params = [location_id, SAMPLE_ITEM]
+
+    if available_only:
+        query += " AND m.is_available = 1"
+    if category_filter:
+        query += " AND m.category = ?"
+        params.append(category_filter)
+
+    return pd.read_sql(query, conn, params=params)
+
+
+def get_categories(conn):
+    return [row[0] for row in conn.execute("SELECT DISTINCT category FROM menu WHERE item != ?", (SAMPLE_ITEM,))]
+
+
+def get_low_stock(conn, location_id=DEFAULT_LOCATION_ID):
+    return pd.read_sql(
+        _MENU_STOCK + " AND s.stock <= s.min_stock ORDER BY s.stock ASC",
+        conn,
+        params=(location_id, SAMPLE_ITEM)
+    )
+
+
+def get_outlet_stock_summary(conn):
+    """Return low and out-of-stock item counts for every active outlet"""
+    return pd.read_sql("""
+        SELECT l.name AS outlet,
+               SUM(s.stock <= s.min_stock AND s.stock > 0) AS low_stock,
+               SUM(s.stock = 0) AS out_of_stock
+        FROM locations l
+        JOIN location_stock s ON s.location_id = l.id
+        JOIN menu m ON m.id = s.menu_item_id
+        WHERE l.is_active = 1 AND m.item != ?
+        GROUP BY l.id
+        ORDER BY l.name
+    """, conn, params=(SAMPLE_ITEM,))
+
+
+def get_inventory(conn, category=None, stock_filter="All", location_id=DEFAULT_LOCATION_ID):
+    """Return an outlet's inventory table for the dashboard; stock_filter is a STOCK_FILTERS key"""
+    query = _MENU_STOCK
+    params = [location_id, SAMPLE_ITEM]
+
+    if category:
+        query += " AND m.category = ?"
+        params.append(category)
+    query += STOCK_FILTERS[stock_filter]
+    query += " ORDER BY m.category, m.item"
+
+    return pd.read_sql(query, conn, params=params)
@@ -0,0 +1,276 @@
+import argparse
+import csv
+import io
+import math
+import os
+import sys
+import time
+
+from momo_kiosk_db import bump_data_version, connect, run_with_retry
+from momo_kiosk_locations import DEFAULT_LOCATION_ID, KIOSK_LOCATION, ensure_stock_rows, get_location_id
+from momo_kiosk_menu import SAMPLE_ITEM
+from momo_kiosk_sync import record_stock
+
+# ======================
+# MENU CSV IMPORT/EXPORT
+# ======================
+
+# One row per menu item, keyed on the item name. stock and min_stock are
+# the chosen outlet's; the other columns are shared by every outlet. A
+# blank cell (or a missing optional column) leaves an existing item's
+# value alone and gives a new item the default.
+MENU_CSV_COLUMNS = ["category", "item", "description", "price", "cost", "stock", "min_stock", "is_available"]
+REQUIRED_COLUMNS = ["category", "item", "price"]
+DEFAULTS = {"description": "", "cost": 0.0, "stock": 0, "min_stock": 5, "is_available": 1}
+STOCK_COLUMNS = ("stock", "min_stock")
+# Rows handed to each executemany call, all inside one transaction
+IMPORT_CHUNK_ROWS = int(os.environ.get("MOMO_IMPORT_CHUNK_ROWS", 500))
+
+_BOOLEANS = {"1": 1, "true": 1, "yes": 1, "y": 1, "0": 0, "false": 0, "no": 0, "n": 0}
+
+
+def _amount(value):
+    try:
+        amount = float(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a number")
+    if not math.isfinite(amount) or amount < 0:
+        raise ValueError(f"'{value}' must be zero or more")
+    return round(amount, 2)
+
+
+def _count(value):
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a whole number")
+    if count < 0:
+        raise ValueError(f"'{value}' must be zero or more")
+    return count
+
+
+def _flag(value):
+    if value.lower() not in _BOOLEANS:
+        raise ValueError(f"'{value}' is not one of 1/0, true/false, yes/no")
+    return _BOOLEANS[value.lower()]
+
+
+_PARSERS = {
+    "category": str,
+    "item": str,
+    "description": str,
+    "price": _amount,
+    "cost": _amount,
+    "stock": _count,
+    "min_stock": _count,
+    "is_available": _flag,
+}
+
+
+def read_menu_csv(f):
+    """Validate a menu CSV from a text file object, returns (rows, errors)
+
+    rows maps each item name to the fields its line sets. errors is
+    [(line, message), ...]; a line with any error is left out of rows.
+    """
+    reader = csv.DictReader(f)
+    if not reader.fieldnames:
+        return {}, [(1, "the file is empty")]
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        return {}, [(1, "missing column(s): " + ", ".join(missing))]
+
+    rows = {}
+    lines = {}
+    errors = []
+    for record in reader:
+        line = reader.line_num
+        fields = {}
+        problems = []
+        for column, parse in _PARSERS.items():
+            value = (record.get(column) or "").strip()
+            if not value:
+                continue
+            try:
+                fields[column] = parse(value)
+            except ValueError as e:
+                problems.append(f"{column} {e}")
+
+        item = fields.get("item")
+        for column in REQUIRED_COLUMNS:
+            if column not in fields and not any(p.startswith(column + " ") for p in problems):
+                problems.append(f"{column} is required")
+        if item == SAMPLE_ITEM:
+            problems.append(f"'{SAMPLE_ITEM}' is reserved")
+        elif item in lines:
+            problems.append(f"'{item}' is already on line {lines[item]}")
+
+        if problems:
+            errors.append((line, "; ".join(problems)))
+        else:
+            rows[item] = fields
+            lines[item] = line
+    return rows, errors
+
+
+def _current_menu(conn, location_id):
+    cursor = conn.execute("""
+        SELECT m.id, m.category, m.item, m.description, m.price, m.cost, s.stock, s.min_stock, m.is_available
+        FROM menu m
+        LEFT JOIN location_stock s ON s.menu_item_id = m.id AND s.location_id = ?
+        WHERE m.item != ?
+    """, (location_id, SAMPLE_ITEM))
+    columns = [d[0] for d in cursor.description]
+    return {row[2]: dict(zip(columns, row)) for row in cursor}
+
+
+def diff_menu(conn, rows, location_id=DEFAULT_LOCATION_ID):
+    """Compare validated rows with the menu, returns what importing them would do
+
+    {"added": [row, ...], "changed": [(row, {column: (old, new)}), ...],
+    "unchanged": count}; every row has all of MENU_CSV_COLUMNS filled in.
+    Nothing is written, so this is also the dry run.
+    """
+    current = _current_menu(conn, location_id)
+    added = []
+    changed = []
+    unchanged = 0
+    for item, fields in rows.items():
+        existing = current.get(item)
+        if existing is None:
+            added.append({**DEFAULTS, **fields})
+            continue
+        changes = {column: (existing[column], value) for column, value in fields.items()
+                   if existing[column] != value}
+        if changes:
+            # An item with no stock row at this outlet yet has NULL stock and min_stock
+            current_row = {column: DEFAULTS.get(column) if existing[column] is None else existing[column]
+                           for column in MENU_CSV_COLUMNS}
+            changed.append(({**current_row, **fields}, changes))
+        else:
+            unchanged += 1
+    return {"added": added, "changed": changed, "unchanged": unchanged}
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def write_menu_import(conn, diff, location_id=DEFAULT_LOCATION_ID, chunk_rows=IMPORT_CHUNK_ROWS):
+    """Apply a diff_menu result; runs inside the caller's write transaction"""
+    rows = diff["added"] + [row for row, _ in diff["changed"]]
+    if not rows:
+        return
+
+    # min_stock on menu only seeds the first outlet, so it is set on insert only
+    for chunk in _chunks(rows, chunk_rows):
+        conn.executemany("""
+            INSERT INTO menu (category, item, description, price, cost, min_stock, is_available)
+            VALUES (:category, :item, :description, :price, :cost, :min_stock, :is_available)
+            ON CONFLICT(item) DO UPDATE SET
+                category = excluded.category,
+                description = excluded.description,
+                price = excluded.price,
+                cost = excluded.cost,
+                is_available = excluded.is_available
+        """, chunk)
+    if diff["added"]:
+        # New items start out of stock at the other outlets
+        ensure_stock_rows(conn)
+
+    stock_rows = diff["added"] + [row for row, changes in diff["changed"]
+                                  if any(column in changes for column in STOCK_COLUMNS)]
+    ids = dict(conn.execute("SELECT item, id FROM menu"))
+    for chunk in _chunks(stock_rows, chunk_rows):
+        conn.executemany("""
+            INSERT INTO location_stock (location_id, menu_item_id, stock, min_stock)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (location_id, menu_item_id) DO UPDATE SET
+                stock = excluded.stock,
+                min_stock = excluded.min_stock
+        """, [(location_id, ids[row["item"]], row["stock"], row["min_stock"]) for row in chunk])
+        record_stock(conn, location_id, [ids[row["item"]] for row in chunk])
+
+    bump_data_version(conn, "menu")
+
+
+def import_menu(conn, rows, location_id=DEFAULT_LOCATION_ID):
+    """Upsert validated rows in one transaction, returns the diff that was applied"""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        diff = diff_menu(conn, rows, location_id)
+        write_menu_import(conn, diff, location_id)
+        return diff
+
+
+def iter_menu_csv(conn, location_id=DEFAULT_LOCATION_ID):
+    """Yield an outlet's menu as CSV text, a line at a time, in read_menu_csv's format"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(MENU_CSV_COLUMNS)
+    cursor = conn.execute("""
+        SELECT m.category, m.item, m.description, m.price, m.cost, s.stock, s.min_stock, m.is_available
+        FROM menu m
+        LEFT JOIN location_stock s ON s.menu_item_id = m.id AND s.location_id = ?
+        WHERE m.item != ?
+        ORDER BY m.category, m.item
+    """, (location_id, SAMPLE_ITEM))
+    for row in cursor:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+    yield buffer.getvalue()
+
+
+def format_diff(diff):
+    """One line per added or changed item, for the CLI and logs"""
+    lines = [f"+ {row['item']} ({row['category']}, {row['price']:.2f})" for row in diff["added"]]
+    for row, changes in diff["changed"]:
+        lines.append(f"~ {row['item']}: " + ", ".join(
+            f"{column} {old!r} -> {new!r}" for column, (old, new) in changes.items()))
+    lines.append(f"{len(diff['added'])} added, {len(diff['changed'])} changed, {diff['unchanged']} unchanged")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import or export the menu as CSV")
+    parser.add_argument("--db", default="food_hub.db")
+    parser.add_argument("--location", default=KIOSK_LOCATION, help="outlet whose stock is read or set")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write the menu as CSV")
+    export.add_argument("file", nargs="?", help="defaults to stdout")
+    load = commands.add_parser("import", help="validate a CSV and upsert it into the menu")
+    load.add_argument("file")
+    load.add_argument("--dry-run", action="store_true", help="only show what would change")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    location_id = get_location_id(conn, args.location)
+    if location_id is None:
+        raise SystemExit(f"No outlet named {args.location}")
+
+    if args.command == "export":
+        if args.file:
+            with open(args.file, "w", newline="") as f:
+                f.writelines(iter_menu_csv(conn, location_id))
+        else:
+            sys.stdout.writelines(iter_menu_csv(conn, location_id))
+    else:
+        started = time.perf_counter()
+        with open(args.file, newline="", encoding="utf-8-sig") as f:
+            rows, errors = read_menu_csv(f)
+        for line, message in errors:
+            print(f"line {line}: {message}")
+        if errors:
+            raise SystemExit(f"{len(errors)} invalid line(s), nothing imported")
+        if args.dry_run:
+            diff = diff_menu(conn, rows, location_id)
+        else:
+            diff = run_with_retry(import_menu, conn, rows, location_id)
+        for line in format_diff(diff):
+            print(line)
+        print(f"{'Checked' if args.dry_run else 'Imported'} {len(rows)} rows in {time.perf_counter() - started:.2f}s")
+    conn.close()
@@ -0,0 +1,286 @@
+import ast
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from momo_kiosk_db import bump_data_version, connect, run_with_retry
+from momo_kiosk_locations import DEFAULT_LOCATION_ID
+from momo_kiosk_rollups import record_order_rollups
+from momo_kiosk_sync import record_order
+
+# ======================
+# ORDER LINE STORAGE
+# ======================
+
+# Older orders were saved as str(list_of_dicts); numpy 2 renders values
+# as e.g. np.float64(120.0), which literal_eval cannot read.
+_NUMPY_SCALAR = re.compile(r"np\.\w+\(([^()]*)\)")
+
+
+def create_order_items_table(conn):
+    """Create the order_items table, migrating legacy rows the first time"""
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'order_items'"
+    ).fetchone()
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS order_items
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     order_id INTEGER NOT NULL,
+                     menu_item_id INTEGER,
+                     item TEXT,
+                     quantity INTEGER,
+                     price REAL,
+                     total REAL,
+                     FOREIGN KEY(order_id) REFERENCES orders(id),
+                     FOREIGN KEY(menu_item_id) REFERENCES menu(id))''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id, menu_item_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_menu ON order_items(menu_item_id)")
+
+    if not existed:
+        migrate_legacy_items(conn)
+
+
+def parse_legacy_items(text):
+    """Parse a stringified cart from orders.items, or return None"""
+    if not text:
+        return None
+    try:
+        items = ast.literal_eval(_NUMPY_SCALAR.sub(r"\1", text))
+    except (ValueError, SyntaxError):
+        return None
+    if not isinstance(items, list):
+        return None
+    return [item for item in items if isinstance(item, dict) and 'item' in item]
+
+
+def migrate_legacy_items(conn):
+    """Copy carts stored in orders.items into order_items, returns (migrated, skipped)"""
+    menu_ids = dict(conn.execute("SELECT item, id FROM menu").fetchall())
+    orders = conn.execute("""
+        SELECT id, items FROM orders o
+        WHERE items IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id)
+    """).fetchall()
+
+    rows = []
+    migrated = skipped = 0
+    for order_id, text in orders:
+        items = parse_legacy_items(text)
+        if items is None:
+            skipped += 1
+            continue
+        for item in items:
+            quantity = item.get('quantity', 0)
+            price = item.get('price', 0)
+            rows.append((order_id, menu_ids.get(item['item']), item['item'],
+                         quantity, price, item.get('total', price * quantity)))
+        migrated += 1
+
+    conn.executemany("""
+        INSERT INTO order_items (order_id, menu_item_id, item, quantity, price, total)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    return migrated, skipped
+
+
+def insert_order_items(conn, order_id, items):
+    """Write the cart lines of an order; call inside the order's transaction"""
+    conn.executemany("""
+        INSERT INTO order_items (order_id, menu_item_id, item, quantity, price, total)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(order_id, item.get('item_id'), item['item'], int(item['quantity']),
+           float(item['price']), float(item['total'])) for item in items])
+
+
+# ======================
+# ORDER WRITES
+# ======================
+
+class OutOfStockError(Exception):
+    """Raised when a cart asks for more than is in stock; nothing is written"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages  # [(item, available, requested), ...]
+        super().__init__("Not enough stock for " + ", ".join(
+            f"{item} ({available} left, {requested} requested)" for item, available, requested in shortages))
+
+
+def reserve_stock(conn, items, location_id=DEFAULT_LOCATION_ID):
+    """Decrement one outlet's stock for the whole cart in one conditional UPDATE
+
+    Must run inside a write transaction. Raises OutOfStockError listing every
+    short line, or ValueError for an empty cart, leaving the transaction to
+    be rolled back by the caller.
+    """
+    quantities = {}
+    names = {}
+    for item in items:
+        quantities[item['item_id']] = quantities.get(item['item_id'], 0) + int(item['quantity'])
+        names[item['item_id']] = item['item']
+    if not quantities:
+        raise ValueError("empty order")
+
+    cart = "WITH cart(id, qty) AS (VALUES " + ", ".join(["(?, ?)"] * len(quantities)) + ") "
+    params = [value for line in quantities.items() for value in line] + [location_id]
+
+    # The write lock is already held, so nothing can change stock between
+    # this check and the update below.
+    short = conn.execute(cart + """
+        SELECT cart.id, s.stock, cart.qty
+        FROM cart LEFT JOIN location_stock s ON s.location_id = ? AND s.menu_item_id = cart.id
+        WHERE s.menu_item_id IS NULL OR s.stock < cart.qty
+    """, params).fetchall()
+    if short:
+        raise OutOfStockError([(names[item_id], stock or 0, qty) for item_id, stock, qty in short])
+
+    conn.execute(cart + """
+        UPDATE location_stock
+        SET stock = stock - (SELECT qty FROM cart WHERE cart.id = location_stock.menu_item_id)
+        WHERE location_id = ?
+          AND menu_item_id IN (SELECT id FROM cart)
+          AND stock >= (SELECT qty FROM cart WHERE cart.id = location_stock.menu_item_id)
+    """, params)
+    # cursor.rowcount is not reported for statements starting with WITH
+    updated = conn.execute("SELECT changes()").fetchone()[0]
+    if updated != len(quantities):
+        raise OutOfStockError([(names[item_id], None, qty) for item_id, qty in quantities.items()])
+
+
+def write_order(conn, order, items):
+    """Write an order with its lines, stock, rollups and customer totals, returns the order id
+
+    Runs inside the caller's write transaction. order holds the orders columns
+    (timestamp, customer_id, subtotal, tax, discount, total, payment_mode,
+    status, staff_id, notes and optionally items, e.g. Cart.to_json(), and
+    location_id, the outlet whose stock is taken). Raises OutOfStockError
+    if stock is short and ValueError if items is empty.
+    """
+    order = {"items": None, "location_id": DEFAULT_LOCATION_ID, **order}
+    reserve_stock(conn, items, order['location_id'])
+
+    cursor = conn.execute("""
+        INSERT INTO orders 
+        (timestamp, customer_id, items, subtotal, tax, discount, total, payment_mode, status, staff_id, notes, location_id)
+        VALUES (:timestamp, :customer_id, :items, :subtotal, :tax, :discount, :total, :payment_mode, :status, :staff_id, :notes, :location_id)
+    """, order)
+    order_id = cursor.lastrowid
+    insert_order_items(conn, order_id, items)
+    record_order_rollups(conn, order['timestamp'], order['subtotal'], order['tax'],
+                         order['total'], order['payment_mode'])
+
+    customer_id = order['customer_id']
+    if customer_id and customer_id > 0:
+        conn.execute("""
+            UPDATE customers 
+            SET total_orders = total_orders + 1,
+                total_spent = total_spent + ?,
+                last_order_date = ?
+            WHERE id = ?
+        """, (order['total'], order['timestamp'], customer_id))
+
+    if order['payment_mode'] == "Credit" and customer_id:
+        conn.execute("""
+            UPDATE customers 
+            SET credit_balance = credit_balance + ?
+            WHERE id = ?
+        """, (order['total'], customer_id))
+
+    record_order(conn, order_id, order, items)
+    bump_data_version(conn, "menu")
+    return order_id
+
+
+def save_order(conn, order, items):
+    """Write one order in its own transaction, returns the order id
+
+    Raises OutOfStockError without writing anything if stock is short.
+    """
+    with conn:
+        # Take the write lock up front so the stock check cannot go stale
+        conn.execute("BEGIN IMMEDIATE")
+        return write_order(conn, order, items)
+
+
+# ======================
+# GROUP COMMIT
+# ======================
+
+class OrderWriter:
+    """Single writer thread that commits orders from every session in small batches
+
+    Each batch is one transaction, so many orders share one commit. Every
+    order runs in its own savepoint, so an out-of-stock cart fails alone
+    without affecting the rest of its batch.
+    """
+
+    def __init__(self, db_file, max_batch=32, max_wait=0.002):
+        self.db_file = db_file
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, order, items):
+        """Queue an order; the returned Future resolves to the order id once committed"""
+        future = Future()
+        self._queue.put((order, items, future))
+        return future
+
+    def close(self):
+        """Commit everything already queued, then stop the writer thread"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self):
+        job = self._queue.get()
+        if job is None:
+            return None
+        batch = [job]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)
+                break
+            batch.append(job)
+        return batch
+
+    def _write_batch(self, conn, batch):
+        results = []
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for order, items, _ in batch:
+                conn.execute("SAVEPOINT queued_order")
+                try:
+                    results.append(write_order(conn, order, items))
+                except sqlite3.OperationalError:
+                    raise
+                except Exception as e:
+                    conn.execute("ROLLBACK TO queued_order")
+                    results.append(e)
+                conn.execute("RELEASE queued_order")
+        return results
+
+    def _run(self):
+        conn = connect(self.db_file)
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            try:
+                results = run_with_retry(self._write_batch, conn, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        conn.close()
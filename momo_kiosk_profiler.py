@@ -0,0 +1,226 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+# ======================
+# QUERY PROFILER
+# ======================
+
+# Statements at or above this many milliseconds go to the slow-query log.
+# Only the most recent statements are kept, so memory use stays flat.
+SLOW_QUERY_MS = float(os.environ.get("MOMO_SLOW_QUERY_MS", 100))
+PROFILE_HISTORY = int(os.environ.get("MOMO_PROFILE_HISTORY", 10000))
+
+_current_tab = ContextVar("current_tab", default=None)
+
+
+@contextmanager
+def profile_tab(name):
+    """Attribute every statement run inside the block to the named tab"""
+    token = _current_tab.set(name)
+    try:
+        yield
+    finally:
+        _current_tab.reset(token)
+
+
+def _params_shape(params):
+    """Describe parameters by type only, so phone numbers and names are not kept on screen"""
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+
+_NEUTRAL_VALUES = {int: 0, float: 0.0, str: "", bytes: b""}
+
+
+def _neutral_params(params):
+    """Replace every parameter with an empty value of its type, enough to explain the statement"""
+    if isinstance(params, dict):
+        return {key: _NEUTRAL_VALUES.get(type(value)) for key, value in params.items()}
+    return tuple(_NEUTRAL_VALUES.get(type(value)) for value in params)
+
+
+class QueryProfiler:
+    """Process-wide log of recent statements with their timings and row counts"""
+
+    def __init__(self, history=PROFILE_HISTORY, slow_ms=SLOW_QUERY_MS):
+        # Off unless asked for; admins can also switch it on from System Settings
+        self.enabled = os.environ.get("MOMO_SQL_PROFILE", "0") == "1"
+        self.slow_ms = slow_ms
+        self._entries = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def record(self, sql, shape, params, duration_ms, rows):
+        entry = {
+            "time": datetime.now().strftime("%H:%M:%S"),
+            "tab": _current_tab.get() or "other",
+            "sql": " ".join(sql.split()),
+            "shape": shape,
+            # Only types are kept: the statement's real values never reach the log
+            "params": _neutral_params(params),
+            "duration_ms": duration_ms,
+            "rows": rows,
+        }
+        with self._lock:
+            self._entries.append(entry)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self):
+        with self._lock:
+            return list(self._entries)
+
+    def top_queries(self, limit=20):
+        """Return per-statement totals, most total time first"""
+        stats = {}
+        for entry in self.entries():
+            stat = stats.setdefault(entry["sql"], {
+                "sql": entry["sql"], "tabs": set(), "calls": 0, "total_ms": 0.0,
+                "max_ms": 0.0, "rows": 0, "params": entry["params"]
+            })
+            stat["tabs"].add(entry["tab"])
+            stat["calls"] += 1
+            stat["total_ms"] += entry["duration_ms"]
+            stat["rows"] += entry["rows"]
+            if entry["duration_ms"] >= stat["max_ms"]:
+                # Explain the slowest call with its parameter types
+                stat["max_ms"] = entry["duration_ms"]
+                stat["params"] = entry["params"]
+
+        top = sorted(stats.values(), key=lambda stat: stat["total_ms"], reverse=True)[:limit]
+        for stat in top:
+            stat["tabs"] = ", ".join(sorted(stat["tabs"]))
+            stat["avg_ms"] = stat["total_ms"] / stat["calls"]
+        return top
+
+    def slow_queries(self, threshold_ms=None):
+        """Return statements slower than the threshold, newest first"""
+        threshold_ms = self.slow_ms if threshold_ms is None else threshold_ms
+        return [entry for entry in reversed(self.entries()) if entry["duration_ms"] >= threshold_ms]
+
+
+PROFILER = QueryProfiler()
+
+
+# ======================
+# INSTRUMENTED CONNECTION
+# ======================
+
+class ProfilingCursor(sqlite3.Cursor):
+    """Cursor that times execute and every fetch, adding both to one log entry"""
+
+    _entry = None
+
+    def execute(self, sql, parameters=()):
+        if not PROFILER.enabled:
+            self._entry = None
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._entry = PROFILER.record(sql, _params_shape(parameters), parameters,
+                                      (time.perf_counter() - started) * 1000, max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        if not PROFILER.enabled:
+            self._entry = None
+            return super().executemany(sql, seq_of_parameters)
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        first = seq_of_parameters[0] if seq_of_parameters else ()
+        self._entry = PROFILER.record(sql, f"{len(seq_of_parameters)} × {_params_shape(first)}", first,
+                                      (time.perf_counter() - started) * 1000, max(self.rowcount, 0))
+        return self
+
+    # SQLite produces result rows lazily, so most of a SELECT's time is spent in the fetches
+    def _fetched(self, started, rows):
+        self._entry["duration_ms"] += (time.perf_counter() - started) * 1000
+        self._entry["rows"] += rows
+
+    def fetchone(self):
+        if self._entry is None:
+            return super().fetchone()
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        if self._entry is None:
+            return super().fetchmany(*args, **kwargs)
+        started = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        self._fetched(started, len(rows))
+        return rows
+
+    def fetchall(self):
+        if self._entry is None:
+            return super().fetchall()
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __next__(self):
+        if self._entry is None:
+            return super().__next__()
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0)
+            raise
+        self._fetched(started, 1)
+        return row
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """Connection whose statements, including those run by pd.read_sql, are recorded in PROFILER"""
+
+    def cursor(self, factory=ProfilingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# ======================
+# QUERY PLANS
+# ======================
+
+def explain_query_plan(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN of a statement as indented lines, [] if it has none"""
+    # A plain cursor, so explaining a statement does not show up in the profile
+    cursor = conn.cursor(sqlite3.Cursor)
+    try:
+        rows = cursor.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        cursor.close()
+
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def full_scans(plan):
+    """Return the plan steps that read a whole table without an index"""
+    return [line.strip() for line in plan
+            if line.strip().startswith("SCAN ") and "INDEX" not in line and "CONSTANT ROW" not in line]
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from momo_kiosk_analytics import (get_daily_sales, get_payment_mix, get_hourly_sales,
+                                  get_item_sales, get_top_customers)
+from momo_kiosk_snapshot import SnapshotExporter, SNAPSHOT_DIR, ARROW_AVAILABLE
+
+# ======================
+# REPORTS SECTION
+# ======================
+
+# The Reports section of the food hub app. It lives in its own module so
+# the app can import it when the section is first opened: plotly, pyarrow
+# and the analytics queries account for most of the app's import time.
+
+
+# Keeps the Arrow snapshot behind the Products and Customers reports current;
+# without pyarrow those reports query SQLite directly
+@st.cache_resource
+def get_snapshot_exporter(db_file):
+    return SnapshotExporter(db_file, SNAPSHOT_DIR).start()
+
+
+def render_reports(conn, db_file):
+    st.header("Sales Analytics")
+
+    if ARROW_AVAILABLE:
+        get_snapshot_exporter(db_file)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        start_date = st.date_input("Start Date", datetime.now() - timedelta(days=30))
+    with col2:
+        end_date = st.date_input("End Date", datetime.now())
+
+    start_str = start_date.strftime("%Y-%m-%d")
+    end_str = end_date.strftime("%Y-%m-%d")
+
+    daily_sales = get_daily_sales(conn, start_str, end_str)
+
+    if daily_sales.empty:
+        st.info("No orders found in selected date range")
+        return
+
+    daily_sales['date'] = pd.to_datetime(daily_sales['date'])
+
+    tab1, tab2, tab3, tab4 = st.tabs(["Summary", "Trends", "Products", "Customers"])
+
+    with tab1:
+        st.subheader("Sales Summary")
+
+        total_sales = daily_sales['revenue'].sum()
+        order_count = int(daily_sales['order_count'].sum())
+        avg_order = total_sales / order_count
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Sales", f"₹{total_sales:,.2f}")
+        col2.metric("Average Order", f"₹{avg_order:,.2f}")
+        col3.metric("Number of Orders", order_count)
+
+        st.subheader("Payment Methods")
+        payment_counts = get_payment_mix(conn, start_str, end_str)
+        fig = px.pie(payment_counts,
+                     values='order_count',
+                     names='payment_mode',
+                     title="Payment Method Distribution")
+        st.plotly_chart(fig, use_container_width=True)
+
+    with tab2:
+        st.subheader("Sales Trends")
+
+        fig = px.line(daily_sales, x='date', y='revenue',
+                     title="Daily Sales Trend",
+                     labels={'date': 'Date', 'revenue': 'Total Sales (₹)'})
+        st.plotly_chart(fig, use_container_width=True)
+
+        dow_sales = daily_sales.groupby(daily_sales['date'].dt.day_name())['revenue'].sum().reindex(
+            ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        ).rename_axis('day_of_week').reset_index()
+        fig = px.bar(dow_sales, x='day_of_week', y='revenue',
+                    title="Sales by Day of Week",
+                    labels={'day_of_week': 'Day', 'revenue': 'Total Sales (₹)'})
+        st.plotly_chart(fig, use_container_width=True)
+
+        hourly_sales = get_hourly_sales(conn, start_str, end_str)
+        fig = px.bar(hourly_sales, x='hour', y='revenue',
+                    title="Sales by Hour of Day",
+                    labels={'hour': 'Hour', 'revenue': 'Total Sales (₹)'})
+        st.plotly_chart(fig, use_container_width=True)
+
+    with tab3:
+        st.subheader("Product Performance")
+
+        items_df = get_item_sales(conn, start_str, end_str, snapshot_dir=SNAPSHOT_DIR)
+
+        if not items_df.empty:
+            top_items = items_df.groupby('item').agg({
+                'quantity': 'sum',
+                'revenue': 'sum'
+            }).sort_values('revenue', ascending=False).head(10)
+
+            st.write("Top Selling Items")
+            st.dataframe(top_items)
+
+            item_trends = items_df.pivot(index='date', columns='item', values='quantity')
+            selected_items = st.multiselect(
+                "Select items to compare",
+                options=item_trends.columns,
+                default=list(top_items.index[:3])
+            )
+
+            if selected_items:
+                fig = px.line(item_trends[selected_items],
+                             title="Item Sales Trends",
+                             labels={'value': 'Quantity Sold', 'date': 'Date'})
+                st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("No item sales in selected period")
+
+    with tab4:
+        st.subheader("Customer Insights")
+
+        top_customers = get_top_customers(conn, start_str, end_str, snapshot_dir=SNAPSHOT_DIR)
+
+        if not top_customers.empty:
+            st.write("Top Customers by Spending")
+            st.dataframe(top_customers.rename(columns={
+                'order_count': 'Orders',
+                'total_spent': 'Total Spent',
+                'name': 'Customer'
+            }))
+        else:
+            st.info("No customer orders in selected period")
@@ -0,0 +1,118 @@
+import argparse
+import sqlite3
+
+# ======================
+# SALES ROLLUPS
+# ======================
+
+ROLLUP_TABLES = ("sales_daily", "sales_hourly", "sales_daily_payment")
+
+
+def create_rollup_tables(conn):
+    """Create the sales rollup tables, returns True if they were just backfilled"""
+    existed = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales_daily'"
+    ).fetchone()
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS sales_daily
+                    (date TEXT PRIMARY KEY,
+                     order_count INTEGER DEFAULT 0,
+                     subtotal REAL DEFAULT 0,
+                     tax REAL DEFAULT 0,
+                     revenue REAL DEFAULT 0)''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS sales_hourly
+                    (date TEXT,
+                     hour INTEGER,
+                     order_count INTEGER DEFAULT 0,
+                     tax REAL DEFAULT 0,
+                     revenue REAL DEFAULT 0,
+                     PRIMARY KEY(date, hour))''')
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS sales_daily_payment
+                    (date TEXT,
+                     payment_mode TEXT,
+                     order_count INTEGER DEFAULT 0,
+                     revenue REAL DEFAULT 0,
+                     PRIMARY KEY(date, payment_mode))''')
+
+    if not existed:
+        rebuild_rollups(conn)
+    return not existed
+
+
+def record_order_rollups(conn, timestamp, subtotal, tax, total, payment_mode):
+    """Add one order to the rollups; call inside the order's transaction"""
+    date, hour = timestamp[:10], int(timestamp[11:13])
+
+    conn.execute("""
+        INSERT INTO sales_daily (date, order_count, subtotal, tax, revenue)
+        VALUES (?, 1, ?, ?, ?)
+        ON CONFLICT(date) DO UPDATE SET
+            order_count = order_count + 1,
+            subtotal = subtotal + excluded.subtotal,
+            tax = tax + excluded.tax,
+            revenue = revenue + excluded.revenue
+    """, (date, subtotal, tax, total))
+
+    conn.execute("""
+        INSERT INTO sales_hourly (date, hour, order_count, tax, revenue)
+        VALUES (?, ?, 1, ?, ?)
+        ON CONFLICT(date, hour) DO UPDATE SET
+            order_count = order_count + 1,
+            tax = tax + excluded.tax,
+            revenue = revenue + excluded.revenue
+    """, (date, hour, tax, total))
+
+    conn.execute("""
+        INSERT INTO sales_daily_payment (date, payment_mode, order_count, revenue)
+        VALUES (?, ?, 1, ?)
+        ON CONFLICT(date, payment_mode) DO UPDATE SET
+            order_count = order_count + 1,
+            revenue = revenue + excluded.revenue
+    """, (date, payment_mode, total))
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup table from the orders table"""
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+
+    conn.execute("""
+        INSERT INTO sales_daily (date, order_count, subtotal, tax, revenue)
+        SELECT date(timestamp), COUNT(*), TOTAL(subtotal), TOTAL(tax), TOTAL(total)
+        FROM orders
+        WHERE timestamp IS NOT NULL
+        GROUP BY date(timestamp)
+    """)
+
+    conn.execute("""
+        INSERT INTO sales_hourly (date, hour, order_count, tax, revenue)
+        SELECT date(timestamp), CAST(strftime('%H', timestamp) AS INTEGER),
+               COUNT(*), TOTAL(tax), TOTAL(total)
+        FROM orders
+        WHERE timestamp IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+    conn.execute("""
+        INSERT INTO sales_daily_payment (date, payment_mode, order_count, revenue)
+        SELECT date(timestamp), payment_mode, COUNT(*), TOTAL(total)
+        FROM orders
+        WHERE timestamp IS NOT NULL
+        GROUP BY 1, 2
+    """)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the sales rollup tables from orders")
+    parser.add_argument("db_file", nargs="?", default="food_hub.db")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db_file)
+    with conn:
+        if not create_rollup_tables(conn):
+            rebuild_rollups(conn)
+    days = conn.execute("SELECT COUNT(*) FROM sales_daily").fetchone()[0]
+    print(f"Rebuilt rollups for {days} days in {args.db_file}")
+    conn.close()
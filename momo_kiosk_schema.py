@@ -0,0 +1,257 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+
+from momo_kiosk_cdc import create_cdc_tables, drop_untracked_triggers, gate_cdc_triggers
+from momo_kiosk_customers import create_customer_search, create_directory_indexes
+from momo_kiosk_db import connect, create_data_version_table, get_generation, run_with_retry
+from momo_kiosk_locations import create_location_tables
+from momo_kiosk_orders import create_order_items_table
+from momo_kiosk_rollups import create_rollup_tables
+from momo_kiosk_sync import create_outbox_tables
+
+# ======================
+# MIGRATIONS
+# ======================
+
+# A database's schema version is its PRAGMA user_version: the number of
+# migrations from its list already applied. Each migration runs in its own
+# write transaction together with the version bump, so an interrupted
+# upgrade resumes at the step it stopped on. Files from before versioning
+# start at 0 with some tables already there, so every step must be safe to
+# run on a database that partly has it.
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations):
+    """Apply the migrations conn has not had yet, returns how many were applied"""
+    applied = 0
+    while schema_version(conn) < len(migrations):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            version = schema_version(conn)
+            if version >= len(migrations):
+                conn.rollback()
+                break
+            migrations[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied += 1
+    return applied
+
+
+def _backup(conn, backup_file):
+    target = sqlite3.connect(backup_file)
+    try:
+        conn.backup(target)
+    finally:
+        target.close()
+
+
+_ready = {}
+_ready_lock = threading.Lock()
+
+
+def ensure_schema(db_file, migrations):
+    """Migrate db_file once per process, and again once a restore has replaced it
+
+    Later calls are a dictionary lookup, so the apps can call this on every
+    rerun. An existing database is copied to <db_file>.v<version>.bak
+    before its first pending migration.
+    """
+    key = os.path.abspath(db_file)
+    generation = get_generation(db_file)
+    if _ready.get(key) == generation:
+        return
+    with _ready_lock:
+        if _ready.get(key) == generation:
+            return
+        conn = connect(db_file)
+        try:
+            version = schema_version(conn)
+            has_tables = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' LIMIT 1").fetchone()
+            if version < len(migrations) and has_tables:
+                _backup(conn, f"{db_file}.v{version}.bak")
+            run_with_retry(migrate, conn, migrations)
+        finally:
+            conn.close()
+        _ready[key] = generation
+
+
+# ======================
+# FOOD HUB SCHEMA
+# ======================
+
+def _food_hub_base(conn):
+    c = conn.cursor()
+
+    c.execute('''CREATE TABLE IF NOT EXISTS orders
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  timestamp TEXT,
+                  customer_id INTEGER,
+                  items TEXT,
+                  subtotal REAL,
+                  tax REAL,
+                  discount REAL,
+                  total REAL,
+                  payment_mode TEXT,
+                  status TEXT DEFAULT 'Pending',
+                  staff_id INTEGER,
+                  notes TEXT,
+                  FOREIGN KEY(customer_id) REFERENCES customers(id),
+                  FOREIGN KEY(staff_id) REFERENCES users(id))''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS customers
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  name TEXT,
+                  phone TEXT UNIQUE,
+                  email TEXT,
+                  address TEXT,
+                  credit_balance REAL DEFAULT 0,
+                  total_orders INTEGER DEFAULT 0,
+                  total_spent REAL DEFAULT 0,
+                  join_date TEXT,
+                  last_order_date TEXT,
+                  is_active INTEGER DEFAULT 1)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS menu
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  category TEXT,
+                  item TEXT UNIQUE,
+                  description TEXT,
+                  price REAL,
+                  cost REAL,
+                  stock INTEGER,
+                  min_stock INTEGER DEFAULT 5,
+                  is_available INTEGER DEFAULT 1)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  username TEXT UNIQUE,
+                  password TEXT,
+                  full_name TEXT,
+                  role TEXT,
+                  is_active INTEGER DEFAULT 1,
+                  last_login TEXT)''')
+
+    c.execute("SELECT 1 FROM users WHERE username='admin'")
+    if not c.fetchone():
+        c.execute("INSERT INTO users (username, password, full_name, role) VALUES (?, ?, ?, ?)",
+                  ("admin", hash_password("admin123"), "System Administrator", "Admin"))
+
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(timestamp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_menu_category ON menu(category)")
+
+
+# Append only; a released step is never edited or reordered
+FOOD_HUB_MIGRATIONS = [
+    _food_hub_base,
+    create_order_items_table,
+    create_rollup_tables,
+    create_data_version_table,
+    create_customer_search,
+    create_directory_indexes,
+    create_location_tables,
+    create_outbox_tables,
+    create_cdc_tables,
+    gate_cdc_triggers,
+    drop_untracked_triggers,
+]
+
+
+def init_food_hub(conn):
+    """Bring a food_hub.db connection up to the current schema, returns the number of migrations applied"""
+    return migrate(conn, FOOD_HUB_MIGRATIONS)
+
+
+# ======================
+# FOOD ORDERS SCHEMA
+# ======================
+
+def _food_orders_base(conn):
+    c = conn.cursor()
+
+    c.execute('''CREATE TABLE IF NOT EXISTS orders
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  timestamp TEXT,
+                  customer TEXT,
+                  items TEXT,
+                  total REAL,
+                  payment_mode TEXT,
+                  status TEXT,
+                  staff TEXT)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS customers
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  name TEXT UNIQUE,
+                  phone TEXT,
+                  credit_balance REAL DEFAULT 0,
+                  total_orders INTEGER DEFAULT 0,
+                  total_spent REAL DEFAULT 0)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS menu
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  category TEXT,
+                  item TEXT UNIQUE,
+                  price REAL,
+                  cost REAL,
+                  stock INTEGER)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS users
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  username TEXT UNIQUE,
+                  password TEXT,
+                  role TEXT)''')
+
+    c.execute("SELECT 1 FROM users WHERE username='admin'")
+    if not c.fetchone():
+        c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                  ("admin", hash_password("admin123"), "Admin"))
+
+
+def _food_orders_timestamp_index(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_timestamp ON orders(timestamp)")
+
+
+FOOD_ORDERS_MIGRATIONS = [
+    _food_orders_base,
+    create_order_items_table,
+    _food_orders_timestamp_index,
+]
+
+SCHEMAS = {
+    "food_hub": FOOD_HUB_MIGRATIONS,
+    "food_orders": FOOD_ORDERS_MIGRATIONS,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show a database's schema version and apply pending migrations")
+    parser.add_argument("--db", default="food_hub.db")
+    parser.add_argument("--schema", choices=list(SCHEMAS), default="food_hub")
+    parser.add_argument("--check", action="store_true", help="only report the version")
+    args = parser.parse_args()
+
+    migrations = SCHEMAS[args.schema]
+    conn = connect(args.db)
+    version = schema_version(conn)
+    conn.close()
+    print(f"{args.db}: version {version} of {len(migrations)}")
+    if not args.check and version < len(migrations):
+        ensure_schema(args.db, migrations)
+        conn = connect(args.db)
+        print(f"Migrated to version {schema_version(conn)}")
+        conn.close()
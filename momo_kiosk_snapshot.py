@@ -0,0 +1,354 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+except ImportError:  # reports fall back to querying SQLite
+    pa = None
+
+ARROW_AVAILABLE = pa is not None
+
+from momo_kiosk_cdc import INSERT, changed_rows, consume, latest_seq, prune_changes, save_checkpoint
+from momo_kiosk_db import connect, get_generation
+
+# ======================
+# ANALYTICS SNAPSHOT
+# ======================
+
+# Orders and order lines are exported to uncompressed Arrow IPC files, one
+# directory per month, so reports can memory-map just the months and columns
+# they need. Each export appends new part files for orders past the last
+# exported id; months that collect too many parts are compacted, and months
+# holding orders edited or deleted since (found in the change log) are
+# rewritten from SQLite.
+SNAPSHOT_DIR = os.environ.get("MOMO_SNAPSHOT_DIR", "analytics/")
+SNAPSHOT_INTERVAL = float(os.environ.get("MOMO_SNAPSHOT_INTERVAL", 300))
+EXPORT_CHUNK = 100_000
+MAX_PARTS = 16
+CDC_CONSUMER = "snapshot"
+
+ORDER_COLUMNS = ("id", "timestamp", "customer_id", "subtotal", "tax", "discount", "total",
+                 "payment_mode", "status", "staff_id")
+
+if pa is not None:
+    _TEXT = pa.dictionary(pa.int32(), pa.string())
+    SCHEMAS = {
+        "orders": pa.schema([
+            ("id", pa.int64()), ("timestamp", pa.timestamp("s")), ("customer_id", pa.int64()),
+            ("subtotal", pa.float64()), ("tax", pa.float64()), ("discount", pa.float64()),
+            ("total", pa.float64()), ("payment_mode", _TEXT), ("status", _TEXT), ("staff_id", pa.int32())
+        ]),
+        "lines": pa.schema([
+            ("order_id", pa.int64()), ("timestamp", pa.timestamp("s")), ("menu_item_id", pa.int32()),
+            ("item", _TEXT), ("quantity", pa.int32()), ("price", pa.float64()), ("total", pa.float64())
+        ]),
+    }
+
+_ORDERS_QUERY = "SELECT " + ", ".join("o." + column for column in ORDER_COLUMNS) + " FROM orders o"
+_LINES_QUERY = """
+    SELECT oi.order_id, o.timestamp, oi.menu_item_id, oi.item, oi.quantity, oi.price, oi.total
+    FROM order_items oi
+    JOIN orders o ON o.id = oi.order_id
+"""
+
+
+def snapshot_available(snapshot_dir=SNAPSHOT_DIR):
+    return ARROW_AVAILABLE and os.path.exists(os.path.join(snapshot_dir, "state.json"))
+
+
+def _load_state(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, "state.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"generation": None, "last_order_id": 0}
+
+
+def _save_state(snapshot_dir, state):
+    path = os.path.join(snapshot_dir, "state.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _to_table(kind, rows):
+    schema = SCHEMAS[kind]
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.name == "timestamp":
+            array = pc.strptime(pa.array(values, pa.string()), format="%Y-%m-%d %H:%M:%S",
+                                unit="s", error_is_null=True)
+        elif pa.types.is_dictionary(field.type):
+            array = pa.array(values, pa.string()).dictionary_encode()
+        else:
+            array = pa.array(values, field.type)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_table(path, table):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pa.OSFile(path + ".tmp", "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(path + ".tmp", path)
+
+
+def _month_parts(month_dir):
+    """Return the part files of one month, skipping any already merged into a compacted part"""
+    parts = []
+    for name in os.listdir(month_dir):
+        if name.endswith(".arrow"):
+            first, last = name[:-6].split("-")
+            parts.append((int(first), int(last), os.path.join(month_dir, name)))
+    # A compaction interrupted before removing its inputs leaves parts
+    # covered by the merged one; reading both would double count
+    kept = []
+    for first, last, path in sorted(parts, key=lambda part: (part[0], -part[1])):
+        if not kept or last > kept[-1][1]:
+            kept.append((first, last, path))
+    return kept
+
+
+def _read_part(path):
+    # Uncompressed IPC is read zero-copy, so unused columns are never paged in
+    with pa.memory_map(path) as source:
+        return ipc.open_file(source).read_all()
+
+
+def _compact_month(month_dir):
+    parts = _month_parts(month_dir)
+    if len(parts) <= MAX_PARTS:
+        return
+    table = pa.concat_tables([_read_part(path) for _, _, path in parts]).combine_chunks()
+    _write_table(os.path.join(month_dir, f"{parts[0][0]:012d}-{parts[-1][1]:012d}.arrow"), table)
+    for _, _, path in parts:
+        os.remove(path)
+
+
+def _write_chunk(snapshot_dir, kind, rows, first_id, last_id):
+    """Split one chunk of rows by month and write a part file per month, returns the months touched"""
+    months = {}
+    for row in rows:
+        if row[1]:
+            months.setdefault(row[1][:7], []).append(row)
+    for month, month_rows in months.items():
+        _write_table(os.path.join(snapshot_dir, kind, month, f"{first_id:012d}-{last_id:012d}.arrow"),
+                     _to_table(kind, month_rows))
+    return set(months)
+
+
+def _next_month(month):
+    return (datetime.strptime(month, "%Y-%m") + timedelta(days=32)).strftime("%Y-%m")
+
+
+def _rebuild_month(conn, snapshot_dir, month, last_id):
+    """Replace a month's parts with one part read from SQLite, up to last_id"""
+    params = (month + "-01", _next_month(month) + "-01", last_id)
+    where = " WHERE o.timestamp >= ? AND o.timestamp < ? AND o.id <= ?"
+    for kind, query in (("orders", _ORDERS_QUERY), ("lines", _LINES_QUERY)):
+        month_dir = os.path.join(snapshot_dir, kind, month)
+        old = [path for _, _, path in _month_parts(month_dir)] if os.path.isdir(month_dir) else []
+        rows = conn.execute(query + where, params).fetchall()
+        # Covers every id up to last_id, so readers skip the old parts until they are gone
+        path = os.path.join(month_dir, f"{1:012d}-{last_id:012d}.arrow")
+        if rows:
+            _write_table(path, _to_table(kind, rows))
+        for old_path in old:
+            if old_path != path:
+                os.remove(old_path)
+
+
+def _changed_months(conn, snapshot_dir, order_ids):
+    """Return the months that hold, or held, any of the orders"""
+    ids = list(order_ids)
+    months = {row[0] for row in conn.execute(
+        f"SELECT DISTINCT substr(timestamp, 1, 7) FROM orders WHERE id IN ({', '.join('?' * len(ids))})", ids
+    ) if row[0]}
+    # Deleted orders, or ones moved to another month, are found in the parts;
+    # only the memory-mapped id column is read
+    value_set = pa.array(ids, pa.int64())
+    kind_dir = os.path.join(snapshot_dir, "orders")
+    for month in os.listdir(kind_dir) if os.path.isdir(kind_dir) else []:
+        if month in months:
+            continue
+        for first, last, path in _month_parts(os.path.join(kind_dir, month)):
+            if not any(first <= order_id <= last for order_id in ids):
+                continue
+            if pc.any(pc.is_in(_read_part(path)["id"], value_set=value_set)).as_py():
+                months.add(month)
+                break
+    return months
+
+
+def export_snapshot(conn, db_file, snapshot_dir=SNAPSHOT_DIR, chunk=EXPORT_CHUNK):
+    """Append orders newer than the last export to the snapshot, returns the number exported
+
+    The snapshot is rebuilt from scratch after a restore, since every order
+    may have changed.
+    """
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is required for the analytics snapshot")
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    state = _load_state(snapshot_dir)
+    generation = get_generation(db_file)
+    max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0]
+    if state["generation"] != generation or max_id < state["last_order_id"]:
+        for kind in SCHEMAS:
+            shutil.rmtree(os.path.join(snapshot_dir, kind), ignore_errors=True)
+        state = {"generation": generation, "last_order_id": 0}
+        _save_state(snapshot_dir, state)
+        # Everything is read afresh, so earlier changes are already included
+        with conn:
+            save_checkpoint(conn, CDC_CONSUMER, latest_seq(conn))
+
+    previous_last_id = state["last_order_id"]
+    exported = 0
+    touched = set()
+    while True:
+        last_id = state["last_order_id"]
+        orders = conn.execute(_ORDERS_QUERY + " WHERE o.id > ? ORDER BY o.id LIMIT ?", (last_id, chunk)).fetchall()
+        if not orders:
+            break
+        new_last_id = orders[-1][0]
+        lines = conn.execute(_LINES_QUERY + " WHERE oi.order_id > ? AND oi.order_id <= ?",
+                             (last_id, new_last_id)).fetchall()
+
+        for kind, rows in (("orders", orders), ("lines", lines)):
+            touched |= {(kind, month) for month in _write_chunk(snapshot_dir, kind, rows, last_id + 1, new_last_id)}
+        # Saved after the files, so an interrupted export rewrites the same parts
+        state["last_order_id"] = new_last_id
+        _save_state(snapshot_dir, state)
+        exported += len(orders)
+
+    for kind, month in touched:
+        _compact_month(os.path.join(snapshot_dir, kind, month))
+
+    def refresh(changes):
+        # New orders were just appended; anything else touched exported rows
+        order_ids = [order_id for order_id, op in changed_rows(changes).get("orders", {}).items()
+                     if op != INSERT or order_id <= previous_last_id]
+        if order_ids:
+            for month in _changed_months(conn, snapshot_dir, order_ids):
+                _rebuild_month(conn, snapshot_dir, month, state["last_order_id"])
+
+    consume(conn, CDC_CONSUMER, refresh, tables=["orders"])
+    return exported
+
+
+class SnapshotExporter:
+    """Background thread that keeps the snapshot current every interval seconds"""
+
+    def __init__(self, db_file, snapshot_dir=SNAPSHOT_DIR, interval=SNAPSHOT_INTERVAL):
+        self.db_file = db_file
+        self.snapshot_dir = snapshot_dir
+        self.interval = interval
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="snapshot-exporter", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = connect(self.db_file)
+        while True:
+            try:
+                export_snapshot(conn, self.db_file, self.snapshot_dir)
+                with conn:
+                    prune_changes(conn)
+                self.error = None
+            except Exception as e:
+                self.error = e
+            if self._stop.wait(self.interval):
+                break
+        conn.close()
+
+
+# ======================
+# SNAPSHOT READS
+# ======================
+
+def _read_month(month_dir, columns):
+    try:
+        return [_read_part(path).select(columns) for _, _, path in _month_parts(month_dir)]
+    except FileNotFoundError:
+        # Compacted between listing and reading; the merged part is there now
+        return [_read_part(path).select(columns) for _, _, path in _month_parts(month_dir)]
+
+
+def _iter(conn, snapshot_dir, kind, query, id_column, start, end, columns, batch_rows):
+    """Yield one table for an inclusive YYYY-MM-DD range in batches, ending with orders not yet exported"""
+    columns = list(columns or SCHEMAS[kind].names)
+    id_name = id_column.split(".")[1]
+    needed = list(dict.fromkeys(columns + ["timestamp", id_name]))
+    low = pa.scalar(datetime.fromisoformat(start), pa.timestamp("s"))
+    high = datetime.fromisoformat(end) + timedelta(days=1)
+
+    # Read before the parts; anything an export adds meanwhile is past
+    # last_id, filtered out below and picked up from SQLite instead
+    last_id = _load_state(snapshot_dir)["last_order_id"]
+
+    kind_dir = os.path.join(snapshot_dir, kind)
+    for month in sorted(os.listdir(kind_dir)) if os.path.isdir(kind_dir) else []:
+        if not start[:7] <= month <= end[:7]:
+            continue
+        # Parts are memory-mapped; slicing them into batches copies nothing,
+        # so only one filtered batch is materialized at a time
+        for part in _read_month(os.path.join(kind_dir, month), needed):
+            for batch in part.to_batches(max_chunksize=batch_rows):
+                timestamps = batch["timestamp"]
+                mask = pc.and_(pc.and_(pc.greater_equal(timestamps, low),
+                                       pc.less(timestamps, pa.scalar(high, pa.timestamp("s")))),
+                               pc.less_equal(batch[id_name], last_id))
+                batch = batch.filter(mask)
+                if batch.num_rows:
+                    yield pa.Table.from_batches([batch]).select(columns)
+
+    # Orders committed since the last export are few, so read them directly.
+    # The unary + keeps SQLite on the id range rather than the date index,
+    # which would walk every order in a long range.
+    cursor = conn.execute(query + f" WHERE {id_column} > ? AND +o.timestamp >= ? AND +o.timestamp < ?",
+                          (last_id, start, high.strftime("%Y-%m-%d")))
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            yield _to_table(kind, rows).select(columns)
+    finally:
+        cursor.close()
+
+
+def iter_orders(conn, start, end, columns=None, batch_rows=EXPORT_CHUNK, snapshot_dir=SNAPSHOT_DIR):
+    """Yield the orders placed between start and end as Arrow tables of at most batch_rows rows"""
+    return _iter(conn, snapshot_dir, "orders", _ORDERS_QUERY, "o.id", start, end, columns, batch_rows)
+
+
+def iter_order_lines(conn, start, end, columns=None, batch_rows=EXPORT_CHUNK, snapshot_dir=SNAPSHOT_DIR):
+    """Yield the order lines of orders placed between start and end as Arrow tables of at most batch_rows rows"""
+    return _iter(conn, snapshot_dir, "lines", _LINES_QUERY, "oi.order_id", start, end, columns, batch_rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export new orders to the Arrow analytics snapshot")
+    parser.add_argument("--db", default="food_hub.db")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    exported = export_snapshot(conn, args.db, args.dir)
+    conn.close()
+    print(f"Exported {exported} orders to {args.dir}")
@@ -0,0 +1,126 @@
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+# ======================
+# STARTUP TIMING
+# ======================
+
+# Cold start is measured in fresh interpreters, the way a kiosk restart
+# sees it: one imports the app's top-level modules under -X importtime, the
+# other runs the app script once with Streamlit's AppTest, from a bare
+# interpreter to the first page (the login screen) being rendered.
+STARTUP_BUDGET_MS = float(os.environ.get("MOMO_STARTUP_BUDGET_MS", 3000))
+DEFAULT_APP = "momo_kiosk_csv_app_fixed.py"
+
+_FIRST_RENDER = """
+import sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+elapsed = (time.perf_counter() - started) * 1000
+if app.exception:
+    raise SystemExit(app.exception[0].message)
+print(elapsed)
+"""
+
+
+def app_imports(app_file):
+    """Return the app's top-level import statements as source"""
+    with open(app_file) as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return "\n".join(ast.get_source_segment(source, node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def _imported_roots(statements):
+    roots = set()
+    for node in ast.parse(statements).body:
+        names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module]
+        roots.update(name.split(".")[0] for name in names)
+    return roots
+
+
+def _run(app_file, args):
+    result = subprocess.run([sys.executable] + args, cwd=os.path.dirname(os.path.abspath(app_file)),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines() or ["exited with " + str(result.returncode)]
+        raise RuntimeError(lines[-1])
+    return result
+
+
+def import_times(app_file):
+    """Return [(module, ms), ...] for the modules the app's imports load, slowest first
+
+    Each module is charged with everything it imports the first time, so a
+    module pulled in earlier by another one costs nothing here.
+    """
+    statements = app_imports(app_file)
+    roots = _imported_roots(statements)
+    result = _run(app_file, ["-X", "importtime", "-c", statements])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that triggered them
+        if not cumulative.strip().isdigit() or name[1:].startswith(" "):
+            continue
+        name = name.strip()
+        if name.split(".")[0] in roots:
+            times[name] = times.get(name, 0) + int(cumulative) / 1000
+    return sorted(times.items(), key=lambda item: item[1], reverse=True)
+
+
+def first_render_ms(app_file):
+    """Time a fresh interpreter taking one run of the app script to its first page"""
+    result = _run(app_file, ["-c", _FIRST_RENDER, os.path.basename(app_file)])
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def startup_report(app_file, render=True):
+    modules = import_times(app_file)
+    report = {
+        "app": app_file,
+        "import_ms": round(sum(ms for _, ms in modules), 1),
+        "modules": {name: round(ms, 1) for name, ms in modules},
+    }
+    if render:
+        report["first_render_ms"] = round(first_render_ms(app_file), 1)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the app's imports and first page render from a cold interpreter")
+    parser.add_argument("--app", default=DEFAULT_APP)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="exit 1 when the first render (or the imports, with --imports-only) takes longer")
+    parser.add_argument("--imports-only", action="store_true", help="skip the first render, which needs streamlit")
+    parser.add_argument("--top", type=int, default=15, help="modules to list")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    try:
+        report = startup_report(args.app, render=not args.imports_only)
+    except RuntimeError as e:
+        raise SystemExit(f"Could not time {args.app}: {e}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, ms in list(report["modules"].items())[:args.top]:
+            print(f"{name:40} {ms:9.1f} ms")
+        print(f"{'imports':40} {report['import_ms']:9.1f} ms")
+        if "first_render_ms" in report:
+            print(f"{'first render':40} {report['first_render_ms']:9.1f} ms")
+
+    measured = report.get("first_render_ms", report["import_ms"])
+    if measured > args.budget_ms:
+        print(f"OVER BUDGET: {measured:.1f} ms > {args.budget_ms:.1f} ms")
+        raise SystemExit(1)
@@ -0,0 +1,432 @@
+import argparse
+import gzip
+import json
+import os
+import socket
+import threading
+from datetime import datetime
+
+from momo_kiosk_db import connect, raise_sequence_floor, run_with_retry
+
+# ======================
+# OUTBOX
+# ======================
+
+# Every order, customer, credit and stock change is appended to the outbox
+# in the same transaction as the change itself, so a kiosk that is offline
+# for a day ships exactly what happened once the share is reachable again.
+# Rows refer to customers by phone and to menu items by name, since ids
+# differ between kiosks. Shipped rows are pruned after every sync.
+NODE_ID = os.environ.get("MOMO_NODE_ID", socket.gethostname())
+# The share standing in for the central server; kiosks do not sync without one
+CENTRAL_DIR = os.environ.get("MOMO_CENTRAL_DIR", "")
+# Nothing would ever ship the outbox without a central share, so by default
+# changes are only recorded when one is configured
+OUTBOX_ENABLED = os.environ.get("MOMO_OUTBOX", "1" if CENTRAL_DIR else "0") == "1"
+SYNC_INTERVAL = float(os.environ.get("MOMO_SYNC_INTERVAL", 60))
+SYNC_BATCH = 500
+
+
+def create_outbox_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS outbox
+                    (seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                     kind TEXT NOT NULL,
+                     key TEXT NOT NULL,
+                     payload TEXT NOT NULL,
+                     created_at TEXT NOT NULL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS sync_state
+                    (name TEXT PRIMARY KEY,
+                     value INTEGER)''')
+
+
+def record_change(conn, kind, key, payload):
+    """Append one change to the outbox; call inside the transaction that made it"""
+    if not OUTBOX_ENABLED:
+        return
+    conn.execute("INSERT INTO outbox (kind, key, payload, created_at) VALUES (?, ?, ?, ?)",
+                 (kind, str(key), json.dumps(payload, separators=(",", ":")),
+                  datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def record_stock(conn, location_id, menu_item_ids):
+    """Record the current stock level of some items at one outlet"""
+    if not OUTBOX_ENABLED or not menu_item_ids:
+        return
+    ids = list(menu_item_ids)
+    rows = conn.execute(f"""
+        SELECT m.item, s.stock
+        FROM location_stock s
+        JOIN menu m ON m.id = s.menu_item_id
+        WHERE s.location_id = ? AND s.menu_item_id IN ({', '.join('?' * len(ids))})
+    """, [location_id] + ids).fetchall()
+    for item, stock in rows:
+        record_change(conn, "stock", f"{location_id}:{item}",
+                      {"location_id": location_id, "item": item, "stock": stock})
+
+
+def record_order(conn, order_id, order, items):
+    """Record a placed order with its lines, and the stock it left behind"""
+    if not OUTBOX_ENABLED:
+        return
+    phone = None
+    if order.get('customer_id'):
+        row = conn.execute("SELECT phone FROM customers WHERE id = ?", (order['customer_id'],)).fetchone()
+        phone = row[0] if row else None
+    payload = {column: order.get(column) for column in (
+        "timestamp", "subtotal", "tax", "discount", "total", "payment_mode", "status", "notes", "location_id")}
+    payload.update(id=order_id, customer_phone=phone,
+                   lines=[[item['item'], int(item['quantity']), float(item['price']), float(item['total'])]
+                          for item in items])
+    record_change(conn, "order", order_id, payload)
+    record_stock(conn, order.get('location_id'), {item['item_id'] for item in items})
+
+
+def record_customer(conn, customer_id, previous_phone=None):
+    """Record a customer's profile after it was added or edited"""
+    if not OUTBOX_ENABLED:
+        return
+    row = conn.execute("""
+        SELECT phone, name, email, address, join_date, is_active FROM customers WHERE id = ?
+    """, (customer_id,)).fetchone()
+    if row is None:
+        return
+    payload = dict(zip(("phone", "name", "email", "address", "join_date", "is_active"), row))
+    payload["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    if previous_phone and previous_phone != payload["phone"]:
+        payload["previous_phone"] = previous_phone
+    record_change(conn, "customer", payload["phone"], payload)
+
+
+def record_credit(conn, phone, delta):
+    """Record a manual change to a customer's credit balance, as a difference"""
+    if delta:
+        record_change(conn, "credit", phone, {"phone": phone, "delta": round(delta, 2)})
+
+
+# Set-based forms of the two above for bulk writes: one INSERT ... SELECT
+# builds the payloads in SQL instead of a statement per customer
+
+def record_customers(conn, condition, params=()):
+    """Record the profiles of every customer matching a WHERE condition"""
+    if not OUTBOX_ENABLED:
+        return
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute(f"""
+        INSERT INTO outbox (kind, key, payload, created_at)
+        SELECT 'customer', phone,
+               json_object('phone', phone, 'name', name, 'email', email, 'address', address,
+                           'join_date', join_date, 'is_active', is_active, 'updated_at', ?),
+               ?
+        FROM customers
+        WHERE {condition}
+        ORDER BY id
+    """, (now, now, *params))
+
+
+def record_credits(conn, query, params=()):
+    """Record credit balance differences for the (phone, delta) rows a query returns"""
+    if not OUTBOX_ENABLED:
+        return
+    conn.execute(f"""
+        INSERT INTO outbox (kind, key, payload, created_at)
+        SELECT 'credit', phone, json_object('phone', phone, 'delta', round(delta, 2)), ?
+        FROM ({query})
+        WHERE round(delta, 2) != 0
+    """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), *params))
+
+
+# ======================
+# SHIPPING
+# ======================
+
+# Batches are gzipped JSON files dropped into <central dir>/inbox, written
+# under a temporary name and renamed so the ingester never sees half a file.
+# The shipped watermark is saved after the file, so a crash in between
+# ships the same changes again, which the central side ignores. Before a
+# batch is written, its last seq also becomes the outbox's sequence floor
+# (kept outside the database), so changes made after a restore get new
+# seqs above everything central has applied instead of reusing old ones.
+
+def _get_state(conn, name):
+    row = conn.execute("SELECT value FROM sync_state WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def _set_state(conn, name, value):
+    conn.execute("""
+        INSERT INTO sync_state (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = excluded.value
+    """, (name, value))
+
+
+def ship_changes(conn, central_dir, node=NODE_ID, batch_size=SYNC_BATCH):
+    """Write outbox rows not yet shipped to the central inbox, returns the number shipped"""
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    inbox = os.path.join(central_dir, "inbox")
+    os.makedirs(inbox, exist_ok=True)
+    shipped = 0
+    while True:
+        last_seq = _get_state(conn, "shipped_seq")
+        rows = conn.execute("""
+            SELECT seq, kind, key, payload, created_at FROM outbox WHERE seq > ? ORDER BY seq LIMIT ?
+        """, (last_seq, batch_size)).fetchall()
+        if not rows:
+            break
+        batch = {
+            "node": node,
+            "changes": [[seq, kind, key, json.loads(payload), created_at]
+                        for seq, kind, key, payload, created_at in rows],
+        }
+        if db_file:
+            raise_sequence_floor(db_file, "outbox", rows[-1][0])
+        path = os.path.join(inbox, f"{node}-{rows[0][0]:012d}-{rows[-1][0]:012d}.json.gz")
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+            json.dump(batch, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+        with conn:
+            _set_state(conn, "shipped_seq", rows[-1][0])
+        shipped += len(rows)
+    return shipped
+
+
+def prune_outbox(conn):
+    """Delete outbox rows that have been shipped, returns the number deleted"""
+    with conn:
+        return conn.execute("DELETE FROM outbox WHERE seq <= ?", (_get_state(conn, "shipped_seq"),)).rowcount
+
+
+class SyncWorker:
+    """Background thread that ships, then prunes, new changes every interval seconds, doing nothing while the share is away"""
+
+    def __init__(self, db_file, central_dir, interval=SYNC_INTERVAL):
+        self.db_file = db_file
+        self.central_dir = central_dir
+        self.interval = interval
+        self.error = None
+        self.last_sync = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = connect(self.db_file)
+        while True:
+            try:
+                run_with_retry(ship_changes, conn, self.central_dir)
+                run_with_retry(prune_outbox, conn)
+                self.error = None
+                self.last_sync = datetime.now()
+            except Exception as e:
+                self.error = e
+            if self._stop.wait(self.interval):
+                break
+        conn.close()
+
+
+# ======================
+# CENTRAL DATABASE
+# ======================
+
+def create_central_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS nodes
+                    (node TEXT PRIMARY KEY,
+                     applied_seq INTEGER NOT NULL DEFAULT 0,
+                     last_sync TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS orders
+                    (node TEXT NOT NULL,
+                     order_id INTEGER NOT NULL,
+                     timestamp TEXT,
+                     customer_phone TEXT,
+                     location_id INTEGER,
+                     subtotal REAL,
+                     tax REAL,
+                     discount REAL,
+                     total REAL,
+                     payment_mode TEXT,
+                     status TEXT,
+                     notes TEXT,
+                     PRIMARY KEY (node, order_id))''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS order_items
+                    (node TEXT NOT NULL,
+                     order_id INTEGER NOT NULL,
+                     item TEXT,
+                     quantity INTEGER,
+                     price REAL,
+                     total REAL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS customers
+                    (phone TEXT PRIMARY KEY,
+                     name TEXT,
+                     email TEXT,
+                     address TEXT,
+                     join_date TEXT,
+                     is_active INTEGER DEFAULT 1,
+                     credit_balance REAL DEFAULT 0,
+                     total_orders INTEGER DEFAULT 0,
+                     total_spent REAL DEFAULT 0,
+                     last_order_date TEXT,
+                     updated_at TEXT DEFAULT '',
+                     updated_by TEXT DEFAULT '')''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS stock
+                    (node TEXT NOT NULL,
+                     location_id INTEGER NOT NULL,
+                     item TEXT NOT NULL,
+                     stock INTEGER,
+                     seq INTEGER NOT NULL,
+                     PRIMARY KEY (node, location_id, item))''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_timestamp ON orders(timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(node, order_id)")
+
+
+def _ensure_customer(conn, phone):
+    conn.execute("INSERT OR IGNORE INTO customers (phone) VALUES (?)", (phone,))
+
+
+def _apply_order(conn, node, seq, payload):
+    cursor = conn.execute("""
+        INSERT OR IGNORE INTO orders
+        (node, order_id, timestamp, customer_phone, location_id, subtotal, tax, discount, total,
+         payment_mode, status, notes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (node, payload['id'], payload['timestamp'], payload['customer_phone'], payload['location_id'],
+          payload['subtotal'], payload['tax'], payload['discount'], payload['total'],
+          payload['payment_mode'], payload['status'], payload['notes']))
+    if cursor.rowcount == 0:
+        return
+    conn.executemany("""
+        INSERT INTO order_items (node, order_id, item, quantity, price, total) VALUES (?, ?, ?, ?, ?, ?)
+    """, [(node, payload['id'], *line) for line in payload['lines']])
+
+    phone = payload['customer_phone']
+    if phone:
+        # Totals are added rather than copied, so orders for the same
+        # customer from several kiosks all count
+        _ensure_customer(conn, phone)
+        conn.execute("""
+            UPDATE customers SET
+                total_orders = total_orders + 1,
+                total_spent = total_spent + ?,
+                credit_balance = credit_balance + ?,
+                last_order_date = MAX(COALESCE(last_order_date, ''), ?)
+            WHERE phone = ?
+        """, (payload['total'], payload['total'] if payload['payment_mode'] == "Credit" else 0,
+              payload['timestamp'], phone))
+
+
+def _apply_customer(conn, node, seq, payload):
+    phone = payload['phone']
+    previous = payload.get('previous_phone')
+    if previous:
+        # A renumbered customer keeps their totals unless the new number is already known
+        conn.execute("""
+            UPDATE customers SET phone = ?
+            WHERE phone = ? AND NOT EXISTS (SELECT 1 FROM customers WHERE phone = ?)
+        """, (phone, previous, phone))
+    _ensure_customer(conn, phone)
+    # Profile fields go to the most recent edit from any kiosk; ties go to the larger node name
+    conn.execute("""
+        UPDATE customers SET
+            name = ?, email = ?, address = ?, join_date = COALESCE(join_date, ?), is_active = ?,
+            updated_at = ?, updated_by = ?
+        WHERE phone = ? AND (updated_at < ? OR (updated_at = ? AND updated_by <= ?))
+    """, (payload['name'], payload['email'], payload['address'], payload['join_date'], payload['is_active'],
+          payload['updated_at'], node, phone, payload['updated_at'], payload['updated_at'], node))
+
+
+def _apply_credit(conn, node, seq, payload):
+    _ensure_customer(conn, payload['phone'])
+    conn.execute("UPDATE customers SET credit_balance = credit_balance + ? WHERE phone = ?",
+                 (payload['delta'], payload['phone']))
+
+
+def _apply_stock(conn, node, seq, payload):
+    # Each outlet's stock only changes on its own kiosk, so the newest level wins
+    conn.execute("""
+        INSERT INTO stock (node, location_id, item, stock, seq) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (node, location_id, item) DO UPDATE SET stock = excluded.stock, seq = excluded.seq
+        WHERE excluded.seq > stock.seq
+    """, (node, payload['location_id'], payload['item'], payload['stock'], seq))
+
+
+APPLIERS = {
+    "order": _apply_order,
+    "customer": _apply_customer,
+    "credit": _apply_credit,
+    "stock": _apply_stock,
+}
+
+
+def apply_batch(conn, batch):
+    """Apply one shipped batch in a single transaction, returns the number of changes applied
+
+    Changes at or below the node's applied sequence are skipped, so a batch
+    that arrives twice, or overlaps an earlier one, is only applied once.
+    """
+    node = batch["node"]
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT OR IGNORE INTO nodes (node) VALUES (?)", (node,))
+        applied_seq = conn.execute("SELECT applied_seq FROM nodes WHERE node = ?", (node,)).fetchone()[0]
+        applied = 0
+        for seq, kind, key, payload, created_at in batch["changes"]:
+            if seq <= applied_seq:
+                continue
+            APPLIERS[kind](conn, node, seq, payload)
+            applied_seq = seq
+            applied += 1
+        conn.execute("UPDATE nodes SET applied_seq = ?, last_sync = ? WHERE node = ?",
+                     (applied_seq, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), node))
+    return applied
+
+
+def ingest(central_dir, db_file=None):
+    """Apply every batch waiting in the inbox to the central database, returns the number of changes applied"""
+    inbox = os.path.join(central_dir, "inbox")
+    applied_dir = os.path.join(central_dir, "applied")
+    os.makedirs(inbox, exist_ok=True)
+    os.makedirs(applied_dir, exist_ok=True)
+
+    conn = connect(db_file or os.path.join(central_dir, "central.db"))
+    create_central_tables(conn)
+    conn.commit()
+    applied = 0
+    try:
+        # Names sort by node, then sequence
+        for name in sorted(name for name in os.listdir(inbox) if name.endswith(".json.gz")):
+            with gzip.open(os.path.join(inbox, name), "rt", encoding="utf-8") as f:
+                batch = json.load(f)
+            applied += run_with_retry(apply_batch, conn, batch)
+            os.replace(os.path.join(inbox, name), os.path.join(applied_dir, name))
+    finally:
+        conn.close()
+    return applied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ship kiosk changes to the central database, or apply them there")
+    parser.add_argument("--central-dir", default=CENTRAL_DIR or "central/")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ship = subparsers.add_parser("ship", help="write new outbox rows to the central inbox")
+    ship.add_argument("--db", default="food_hub.db")
+    ship.add_argument("--node", default=NODE_ID)
+    ship.add_argument("--prune", action="store_true", help="delete shipped outbox rows afterwards")
+
+    subparsers.add_parser("ingest", help="apply waiting batches to the central database")
+
+    args = parser.parse_args()
+    if args.command == "ship":
+        conn = connect(args.db)
+        shipped = ship_changes(conn, args.central_dir, args.node)
+        pruned = prune_outbox(conn) if args.prune else 0
+        conn.close()
+        print(f"Shipped {shipped} changes from {args.node}" + (f", pruned {pruned}" if args.prune else ""))
+    else:
+        print(f"Applied {ingest(args.central_dir)} changes")
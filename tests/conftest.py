@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The momo_kiosk_* modules sit at the repository root, next to the apps
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,10 @@
+from momo_kiosk_cart import Cart
+
+
+def test_amounts_are_rounded_to_paise():
+    cart = Cart()
+    cart.add(1, "Steamed Momo", 10.2, 2)
+    assert cart.subtotal == 20.4
+    assert cart.tax == 2.04
+    # 20.4 + 2.04 on its own is 22.439999999999998
+    assert cart.total == 22.44
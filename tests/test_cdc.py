@@ -0,0 +1,82 @@
+from momo_kiosk_cdc import consume, drop_untracked_triggers, latest_seq, prune_changes, save_checkpoint
+from momo_kiosk_db import connect
+from momo_kiosk_schema import FOOD_HUB_MIGRATIONS, ensure_schema
+
+
+def _log_size(conn):
+    return conn.execute("SELECT COUNT(*) FROM cdc_log").fetchone()[0]
+
+
+def _add_orders(conn, count):
+    with conn:
+        for n in range(count):
+            order_id = conn.execute("INSERT INTO orders (timestamp, total) VALUES ('2026-01-01 12:00:00', ?)",
+                                    (n,)).lastrowid
+            conn.execute("UPDATE orders SET status = 'Completed' WHERE id = ?", (order_id,))
+
+
+def _db(tmp_path):
+    db_file = str(tmp_path / "food_hub.db")
+    ensure_schema(db_file, FOOD_HUB_MIGRATIONS)
+    return connect(db_file)
+
+
+def test_nothing_is_logged_without_a_consumer(tmp_path):
+    conn = _db(tmp_path)
+    _add_orders(conn, 5)
+    assert _log_size(conn) == 0
+
+
+def test_only_tables_a_consumer_reads_are_logged(tmp_path):
+    conn = _db(tmp_path)
+    with conn:
+        save_checkpoint(conn, "reports", latest_seq(conn))
+        conn.execute("INSERT INTO customers (name, phone) VALUES ('Asha', '9876543210')")
+        conn.execute("INSERT INTO menu (category, item, price) VALUES ('Momos', 'Steamed Momo', 100)")
+    assert _log_size(conn) == 0
+
+    # A database migrated while customers were tracked loses that trigger and its rows
+    with conn:
+        conn.execute("""CREATE TRIGGER cdc_customers_update AFTER UPDATE ON customers
+                        BEGIN
+                            INSERT INTO cdc_log (table_name, op, row_id) VALUES ('customers', 'U', NEW.id);
+                        END""")
+        conn.execute("UPDATE customers SET name = 'Asha K'")
+        drop_untracked_triggers(conn)
+        conn.execute("UPDATE customers SET name = 'Asha'")
+    assert _log_size(conn) == 0
+
+
+def test_consume_then_prune_shrinks_the_log(tmp_path):
+    conn = _db(tmp_path)
+    with conn:
+        save_checkpoint(conn, "reports", latest_seq(conn))
+    _add_orders(conn, 5)
+    assert _log_size(conn) == 10
+
+    seen = []
+    assert consume(conn, "reports", seen.extend, tables=["orders"], limit=3) == 10
+    assert [op for _, _, op, _ in seen] == ["I", "U"] * 5
+
+    with conn:
+        assert prune_changes(conn) == 10
+    assert _log_size(conn) == 0
+
+
+def test_prune_keeps_what_a_lagging_consumer_has_not_read(tmp_path):
+    conn = _db(tmp_path)
+    with conn:
+        save_checkpoint(conn, "fast", 0)
+        save_checkpoint(conn, "slow", 0)
+    _add_orders(conn, 2)
+    consume(conn, "fast", lambda changes: None)
+    with conn:
+        save_checkpoint(conn, "slow", 2)
+        assert prune_changes(conn) == 2
+    assert _log_size(conn) == 2
+
+    # Once no consumer is left, nothing will read the rest
+    with conn:
+        conn.execute("DELETE FROM cdc_checkpoints")
+        assert prune_changes(conn) == 2
+    assert _log_size(conn) == 0
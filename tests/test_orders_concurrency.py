@@ -0,0 +1,121 @@
+import multiprocessing
+from datetime import datetime
+
+import pytest
+
+from momo_kiosk_db import connect, run_with_retry
+from momo_kiosk_locations import DEFAULT_LOCATION_ID
+from momo_kiosk_orders import OrderWriter, OutOfStockError, save_order
+from momo_kiosk_schema import FOOD_HUB_MIGRATIONS, ensure_schema
+
+STOCK = 30
+WORKERS = 4
+ORDERS_PER_WORKER = 75
+
+
+def _order():
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "customer_id": None,
+        "subtotal": 100.0,
+        "tax": 0.0,
+        "discount": 0.0,
+        "total": 100.0,
+        "payment_mode": "Cash",
+        "status": "Completed",
+        "staff_id": 1,
+        "notes": "",
+    }
+
+
+def _items(item_id):
+    return [{"item_id": item_id, "item": "Steamed Momo", "quantity": 1, "price": 100.0, "total": 100.0}]
+
+
+def _worker(db_file, item_id, orders, results):
+    conn = connect(db_file)
+    committed = rejected = 0
+    failures = []
+    for _ in range(orders):
+        try:
+            run_with_retry(save_order, conn, _order(), _items(item_id))
+            committed += 1
+        except OutOfStockError:
+            rejected += 1
+        except Exception as e:
+            failures.append(repr(e))
+    conn.close()
+    results.put((committed, rejected, failures))
+
+
+@pytest.fixture
+def stocked_db(tmp_path):
+    db_file = str(tmp_path / "food_hub.db")
+    ensure_schema(db_file, FOOD_HUB_MIGRATIONS)
+    conn = connect(db_file)
+    with conn:
+        item_id = conn.execute(
+            "INSERT INTO menu (category, item, price, cost, is_available) VALUES ('Momos', 'Steamed Momo', 100, 40, 1)"
+        ).lastrowid
+        conn.execute("INSERT INTO location_stock (location_id, menu_item_id, stock, min_stock) VALUES (?, ?, ?, 5)",
+                     (DEFAULT_LOCATION_ID, item_id, STOCK))
+        # Any write that would take stock below zero fails loudly instead
+        conn.execute("""
+            CREATE TRIGGER stock_never_negative BEFORE UPDATE OF stock ON location_stock
+            WHEN NEW.stock < 0
+            BEGIN
+                SELECT RAISE(ABORT, 'stock went negative');
+            END
+        """)
+    conn.close()
+    return db_file, item_id
+
+
+def test_concurrent_orders_never_oversell(stocked_db):
+    db_file, item_id = stocked_db
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_worker, args=(db_file, item_id, ORDERS_PER_WORKER, results))
+                 for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+    collected = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    committed = sum(c for c, _, _ in collected)
+    rejected = sum(r for _, r, _ in collected)
+    failures = [f for _, _, worker_failures in collected for f in worker_failures]
+
+    # Every order either committed or was turned away with OutOfStockError
+    assert failures == []
+    assert committed + rejected == WORKERS * ORDERS_PER_WORKER
+    assert committed == STOCK
+
+    conn = connect(db_file)
+    stock = conn.execute("SELECT stock FROM location_stock WHERE menu_item_id = ?", (item_id,)).fetchone()[0]
+    orders = conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    lines = conn.execute("SELECT COALESCE(SUM(quantity), 0) FROM order_items").fetchone()[0]
+    conn.close()
+    assert stock == 0
+    assert orders == STOCK
+    assert lines == STOCK
+
+
+def test_empty_order_is_rejected(stocked_db):
+    db_file, item_id = stocked_db
+    conn = connect(db_file)
+    with pytest.raises(ValueError, match="empty order"):
+        save_order(conn, _order(), [])
+
+    # Queued with another order, the empty one fails alone
+    writer = OrderWriter(db_file, max_wait=0.5)
+    empty = writer.submit(_order(), [])
+    placed = writer.submit(_order(), _items(item_id))
+    writer.close()
+    with pytest.raises(ValueError, match="empty order"):
+        empty.result()
+    assert placed.result() > 0
+
+    assert conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+import momo_kiosk_sync
+from momo_kiosk_db import connect, hot_restore
+from momo_kiosk_schema import FOOD_HUB_MIGRATIONS, ensure_schema
+from momo_kiosk_sync import SyncWorker, ingest, record_credit, ship_changes
+
+PHONE = "9876543210"
+
+
+@pytest.fixture(autouse=True)
+def outbox_enabled(monkeypatch):
+    monkeypatch.setattr(momo_kiosk_sync, "OUTBOX_ENABLED", True)
+
+
+def _central_credit(central_dir):
+    conn = sqlite3.connect(str(central_dir / "central.db"))
+    try:
+        return conn.execute("SELECT credit_balance FROM customers WHERE phone = ?", (PHONE,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _credit(conn, delta):
+    with conn:
+        record_credit(conn, PHONE, delta)
+
+
+def test_changes_after_restore_reach_central(tmp_path):
+    db_file = str(tmp_path / "food_hub.db")
+    backup_file = str(tmp_path / "backup.db")
+    central_dir = tmp_path / "central"
+    ensure_schema(db_file, FOOD_HUB_MIGRATIONS)
+    conn = connect(db_file)
+
+    _credit(conn, 10)
+    target = sqlite3.connect(backup_file)
+    conn.backup(target)
+    target.close()
+    _credit(conn, 20)
+    _credit(conn, 30)
+    ship_changes(conn, str(central_dir), node="kiosk-1")
+    ingest(str(central_dir))
+    assert _central_credit(central_dir) == 60
+
+    # The backup's outbox counter is behind what central has applied
+    hot_restore(conn, db_file, backup_file)
+    _credit(conn, 5)
+    ship_changes(conn, str(central_dir), node="kiosk-1")
+    ingest(str(central_dir))
+    conn.close()
+
+    # The change made after the restore arrives; the backup's already
+    # shipped change is not applied a second time
+    assert _central_credit(central_dir) == 65
+
+
+def test_sync_worker_prunes_shipped_changes(tmp_path):
+    db_file = str(tmp_path / "food_hub.db")
+    central_dir = tmp_path / "central"
+    ensure_schema(db_file, FOOD_HUB_MIGRATIONS)
+    conn = connect(db_file)
+    _credit(conn, 10)
+    _credit(conn, 20)
+
+    # One pass of the worker, which then waits out the interval until stopped
+    SyncWorker(db_file, str(central_dir), interval=60).start().stop()
+    ingest(str(central_dir))
+
+    assert _central_credit(central_dir) == 30
+    assert conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 0
+    conn.close()